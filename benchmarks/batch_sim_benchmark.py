@@ -0,0 +1,48 @@
+"""
+Throughput of the batch simulator.
+
+Times HeadlessRun, BatchGame at several batch sizes and run_sharded over a
+process pool. Parity with the sprite implementation is checked by
+tests/test_batch_sim.py.
+
+    python -m benchmarks.batch_sim_benchmark
+    python -m benchmarks.batch_sim_benchmark --sizes 1024 8192 --processes 8
+"""
+import argparse
+import time
+
+from src.batch_sim import BatchGame, BatchRandomPolicy, run_sharded
+from src.simulation import HeadlessRun
+
+
+def time_batch(size, frames):
+    game = BatchGame(size)
+    policy = BatchRandomPolicy(size, 0)
+    started = time.perf_counter()
+    for frame in range(frames):
+        game.step(policy(frame))
+    return time.perf_counter() - started
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 64, 1024, 8192], help="Batch sizes to time.")
+    parser.add_argument("--frames", type=int, default=300, help="Steps per timed batch.")
+    parser.add_argument("--processes", type=int, default=None, help="Pool size for run_sharded (default: all cores).")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    headless = HeadlessRun(seed=0).run(args.frames)
+    print(f"{'HeadlessRun':>12}  {headless['fps']:>12.0f} game steps/s")
+    for size in args.sizes:
+        elapsed = time_batch(size, args.frames)
+        print(f"{'batch ' + str(size):>12}  {size * args.frames / elapsed:>12.0f} game steps/s")
+    size = max(args.sizes)
+    report = run_sharded(size * 4, args.frames, args.processes)
+    print(f"{'pool ' + str(report['games']):>12}  {report['game_steps_per_s']:>12.0f} game steps/s ({report['processes']} processes)")
+
+
+if __name__ == "__main__":
+    main()
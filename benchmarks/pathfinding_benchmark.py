@@ -0,0 +1,172 @@
+"""
+Benchmark of graph_utils.a_star on Pacman's tiny matrix.
+
+Runs random start/target queries on the tiny matrix of a level (a fifth
+of them with arbitrary targets, which exercise the closest-node fallback)
+through a_star and through the previous list-scanning implementation kept
+below as the reference. Checks the return contract: every path starts at
+the start and steps through walkable blocks, reaches the target whenever
+the reference does and is never longer, and otherwise ends as close to the
+target as the reference's. Exits with status 1 on a violation.
+
+    python -m benchmarks.pathfinding_benchmark --queries 50
+"""
+import argparse
+import heapq
+import json
+import random
+import sys
+import time
+
+from src.configs import CELL_SIZE, PACMAN_SPEED
+from src.utils.coord_utils import get_tiny_matrix
+from src.utils.graph_utils import a_star, walkable_map
+
+
+def reference_a_star(matrix, start, target, subdivs=4):
+    """graph_utils.a_star before the rewrite, unchanged."""
+    rows, cols = len(matrix), len(matrix[0])
+
+    def is_valid(x, y):
+        if not (0 <= x < rows and 0 <= y < cols):
+            return False
+        for dx in range(subdivs*2):
+            for dy in range(subdivs*2):
+                if x + dx >= rows or y + dy >= cols or matrix[x + dx][y + dy] == 'wall':
+                    return False
+        return True
+
+    def heuristic(a, b):
+        return abs(a[0] - b[0]) + abs(a[1] - b[1])
+
+    def path_builder(current, came_from):
+        path = []
+        while current in came_from:
+            path.append(current)
+            current = came_from[current]
+        path.append(start)
+        return path[::-1]
+
+    directions = [(-1, 0), (1, 0), (0, -1), (0, 1)]
+    open_set = []
+    heapq.heappush(open_set, (0, start))
+    came_from = {}
+    g_score = {start: 0}
+    f_score = {start: heuristic(start, target)}
+    closest_node = start
+    closest_distance = heuristic(start, target)
+    while open_set:
+        _, current = heapq.heappop(open_set)
+        if current == target:
+            return path_builder(current, came_from)
+        for dx, dy in directions:
+            neighbor = (current[0] + dx, current[1] + dy)
+            if is_valid(neighbor[0], neighbor[1]):
+                tentative_g_score = g_score[current] + 1
+                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
+                    came_from[neighbor] = current
+                    g_score[neighbor] = tentative_g_score
+                    f_score[neighbor] = tentative_g_score + heuristic(neighbor, target)
+                    if neighbor not in [pos for _, pos in open_set]:
+                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
+                h_dist = heuristic(neighbor, target)
+                if h_dist < closest_distance:
+                    closest_node = neighbor
+                    closest_distance = h_dist
+    return path_builder(closest_node, came_from)
+
+
+def make_queries(matrix, subdivs, count, seed):
+    rows, cols = len(matrix), len(matrix[0])
+    walkable = walkable_map(matrix, subdivs)
+    cells = [divmod(index, cols) for index, free in enumerate(walkable) if free]
+    rng = random.Random(seed)
+    queries = []
+    for number in range(count):
+        start = rng.choice(cells)
+        if number % 5 == 4:
+            target = (rng.randrange(rows), rng.randrange(cols))
+        else:
+            target = rng.choice(cells)
+        queries.append((start, target))
+    return queries
+
+
+def check(matrix, subdivs, start, target, path, expected):
+    """Problems of `path` against the contract, [] when it holds."""
+    cols = len(matrix[0])
+    walkable = walkable_map(matrix, subdivs)
+    problems = []
+    if path[0] != start:
+        problems.append("does not start at the start")
+    for a, b in zip(path, path[1:]):
+        if abs(a[0] - b[0]) + abs(a[1] - b[1]) != 1:
+            problems.append(f"jumps from {a} to {b}")
+            break
+        if not walkable[b[0] * cols + b[1]]:
+            problems.append(f"enters blocked {b}")
+            break
+
+    def distance(cell):
+        return abs(cell[0] - target[0]) + abs(cell[1] - target[1])
+
+    if expected[-1] == target:
+        if path[-1] != target:
+            problems.append("misses a reachable target")
+        elif len(path) > len(expected):
+            problems.append(f"longer than the reference ({len(path)} > {len(expected)})")
+    elif distance(path[-1]) != distance(expected[-1]):
+        problems.append(f"fallback ends {distance(path[-1])} from the target, reference {distance(expected[-1])}")
+    return problems
+
+
+def timed(function, matrix, queries, subdivs):
+    started = time.perf_counter()
+    paths = [function(matrix, start, target, subdivs) for start, target in queries]
+    return time.perf_counter() - started, paths
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--level", type=int, default=1)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--subdivs", type=int, default=CELL_SIZE[0] // PACMAN_SPEED,
+                        help="Block half-size; the default matches Pacman's 2x2-cell block.")
+    parser.add_argument("--seed", type=int, default=1)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    with open(f"levels/level{args.level}.json") as fp:
+        level = json.load(fp)
+    matrix = get_tiny_matrix(level["matrix"], CELL_SIZE[0], PACMAN_SPEED)
+    started = time.perf_counter()
+    walkable_map(matrix, args.subdivs)
+    build = time.perf_counter() - started
+    queries = make_queries(matrix, args.subdivs, args.queries, args.seed)
+    fast_time, fast_paths = timed(a_star, matrix, queries, args.subdivs)
+    reference_time, reference_paths = timed(reference_a_star, matrix, queries, args.subdivs)
+    failures = 0
+    shorter = 0
+    for (start, target), path, expected in zip(queries, fast_paths, reference_paths):
+        problems = check(matrix, args.subdivs, start, target, path, expected)
+        if problems:
+            failures += 1
+            print(f"{start} -> {target}: {'; '.join(problems)}")
+        elif expected[-1] == target and len(path) < len(expected):
+            shorter += 1
+    rows, cols = len(matrix), len(matrix[0])
+    print(f"tiny matrix {rows}x{cols}, block {args.subdivs * 2}, {len(queries)} queries")
+    print(f"walkable map:  {build * 1000:8.2f} ms (once per matrix)")
+    print(f"a_star:        {fast_time / len(queries) * 1000:8.3f} ms/query")
+    print(f"reference:     {reference_time / len(queries) * 1000:8.3f} ms/query")
+    print(f"speedup:       {reference_time / fast_time:8.1f}x")
+    print(f"shorter paths than the reference: {shorter}")
+    if failures:
+        print(f"{failures} queries broke the contract")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,250 @@
+"""
+Headless micro-benchmarks for the stream codec.
+
+Times each stage of ScreenStreamer on synthetic gradients, worst-case noise
+and recorded Pac-Man frames (a capture file from main.py --stream-capture,
+scaled to every size) and reports frames/s and bytes/frame per stage.
+Results can be saved as a baseline and later runs compared against it:
+
+    python -m benchmarks.stream_codec_benchmark --capture session.ivgc --save-baseline codec.json
+    python -m benchmarks.stream_codec_benchmark --capture session.ivgc --baseline codec.json
+
+Comparing exits with status 1 when a stage got slower than the tolerance.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from src.utils.screen_streamer import ScreenStreamer, np
+from src.utils.stream_capture import CaptureReader
+
+DEFAULT_SIZES = ("160x120", "320x240", "640x480")
+FRAMES_PER_WORKLOAD = 8
+
+
+def gradient_frames(width, height, count):
+    """Horizontal gradient bands scrolling one pixel per frame."""
+    frames = []
+    for index in range(count):
+        surface = pygame.Surface((width, height))
+        for x in range(width):
+            shade = ((x + index) * 255 // width) & 0xF8
+            pygame.draw.line(surface, (shade, shade // 2, 255 - shade), (x, 0), (x, height - 1))
+        frames.append(surface)
+    return frames
+
+
+def noise_frames(width, height, count, seed=1):
+    """
+    Random colors with half of the pixels black: gray runs are about one
+    pixel long and B/W runs about two, the worst case for both encoders.
+    """
+    rng = random.Random(seed)
+    frames = []
+    for _ in range(count):
+        data = bytearray(rng.randbytes(width * height * 3))
+        for pixel, coin in enumerate(rng.randbytes(width * height)):
+            if coin & 1:
+                data[pixel * 3:pixel * 3 + 3] = b"\0\0\0"
+        frames.append(pygame.image.frombuffer(bytes(data), (width, height), "RGB").copy())
+    return frames
+
+
+def capture_frames(path, width, height, count):
+    """Up to `count` decoded frames of a capture, scaled to width x height."""
+    frames = []
+    framebuffer = None
+    with CaptureReader(path) as reader:
+        for index in range(len(reader)):
+            packet = bytes(reader.packet(index))
+            header = ScreenStreamer.HEADER_STRUCT.unpack_from(packet)
+            flags, frame_width, frame_height = header[3], header[5], header[6]
+            payload = packet[ScreenStreamer.HEADER_SIZE:]
+            try:
+                if flags & ScreenStreamer.FLAG_DELTA:
+                    if framebuffer is None:
+                        continue
+                    ScreenStreamer.apply_delta(framebuffer, payload, flags=flags)
+                else:
+                    gray = ScreenStreamer.decode_keyframe(flags, payload, frame_width * frame_height)
+                    framebuffer = bytearray(gray)
+            except ValueError:
+                continue
+            # Spread the samples over the whole session.
+            if index % max(1, len(reader) // count) == 0 and len(frames) < count:
+                surface = ScreenStreamer.gray_to_surface(bytes(framebuffer), frame_width, frame_height)
+                frames.append(pygame.transform.scale(surface, (width, height)))
+    return frames
+
+
+def timed(func, items, min_time):
+    """Run func over `items` (cycling) for at least `min_time`; frames/s and results."""
+    func(items[0])  # warm up caches and lazily built tables
+    count = 0
+    results = []
+    started = time.perf_counter()
+    while True:
+        for item in items:
+            result = func(item)
+            if count < len(items):
+                results.append(result)
+            count += 1
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            return count / elapsed, results
+
+
+def run_workload(surfaces, min_time, use_numpy):
+    """frames/s and bytes/frame of every codec stage for one list of surfaces."""
+    width, height = surfaces[0].get_size()
+    pixel_count = width * height
+    streamer = ScreenStreamer(width, height, use_numpy=use_numpy)
+    bw_streamer = ScreenStreamer(width, height, bw_mode=True, use_numpy=use_numpy)
+    results = {}
+
+    def record(stage, fps, outputs=None):
+        entry = {"fps": round(fps, 1)}
+        if outputs is not None:
+            entry["bytes_per_frame"] = round(sum(len(o) for o in outputs) / len(outputs), 1)
+        results[stage] = entry
+
+    if use_numpy:
+        to_gray = ScreenStreamer._surface_to_gray_np
+    else:
+        def to_gray(surface):
+            return ScreenStreamer._rgb_to_gray(pygame.image.tostring(surface, "RGB"))
+    fps, grays = timed(to_gray, surfaces, min_time)
+    record("gray", fps)
+
+    fps, gray_payloads = timed(lambda gray: streamer._encode_keyframe(gray)[1], grays, min_time)
+    record("rle_gray", fps, gray_payloads)
+    fps, bw_payloads = timed(lambda gray: bw_streamer._encode_keyframe(gray)[1], grays, min_time)
+    record("rle_bw", fps, bw_payloads)
+
+    fps, packets = timed(streamer.encode_surface, surfaces, min_time)
+    record("encode_surface", fps, packets)
+
+    fps, decoded = timed(
+        lambda payload: ScreenStreamer.decode_keyframe(0, payload, pixel_count, use_numpy),
+        gray_payloads,
+        min_time,
+    )
+    record("decode_gray", fps)
+    fps, _ = timed(
+        lambda payload: ScreenStreamer.decode_keyframe(
+            ScreenStreamer.FLAG_BW, payload, pixel_count, use_numpy
+        ),
+        bw_payloads,
+        min_time,
+    )
+    record("decode_bw", fps)
+    fps, _ = timed(
+        lambda packet: ScreenStreamer.extract_frames(packet, use_numpy), packets, min_time
+    )
+    record("extract_frames", fps)
+
+    fps, _ = timed(lambda gray: ScreenStreamer.gray_to_surface(gray, width, height), decoded, min_time)
+    record("surface_rgb", fps)
+    fps, _ = timed(
+        lambda gray: ScreenStreamer.gray_to_surface(gray, width, height, palettized=True),
+        decoded,
+        min_time,
+    )
+    record("surface_palettized", fps)
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """Print stages slower than baseline by more than `tolerance`; returns their count."""
+    regressions = 0
+    for key, stages in results.items():
+        for stage, entry in stages.items():
+            reference = baseline.get(key, {}).get(stage)
+            if not reference:
+                continue
+            change = entry["fps"] / reference["fps"] - 1 if reference["fps"] else 0.0
+            if change < -tolerance:
+                regressions += 1
+                print(f"REGRESSION {key} {stage}: {reference['fps']} -> {entry['fps']} frames/s ({change:+.0%})")
+    return regressions
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--capture", default=None, help="Capture file with recorded Pac-Man frames.")
+    parser.add_argument("--sizes", nargs="+", default=list(DEFAULT_SIZES), help="WxH frame sizes.")
+    parser.add_argument(
+        "--workloads",
+        nargs="+",
+        default=["gradient", "noise", "pacman"],
+        choices=["gradient", "noise", "pacman"],
+    )
+    parser.add_argument(
+        "--paths",
+        nargs="+",
+        default=["numpy", "python"],
+        choices=["numpy", "python"],
+        help="Codec implementations to time (default: both).",
+    )
+    parser.add_argument("--min-time", type=float, default=0.3, help="Seconds per measurement.")
+    parser.add_argument("--baseline", default=None, help="Compare against this baseline JSON.")
+    parser.add_argument("--save-baseline", default=None, help="Write the results to this JSON.")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.15,
+        help="Allowed frames/s drop against the baseline (default: 0.15 = 15%%).",
+    )
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pygame.init()
+    paths = [path for path in args.paths if path == "python" or np is not None]
+    results = {}
+    for size in args.sizes:
+        width, height = (int(value) for value in size.split("x"))
+        for workload in args.workloads:
+            if workload == "gradient":
+                surfaces = gradient_frames(width, height, FRAMES_PER_WORKLOAD)
+            elif workload == "noise":
+                surfaces = noise_frames(width, height, FRAMES_PER_WORKLOAD)
+            elif args.capture:
+                surfaces = capture_frames(args.capture, width, height, FRAMES_PER_WORKLOAD)
+            else:
+                continue  # recorded frames need --capture
+            if not surfaces:
+                print(f"{workload} {size}: no frames")
+                continue
+            for path in paths:
+                key = f"{workload}/{size}/{path}"
+                results[key] = run_workload(surfaces, args.min_time, path == "numpy")
+                print(key)
+                for stage, entry in results[key].items():
+                    size_note = ""
+                    if "bytes_per_frame" in entry:
+                        size_note = f"  {entry['bytes_per_frame']:10.0f} B/frame"
+                    print(f"  {stage:20s} {entry['fps']:10.1f} frames/s{size_note}")
+    pygame.quit()
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as fp:
+            json.dump(results, fp, indent=2, sort_keys=True)
+        print(f"baseline written to {args.save_baseline}")
+    if args.baseline:
+        with open(args.baseline) as fp:
+            baseline = json.load(fp)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            raise SystemExit(f"{regressions} stage(s) slower than the baseline")
+        print("no regressions against the baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Loopback latency benchmark for the StreamClient reader.
+
+Sends frames at irregular intervals from a ScreenStreamer to one
+latest-only StreamClient over 127.0.0.1 and reports the time from
+send_surface() to the decoded frame being available in poll_frames().
+
+    python -m benchmarks.stream_latency_benchmark --frames 500
+"""
+import argparse
+import os
+import random
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from src.utils.screen_streamer import ScreenStreamer, StreamClient
+
+
+def percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=5810)
+    parser.add_argument("--frames", type=int, default=500)
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=120)
+    parser.add_argument("--delta", action="store_true", help="Use protocol v2 deltas.")
+    parser.add_argument("--max-gap", type=float, default=0.02, help="Max seconds between frames.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pygame.init()
+    streamer = ScreenStreamer(
+        args.width, args.height, tcp_port=args.port, delta_mode=args.delta
+    )
+    streamer.start()
+    client = StreamClient(port=args.port, latest_only=True)
+    client.start()
+    time.sleep(0.5)  # let the viewer connect
+    surface = pygame.Surface((args.width, args.height))
+    latencies = []
+    for index in range(args.frames):
+        surface.fill((0, 0, 0))
+        surface.fill((255, 255, 0), (index % args.width, index % args.height, 12, 12))
+        expected = streamer.frame_id
+        sent = time.perf_counter()
+        streamer.send_surface(surface)
+        deadline = sent + 1.0
+        while time.perf_counter() < deadline:
+            frames = client.poll_frames()
+            if frames and frames[-1][0] == expected:
+                latencies.append(time.perf_counter() - sent)
+                break
+            time.sleep(0.0001)  # yield the GIL to the reader thread
+        time.sleep(random.uniform(0.0, args.max_gap))
+    client.stop()
+    streamer.stop()
+    pygame.quit()
+    if not latencies:
+        print("no frames received")
+        return
+    latencies.sort()
+    print(
+        f"{len(latencies)}/{args.frames} frames  "
+        f"p50 {percentile(latencies, 50) * 1000:.2f} ms  "
+        f"p90 {percentile(latencies, 90) * 1000:.2f} ms  "
+        f"p99 {percentile(latencies, 99) * 1000:.2f} ms  "
+        f"max {latencies[-1] * 1000:.2f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
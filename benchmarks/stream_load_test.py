@@ -0,0 +1,139 @@
+"""
+Load test for the encode-once fan-out stream server.
+
+Runs a ScreenStreamer in "selectors" mode on a synthetic animated surface,
+spawns many StreamClient viewers spread over worker processes and reports
+per-frame delivery latency percentiles (send -> decoded in a viewer).
+
+    python -m benchmarks.stream_load_test --clients 300 --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from src.utils.screen_streamer import ScreenStreamer, StreamClient
+
+
+def viewer_worker(port, count, duration, results):
+    """Run `count` viewers for `duration` seconds; report receive times."""
+    clients = []
+    for _ in range(count):
+        client = StreamClient(port=port)
+        client.start()
+        clients.append(client)
+    received = []
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        for client in clients:
+            for frame_id, _w, _h, _surface in client.poll_frames():
+                received.append((frame_id, time.monotonic()))
+        time.sleep(0.001)
+    for client in clients:
+        client.stop()
+    results.put((count, received))
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=5800)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--fps", type=int, default=30)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=120)
+    parser.add_argument("--bw", action="store_true")
+    parser.add_argument("--delta", action="store_true", help="Use protocol v2 deltas.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pygame.display.init()
+    streamer = ScreenStreamer(
+        args.width,
+        args.height,
+        tcp_port=args.port,
+        bw_mode=args.bw,
+        delta_mode=args.delta,
+        server_mode="selectors",
+        send_queue_size=32,
+    )
+    streamer.start()
+
+    results = multiprocessing.Queue()
+    workers = []
+    processes = max(1, min(args.processes, args.clients))
+    warmup = 2.0
+    for index in range(processes):
+        count = args.clients // processes + (index < args.clients % processes)
+        worker = multiprocessing.Process(
+            target=viewer_worker,
+            args=(args.port, count, args.seconds + warmup + 1.0, results),
+            daemon=True,
+        )
+        worker.start()
+        workers.append(worker)
+    time.sleep(warmup)
+
+    surface = pygame.Surface((args.width, args.height))
+    sent_at = {}
+    period = 1.0 / args.fps
+    encode_total = 0.0
+    next_tick = time.monotonic()
+    end = next_tick + args.seconds
+    while time.monotonic() < end:
+        frame = len(sent_at)
+        surface.fill((0, 0, 0))
+        x = (frame * 2) % args.width
+        pygame.draw.rect(surface, (255, 255, 0), (x, args.height // 3, 12, 12))
+        pygame.draw.rect(surface, (24, 24, 217), (0, 0, args.width, 4))
+        started = time.monotonic()
+        frame_id = streamer.frame_id
+        streamer.send_surface(surface)
+        sent_at[frame_id] = started
+        encode_total += time.monotonic() - started
+        next_tick += period
+        time.sleep(max(0.0, next_tick - time.monotonic()))
+
+    latencies = []
+    per_frame = {}
+    for _ in workers:
+        _count, received = results.get()
+        for frame_id, recv_time in received:
+            if frame_id in sent_at:
+                latencies.append((recv_time - sent_at[frame_id]) * 1000)
+                per_frame[frame_id] = per_frame.get(frame_id, 0) + 1
+    for worker in workers:
+        worker.join(timeout=5)
+    stats = streamer.sender_stats()
+    streamer.stop()
+
+    latencies.sort()
+    frames_sent = len(sent_at)
+    expected = frames_sent * args.clients
+    print(f"viewers:          {args.clients} in {processes} processes")
+    print(f"frames sent:      {frames_sent} at {args.fps} fps")
+    print(f"send_surface avg: {encode_total / max(1, frames_sent) * 1000:.3f} ms")
+    print(f"frames delivered: {len(latencies)} / {expected}")
+    print(f"dropped by server: {sum(s['dropped_packets'] for s in stats)}")
+    for pct in (50, 90, 99, 99.9):
+        print(f"latency p{pct:<5}  {percentile(latencies, pct):8.2f} ms")
+    if latencies:
+        print(f"latency max     {latencies[-1]:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
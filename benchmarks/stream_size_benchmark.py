@@ -0,0 +1,138 @@
+"""
+Payload size benchmark: fixed 7/6-byte runs vs compact varint runs.
+
+Record a live Pac-Man session into a capture file (or use one written by
+main.py --stream-capture, or a raw wire dump), then re-encode every
+recorded frame in both formats. No display or game loop is needed:
+
+    python main.py --stream --stream-port 5000 &
+    python -m benchmarks.stream_size_benchmark record session.ivgc --port 5000 --seconds 60
+    python -m benchmarks.stream_size_benchmark session.ivgc
+"""
+import argparse
+import os
+import socket
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+from src.utils.screen_streamer import ScreenStreamer, StreamParser
+from src.utils.stream_capture import CaptureReader, CaptureWriter
+
+VARIANTS = (
+    ("gray keyframes", False, False),
+    ("gray delta", False, True),
+    ("bw keyframes", True, False),
+    ("bw delta", True, True),
+)
+
+
+def record(path, host, port, seconds):
+    sock = socket.create_connection((host, port))
+    parser = StreamParser()
+    writer = CaptureWriter(path)
+    deadline = time.monotonic() + seconds
+    count = 0
+    while time.monotonic() < deadline:
+        chunk = sock.recv(65536)
+        if not chunk:
+            break
+        for version, flags, frame_id, width, height, payload in parser.feed(chunk):
+            header = ScreenStreamer.HEADER_STRUCT.pack(
+                ScreenStreamer.START_BYTE,
+                ScreenStreamer.MAGIC,
+                version,
+                flags,
+                frame_id,
+                width,
+                height,
+                len(payload),
+            )
+            writer.write(header + payload)
+            count += 1
+    sock.close()
+    writer.close()
+    print(f"recorded {count} packets to {path}")
+
+
+def load_frames(path):
+    """Gray framebuffers of every decodable frame in a capture or raw dump."""
+    frames = []
+    framebuffer = None
+    with CaptureReader(path) as reader:
+        packets = []
+        for index in range(len(reader)):
+            packet = bytes(reader.packet(index))
+            header = ScreenStreamer.HEADER_STRUCT.unpack_from(packet)
+            packets.append(header[2:7] + (packet[ScreenStreamer.HEADER_SIZE:],))
+    for _version, flags, _frame_id, width, height, payload in packets:
+        if flags & ScreenStreamer.FLAG_DELTA:
+            if framebuffer is None:
+                continue
+            ScreenStreamer.apply_delta(framebuffer, payload, flags=flags)
+        else:
+            gray = ScreenStreamer.decode_keyframe(flags, payload, width * height)
+            framebuffer = bytearray(gray)
+        frames.append((width, height, bytes(framebuffer)))
+    return frames
+
+
+def measure(frames, bw, delta, compact, keyframe_interval):
+    import numpy as np
+
+    width, height, _gray = frames[0]
+    streamer = ScreenStreamer(
+        width,
+        height,
+        bw_mode=bw,
+        delta_mode=delta,
+        keyframe_interval=keyframe_interval,
+        compact=compact,
+    )
+    total = 0
+    started = time.perf_counter()
+    for _width, _height, gray in frames:
+        gray = np.frombuffer(gray, dtype=np.uint8).copy()
+        if delta:
+            packet = streamer._encode_delta_frame(gray)
+        else:
+            packet = streamer._pack_frame(*streamer._encode_keyframe(gray))
+        total += len(packet)
+    return total, time.perf_counter() - started
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("capture", nargs="+", help="Capture files or raw stream dumps ('record PATH' to make one).")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=5000)
+    parser.add_argument("--seconds", type=float, default=30.0)
+    parser.add_argument("--keyframe-interval", type=int, default=60)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.capture[0] == "record":
+        record(args.capture[1], args.host, args.port, args.seconds)
+        return
+    for path in args.capture:
+        frames = load_frames(path)
+        if not frames:
+            print(f"{path}: no frames")
+            continue
+        print(f"{path}: {len(frames)} frames")
+        for label, bw, delta in VARIANTS:
+            fixed, fixed_time = measure(frames, bw, delta, False, args.keyframe_interval)
+            compact, compact_time = measure(frames, bw, delta, True, args.keyframe_interval)
+            print(
+                f"  {label:15s} fixed {fixed / len(frames):8.0f} B/frame"
+                f"  compact {compact / len(frames):8.0f} B/frame"
+                f"  ratio {compact / fixed:5.2f}"
+                f"  encode {fixed_time / len(frames) * 1000:.2f} / "
+                f"{compact_time / len(frames) * 1000:.2f} ms/frame"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,13 @@
 import argparse
+import json
+import sys
 
 from src.runner import GameRun
+from src.simulation import HeadlessRun, load_input_script
+from src.utils.screen_streamer import ScreenStreamer
+from src.utils.stream_dither import DITHER_DIFFUSION, DITHER_MODES, FAST_DIFFUSION
+from src.utils.stream_profiles import parse_profile
+from src.utils.stream_senders import SEND_POLICIES
 
 
 def parse_args():
@@ -28,21 +35,207 @@ def parse_args():
         default=115200,
         help="Baudrate for serial grayscale stream (default: 115200).",
     )
+    parser.add_argument(
+        "--stream-profile",
+        action="append",
+        type=parse_profile,
+        default=None,
+        metavar="SPEC",
+        help=(
+            "Output profile fed from the same render, repeatable: WxH[,bw|gray][,delta]"
+            "[,port=N][,serial=PATH][,baud=N][,capture=PATH], e.g. 80x60,bw,serial=/dev/ttyUSB0. "
+            "Replaces --stream-port/--stream-serial; other stream options are shared."
+        ),
+    )
     parser.add_argument(
         "--bw-stream",
         action="store_true",
         help="Send stream in black/white mode (only set-pixel runs).",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "--bw-threshold",
+        type=int,
+        default=ScreenStreamer.BW_THRESHOLD,
+        help=f"Gray level from which B/W pixels are white (default: {ScreenStreamer.BW_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--bw-dither",
+        choices=DITHER_MODES,
+        default="none",
+        help="Dithering of the B/W stream: 4x4 Bayer (cheap) or Floyd-Steinberg error diffusion (needs numba).",
+    )
+    parser.add_argument(
+        "--vector-stream",
+        action="store_true",
+        help="Stream beam vectors traced from the maze and sprites instead of raster frames (flags bit5).",
+    )
+    parser.add_argument(
+        "--vector-ivray",
+        default=None,
+        help="Also save the traced vectors as an IVRY vector table (ivray_v_generator format).",
+    )
+    parser.add_argument(
+        "--vector-scale",
+        type=int,
+        default=1,
+        help="Vector coordinates per screen pixel (default: 1).",
+    )
+    parser.add_argument(
+        "--delta-stream",
+        action="store_true",
+        help="Send only changed pixels between keyframes (protocol v2).",
+    )
+    parser.add_argument(
+        "--compact-stream",
+        action="store_true",
+        help="Send varint-coded runs with per-frame gray palettes (flags bit2).",
+    )
+    parser.add_argument(
+        "--stream-compression",
+        choices=("zlib", "lzma"),
+        default=None,
+        help="Compress frame payloads when it pays off (flags bit3).",
+    )
+    parser.add_argument(
+        "--stream-compression-level",
+        type=int,
+        default=6,
+        help="zlib level / lzma preset for --stream-compression (default: 6).",
+    )
+    parser.add_argument(
+        "--keyframe-interval",
+        type=int,
+        default=60,
+        help="Frames between keyframes in delta mode (default: 60).",
+    )
+    parser.add_argument(
+        "--stream-queue-size",
+        type=int,
+        default=8,
+        help="Packets buffered per stream client before the drop policy applies (default: 8).",
+    )
+    parser.add_argument(
+        "--stream-drop-policy",
+        choices=SEND_POLICIES,
+        default="drop-oldest",
+        help="What to do with a stream client whose queue is full (default: drop-oldest).",
+    )
+    parser.add_argument(
+        "--stream-server",
+        choices=("threads", "selectors"),
+        default="threads",
+        help="TCP server mode; 'selectors' serves hundreds of viewers from one thread.",
+    )
+    parser.add_argument(
+        "--stream-pipeline",
+        action="store_true",
+        help="Encode and send frames on a worker thread instead of the game loop.",
+    )
+    parser.add_argument(
+        "--stream-timestamps",
+        action="store_true",
+        help="Add the capture time to every frame (flags bit4) for end-to-end latency.",
+    )
+    parser.add_argument(
+        "--stream-stats",
+        default=None,
+        help="Append a JSON stats record (encode time, bytes, runs, queue wait) every second to this file.",
+    )
+    parser.add_argument(
+        "--stream-capture",
+        default=None,
+        help="Also record every sent packet into this indexed capture file (see replay_stream.py).",
+    )
+    parser.add_argument(
+        "--stream-adaptive",
+        action="store_true",
+        help="Skip frames and lower gray depth / switch to B/W to hold the target latency on slow links.",
+    )
+    parser.add_argument(
+        "--stream-target-latency",
+        type=float,
+        default=0.25,
+        help="End-to-end latency in seconds held by --stream-adaptive (default: 0.25).",
+    )
+    parser.add_argument(
+        "--logic-rate",
+        type=int,
+        default=None,
+        help="Fixed game logic steps per second, independent of the frame rate (default: 60).",
+    )
+    parser.add_argument(
+        "--render-fps",
+        type=int,
+        default=None,
+        help="Cap of rendered and streamed frames per second (default: 60); sprites are interpolated between logic steps.",
+    )
+    parser.add_argument(
+        "--headless",
+        action="store_true",
+        help="Simulate the game without window, audio or frame cap on a virtual clock and print a JSON report.",
+    )
+    parser.add_argument(
+        "--sim-frames",
+        type=int,
+        default=3600,
+        help="Frames to simulate with --headless (default: 3600, one minute of game time).",
+    )
+    parser.add_argument(
+        "--sim-seed",
+        type=int,
+        default=None,
+        help="Seed for the ghosts and the random input of --headless; equal seeds repeat a run.",
+    )
+    parser.add_argument(
+        "--sim-input",
+        default=None,
+        metavar="PATH",
+        help="Input script for --headless ('frame direction' per line) instead of random input.",
+    )
+    args = parser.parse_args()
+    if args.bw_dither == DITHER_DIFFUSION and not FAST_DIFFUSION:
+        parser.error("--bw-dither diffusion needs numpy and numba (pip install numba) to keep up with the stream")
+    return args
+
+
+def run_headless(args):
+    policy = load_input_script(args.sim_input) if args.sim_input else None
+    report = HeadlessRun(policy=policy, seed=args.sim_seed).run(args.sim_frames)
+    print(json.dumps(report))
 
 
 if __name__ == "__main__":
     args = parse_args()
+    if args.headless:
+        run_headless(args)
+        sys.exit()
     gr = GameRun(
         enable_stream=args.stream,
         stream_port=args.stream_port,
         stream_serial=args.stream_serial,
         stream_serial_baud=args.stream_serial_baud,
         bw_mode=args.bw_stream,
+        bw_threshold=args.bw_threshold,
+        bw_dither=args.bw_dither,
+        vector_stream=args.vector_stream,
+        vector_ivray_path=args.vector_ivray,
+        vector_scale=args.vector_scale,
+        delta_mode=args.delta_stream,
+        keyframe_interval=args.keyframe_interval,
+        send_queue_size=args.stream_queue_size,
+        send_policy=args.stream_drop_policy,
+        server_mode=args.stream_server,
+        stream_pipeline=args.stream_pipeline,
+        stream_adaptive=args.stream_adaptive,
+        stream_target_latency=args.stream_target_latency,
+        compact_stream=args.compact_stream,
+        stream_compression=args.stream_compression,
+        stream_compression_level=args.stream_compression_level,
+        stream_timestamps=args.stream_timestamps,
+        stream_stats_path=args.stream_stats,
+        stream_capture_path=args.stream_capture,
+        stream_profiles=args.stream_profile,
+        logic_rate=args.logic_rate,
+        render_fps=args.render_fps,
     )
     gr.main()
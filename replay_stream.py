@@ -0,0 +1,104 @@
+import argparse
+import time
+
+from src.utils.screen_streamer import ScreenStreamer
+from src.utils.stream_capture import CaptureReader
+from src.utils.stream_senders import SEND_POLICIES
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Serve a recorded stream capture (--stream-capture) over TCP or serial."
+    )
+    parser.add_argument("capture", help="Capture file or raw stream dump.")
+    parser.add_argument("--port", type=int, default=None, help="TCP port to serve on.")
+    parser.add_argument("--serial", default=None, help="Serial port path to write to.")
+    parser.add_argument(
+        "--serial-baud",
+        type=int,
+        default=115200,
+        help="Baudrate for serial output (default: 115200).",
+    )
+    parser.add_argument(
+        "--speed",
+        type=float,
+        default=1.0,
+        help="Playback speed; 2 = twice as fast, 0 = as fast as the transport allows.",
+    )
+    parser.add_argument("--start", type=float, default=0.0, help="Start offset in seconds.")
+    parser.add_argument("--loop", action="store_true", help="Restart at the end of the capture.")
+    parser.add_argument(
+        "--stream-server",
+        choices=ScreenStreamer.SERVER_MODES,
+        default="threads",
+        help="TCP server mode (default: threads).",
+    )
+    parser.add_argument("--stream-queue-size", type=int, default=8)
+    parser.add_argument("--stream-drop-policy", choices=SEND_POLICIES, default="drop-oldest")
+    return parser.parse_args()
+
+
+def replay(reader: CaptureReader, streamer: ScreenStreamer, speed: float, start: float, loop: bool):
+    """
+    Send the capture's packets with their recorded spacing divided by
+    `speed`. Recorded packets are sent as they are, so viewers that join
+    (or drop) mid-stream wait for the next recorded keyframe.
+    """
+    index = reader.keyframe_at_or_before(reader.index_at(int(start * 1_000_000)))
+    while True:
+        started = time.monotonic()
+        base_us = reader.times_us[index]
+        while index < len(reader):
+            if speed > 0:
+                due = started + (reader.times_us[index] - base_us) / 1_000_000 / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+            streamer.send_packet(reader.packet(index))
+            index += 1
+        if not loop:
+            return
+        index = 0
+        while index < len(reader) - 1 and not reader.is_keyframe(index):
+            index += 1
+
+
+def main():
+    args = parse_args()
+    if not args.port and not args.serial:
+        raise SystemExit("Either --port or --serial is required")
+    reader = CaptureReader(args.capture)
+    if not len(reader):
+        raise SystemExit(f"No packets in {args.capture}")
+    header = ScreenStreamer.HEADER_STRUCT.unpack_from(reader.packet(0))
+    width, height = header[5], header[6]
+    print(
+        f"{args.capture}: {len(reader)} packets, {width}x{height}, "
+        f"{reader.duration_us / 1_000_000:.1f} s"
+    )
+    streamer = ScreenStreamer(
+        width,
+        height,
+        tcp_port=args.port,
+        serial_path=args.serial,
+        serial_baud=args.serial_baud,
+        send_queue_size=args.stream_queue_size,
+        send_policy=args.stream_drop_policy,
+        server_mode=args.stream_server,
+    )
+    streamer.start()
+    try:
+        replay(reader, streamer, args.speed, args.start, args.loop)
+        # Let the senders drain before closing the connections.
+        time.sleep(0.5)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        streamer.stop()
+        reader.close()
+        for stats in streamer.sender_stats():
+            print(f"sender stats: {stats}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,645 @@
+"""
+Batch simulator: many independent games advanced in lockstep, stored as
+NumPy struct-of-arrays instead of sprites.
+
+Every step follows HeadlessRun.step() and the rules of the sprite classes:
+Pacman's tiny-matrix movement and dot eating, the ghosts' release, lerp
+movement, get_direction choices and Blinky/Pinky/Inky/Clyde targets, the
+power-up, collisions, and ScreenManager's death and level resets, all on a
+per-game virtual clock. Nothing is drawn. Each game has its own
+random.Random for the ghosts' random targets; seeded like the global random
+module of a HeadlessRun, a game repeats that run step for step.
+
+Actions are one int per game and step: -1 keeps the current direction,
+0..3 press l, r, u, d (see PACMAN_DIRECTIONS).
+"""
+import json
+import multiprocessing
+import random
+import time
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - handled at runtime
+    np = None
+
+from src.configs import (CELL_SIZE, DOT_POINT, GHOST_DELAYS, GHOST_POINT,
+                         GHOST_SCATTER_TARGETS, PACMAN, PACMAN_SPEED,
+                         POWER_POINT, SCREEN_HEIGHT, SCREEN_WIDTH)
+from src.game.time_source import step_ms
+from src.utils.coord_utils import get_tiny_matrix, place_elements_offset
+from src.utils.ghost_movement_utils import BLOCKERS, get_is_move_valid
+
+PACMAN_DIRECTIONS = "lrud"
+GHOST_NAMES = ("blinky", "pinky", "inky", "clyde")  # GhostManager order
+# get_direction's candidate order and deltas; the reverse of d is (d + 2) % 4.
+GHOST_DIRECTIONS = ("up", "left", "down", "right")
+GHOST_DR = (-1, 0, 1, 0)
+GHOST_DC = (0, -1, 0, 1)
+GHOST_ACCELERATE = 0.2  # Ghost._accelerate, lerp progress per step
+GHOST_RELEASE_ROW = 11  # row a released ghost is moved to
+GHOST_REDEN_WAIT = 1500  # Ghost._dead_wait after the first release
+DEATH_WAIT_MS = 1000  # Ghost.check_collisions
+LEVEL_WAIT_MS = 2000  # ScreenManager.check_level_complete
+COL_PAD = 2  # ghost move table columns -2..num_cols+1 (off-grid tunnel tiles)
+NO_DOT, DOT, POWER = 0, 1, 2
+
+
+def rect_round(value):
+    """A float assigned to a pygame Rect attribute: rounded half away from zero."""
+    return np.copysign(np.floor(np.abs(value) + 0.5), value)
+
+
+class LevelTables:
+    """A level and the move tables derived from it, shared by all games."""
+
+    def __init__(self, level_number: int = 1):
+        with open(f"levels/level{level_number}.json") as fp:
+            level = json.load(fp)
+        matrix = level["matrix"]
+        self.num_rows = len(matrix)
+        self.num_cols = len(matrix[0])
+        self.pacman_start = tuple(level["pacman_start"])
+        self.ghost_den = tuple(level["ghost_den"])
+        self.mode_times = np.array(level["scatter_times"], dtype=np.int64) * 1000
+        self.power_up_time = level["power_up_time"]
+        self.start_x, self.start_y = place_elements_offset(
+            SCREEN_WIDTH,
+            SCREEN_HEIGHT,
+            CELL_SIZE[0] * self.num_cols,
+            CELL_SIZE[0] * self.num_rows,
+            0.5,
+            0.5,
+        )
+        kinds = {"dot": DOT, "power": POWER}
+        self.dots = np.array(
+            [[kinds.get(cell, NO_DOT) for cell in row] for row in matrix], dtype=np.int8
+        )
+        # Cells Pacman.count_dots_powers counts when a Pacman is created.
+        self.count_mask = np.zeros((self.num_rows, self.num_cols), dtype=bool)
+        for r in range(self.num_rows - 1):
+            for c in range(self.num_cols - 1):
+                self.count_mask[r, c] = matrix[r + 1][c] not in BLOCKERS + ["null"]
+        # get_is_move_valid per tile and direction; lookups that would raise
+        # in the sprite code count as blocked.
+        self.ghost_moves = np.zeros((self.num_rows, self.num_cols + 2 * COL_PAD, 4), dtype=bool)
+        for r in range(self.num_rows):
+            for c in range(-COL_PAD, self.num_cols + COL_PAD):
+                for d, name in enumerate(GHOST_DIRECTIONS):
+                    try:
+                        valid = get_is_move_valid((r, c), name, matrix)
+                    except IndexError:
+                        valid = False
+                    self.ghost_moves[r, c + COL_PAD, d] = valid
+        self._build_pacman_moves(matrix)
+
+    def _build_pacman_moves(self, matrix):
+        # Pacman.edges_helper_vertical / edge_helper_horizontal for l, r, u,
+        # d at every tiny-matrix position, with Python's negative indexing.
+        tiny = get_tiny_matrix(matrix, CELL_SIZE[0], PACMAN_SPEED)
+        self.subdiv = CELL_SIZE[0] // PACMAN_SPEED
+        span = self.subdiv * 2
+        walls = np.array([[cell == "wall" for cell in row] for row in tiny], dtype=bool)
+        rows, cols = walls.shape
+        self.tiny_rows, self.tiny_cols = rows, cols
+        self.pacman_moves = np.zeros((4, rows, cols), dtype=bool)
+        for d, (along_rows, additive) in enumerate(((True, -1), (True, span), (False, -1), (False, span))):
+            for x in range(rows):
+                for y in range(cols):
+                    if along_rows:
+                        col = y + additive
+                        if x + span > rows or not -cols <= col < cols:
+                            continue
+                        free = not walls[x:x + span, col].any()
+                    else:
+                        row = x + additive
+                        if y + span > cols or not -rows <= row < rows:
+                            continue
+                        free = not walls[row, y:y + span].any()
+                    self.pacman_moves[d, x, y] = free
+
+    def cell_coords(self, r, c):
+        """get_coords_from_idx: screen x, y of cells (negative indices wrap)."""
+        r = np.where(r < 0, r + self.num_rows, r)
+        c = np.where(c < 0, c + self.num_cols, c)
+        return self.start_x + c * CELL_SIZE[0], self.start_y + r * CELL_SIZE[1]
+
+    def coords_cell(self, x, y):
+        """get_idx_from_coords: (row, col) of screen coordinates."""
+        return (
+            np.floor_divide(y - self.start_y, CELL_SIZE[0]).astype(np.int64),
+            np.floor_divide(x - self.start_x, CELL_SIZE[0]).astype(np.int64),
+        )
+
+
+def _mix64(values):
+    # SplitMix64 finalizer on uint64 arrays (multiplications wrap).
+    values = (values ^ (values >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+    values = (values ^ (values >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+class BatchRandomPolicy:
+    """
+    RandomPolicy for a batch: each game holds a random direction for a while.
+    An int `seed` draws for the whole batch from one generator; a sequence
+    of per-game seeds gives every game its own stream, so a game plays the
+    same whichever batch (or shard) it runs in.
+    """
+
+    def __init__(self, num_envs: int, seed=None, min_hold: int = 8, max_hold: int = 40):
+        if seed is not None and not isinstance(seed, int):
+            if len(seed) != num_envs:
+                raise ValueError(f"Expected {num_envs} game seeds, got {len(seed)}")
+            self._random = None
+            self._keys = _mix64(np.asarray(seed, dtype=np.uint64))
+            self._draws = np.zeros(num_envs, dtype=np.uint64)
+        else:
+            self._random = np.random.default_rng(seed)
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self._next_change = np.zeros(num_envs, dtype=np.int64)
+
+    def __call__(self, frame: int):
+        actions = np.full(len(self._next_change), -1, dtype=np.int8)
+        change = frame >= self._next_change
+        count = int(change.sum())
+        if count and self._random is not None:
+            actions[change] = self._random.integers(0, 4, count)
+            self._next_change[change] = frame + self._random.integers(self.min_hold, self.max_hold + 1, count)
+        elif count:
+            # Counter-based draws: game key mixed with its number of draws.
+            draws = _mix64(self._keys[change] + self._draws[change] * np.uint64(0x9E3779B97F4A7C15))
+            self._draws[change] += np.uint64(1)
+            actions[change] = draws % np.uint64(4)
+            holds = (draws >> np.uint64(2)) % np.uint64(self.max_hold - self.min_hold + 1)
+            self._next_change[change] = frame + self.min_hold + holds.astype(np.int64)
+        return actions
+
+
+class BatchGame:
+    """
+    `num_envs` games of one level, stepped together. Per-game state lives in
+    arrays indexed by game (and ghost, in GHOST_NAMES order); -1 stands for
+    the sprites' None.
+    """
+
+    def __init__(self, num_envs: int, seeds=None, level_number: int = 1, fps: int = 60):
+        if np is None:
+            raise RuntimeError("the batch simulator needs numpy")
+        self.level = level = LevelTables(level_number)
+        self.num_envs = n = num_envs
+        seeds = range(num_envs) if seeds is None else list(seeds)
+        self.rngs = [random.Random(seed) for seed in seeds]
+        self.fps = fps
+        self.frame = 0
+        ghosts = (n, len(GHOST_NAMES))
+        # GameState and HeadlessRun counters.
+        self.ticks = np.zeros(n, dtype=np.int64)
+        self.points = np.full(n, -DOT_POINT, dtype=np.int64)
+        self.highscore = np.zeros(n, dtype=np.int64)
+        self.deaths = np.zeros(n, dtype=np.int64)
+        self.levels_completed = np.zeros(n, dtype=np.int64)
+        self.direction = np.full(n, -1, dtype=np.int8)  # requested by input
+        self.pacman_direction = np.full(n, -1, dtype=np.int8)
+        self.dead = np.zeros(n, dtype=bool)
+        self.level_complete = np.zeros(n, dtype=bool)
+        self.chase = np.zeros(n, dtype=bool)  # ghost_mode: scatter / chase
+        self.powered = np.zeros(n, dtype=bool)
+        self.power_trigger = np.full(n, -1, dtype=np.int64)
+        self.blinky_pos = np.zeros((n, 2), dtype=np.int64)
+        self.dots = np.repeat(level.dots[None], n, axis=0)
+        # Timers of the virtual clock: due tick and interval (0 = off).
+        self.mode_index = np.zeros(n, dtype=np.int64)
+        self.mode_due = np.zeros(n, dtype=np.int64)
+        self.mode_interval = np.zeros(n, dtype=np.int64)
+        self.power_due = np.zeros(n, dtype=np.int64)
+        self.power_interval = np.zeros(n, dtype=np.int64)
+        # Pacman.
+        self.tiny_x = np.zeros(n, dtype=np.int64)
+        self.tiny_y = np.zeros(n, dtype=np.int64)
+        self.pacman_x = np.zeros(n)
+        self.pacman_y = np.zeros(n)
+        self.move_direction = np.full(n, -1, dtype=np.int8)
+        self.collectibles = np.zeros(n, dtype=np.int64)
+        self.pacman_rect = np.zeros((n, 2))  # GameState.pacman_rect x, y
+        # Ghosts.
+        self.released = np.zeros(ghosts, dtype=bool)
+        self.creation_time = np.zeros(ghosts, dtype=np.int64)
+        self.dead_wait = np.zeros(ghosts, dtype=np.int64)
+        self.release_time = np.full(ghosts, -1, dtype=np.int64)
+        self.ghost_x = np.zeros(ghosts)
+        self.ghost_y = np.zeros(ghosts)
+        self.lerp_t = np.zeros(ghosts)
+        self.ghost_direction = np.full(ghosts, -1, dtype=np.int8)
+        self.has_target = np.zeros(ghosts, dtype=bool)
+        self.prev_tile = np.zeros(ghosts + (2,), dtype=np.int64)
+        self.next_tile = np.zeros(ghosts + (2,), dtype=np.int64)
+        self.has_next = np.zeros(ghosts, dtype=bool)
+        self.curr_pos = np.zeros(ghosts + (2,), dtype=np.int64)
+        self.has_curr = np.zeros(ghosts, dtype=bool)
+        self.scared = np.zeros(ghosts, dtype=bool)
+        self.blue = np.zeros(ghosts, dtype=bool)
+        everyone = np.arange(n)
+        self._new_pacman(everyone)
+        self._new_ghosts(everyone)
+        # HeadlessRun.create_ghost_mode_event
+        self.mode_interval[:] = self._next_mode_interval(everyone)
+        self.mode_due[:] = self.ticks + self.mode_interval
+
+    # -- GameState / ScreenManager ---------------------------------------
+
+    def _next_mode_interval(self, envs):
+        times = self.level.mode_times
+        interval = times[np.minimum(self.mode_index[envs], len(times) - 1)]
+        self.mode_index[envs] += 1
+        return interval
+
+    def _new_pacman(self, envs):
+        level = self.level
+        row, col = level.pacman_start
+        self.tiny_x[envs] = row * level.subdiv
+        self.tiny_y[envs] = col * level.subdiv
+        x, y = level.cell_coords(np.int64(row), np.int64(col))
+        self.pacman_x[envs] = x
+        self.pacman_y[envs] = y
+        self.move_direction[envs] = self.direction[envs]
+        counted = (self.dots[envs] != NO_DOT) & level.count_mask
+        self.collectibles[envs] = counted.sum(axis=(1, 2))
+
+    def _new_ghosts(self, envs):
+        for g, name in enumerate(GHOST_NAMES):
+            self.creation_time[envs, g] = self.ticks[envs]
+            self.dead_wait[envs, g] = GHOST_DELAYS[name]
+            self.blue[envs, g] = False
+            self.curr_pos[envs, g] = 0
+            self.has_curr[envs, g] = False
+            self._reset_ghost(envs, g)
+
+    def _reset_ghost(self, envs, g):
+        # Ghost.reset_ghost; the image (blue) and curr_pos are left as they are.
+        level = self.level
+        x, y = level.cell_coords(np.int64(level.ghost_den[0]), np.int64(level.ghost_den[1] + g))
+        self.ghost_x[envs, g] = x
+        self.ghost_y[envs, g] = y
+        self.lerp_t[envs, g] = 0
+        self.ghost_direction[envs, g] = -1
+        self.has_target[envs, g] = False
+        self.has_next[envs, g] = False
+        self.release_time[envs, g] = -1
+        self.scared[envs, g] = False
+        self.released[envs, g] = False
+        self.creation_time[envs, g] = self.ticks[envs]
+
+    def _fire_timers(self):
+        # VirtualClock.pop_events and EventHandler: a timer that fell due k
+        # times fires k events, and each scatter/chase event re-arms it.
+        ticks = self.ticks
+        envs = np.nonzero(self.mode_due <= ticks)[0]
+        if len(envs):
+            fired = (ticks[envs] - self.mode_due[envs]) // self.mode_interval[envs] + 1
+            self.chase[envs] ^= (fired % 2).astype(bool)
+            while len(envs):
+                interval = self._next_mode_interval(envs)
+                self.mode_due[envs] = ticks[envs] + interval
+                self.mode_interval[envs] = interval
+                fired -= 1
+                envs, fired = envs[fired > 0], fired[fired > 0]
+        envs = np.nonzero((self.power_interval > 0) & (self.power_due <= ticks))[0]
+        if len(envs):
+            fired = (ticks[envs] - self.power_due[envs]) // self.power_interval[envs] + 1
+            self.power_due[envs] += fired * self.power_interval[envs]
+            self.powered[envs] = False
+
+    def step(self, actions=None):
+        """Advance every game by one frame."""
+        if actions is not None:
+            actions = np.asarray(actions)
+            pressed = actions >= 0
+            self.direction[pressed] = actions[pressed]
+        self._fire_timers()
+        self.deaths += self.dead
+        self.levels_completed += self.level_complete
+        # ScreenManager.update_screens: pacman_dead_reset, check_level_complete
+        envs = np.nonzero(self.dead)[0]
+        if len(envs):
+            self.dead[envs] = False
+            self.direction[envs] = -1
+            self.pacman_direction[envs] = -1
+            self._new_pacman(envs)
+            self._new_ghosts(envs)
+        envs = np.nonzero(self.level_complete)[0]
+        if len(envs):
+            self.ticks[envs] += LEVEL_WAIT_MS
+            self.dots[envs] = self.level.dots
+            self._new_pacman(envs)
+            self._new_ghosts(envs)
+            self.level_complete[envs] = False
+        self._update_pacman()
+        for g in range(len(GHOST_NAMES)):
+            self._update_ghost(g)
+        np.maximum(self.highscore, self.points, out=self.highscore)
+        self.ticks += step_ms(self.frame, self.fps)
+        self.frame += 1
+
+    # -- Pacman ------------------------------------------------------------
+
+    def _update_pacman(self):
+        level = self.level
+        moves = level.pacman_moves
+        # build_bounding_boxes: the rect, before this step's move.
+        rect_x = rect_round(self.pacman_x)
+        rect_y = rect_round(self.pacman_y)
+        # movement_bind
+        wanted = self.direction
+        ok = (wanted >= 0) & moves[np.maximum(wanted, 0), self.tiny_x, self.tiny_y]
+        self.move_direction[ok] = wanted[ok]
+        self.pacman_direction[ok] = wanted[ok]
+        # move_pacman
+        current = self.move_direction
+        moving = (current >= 0) & moves[np.maximum(current, 0), self.tiny_x, self.tiny_y]
+        for d, (attr, tiny, step) in enumerate((
+            ("pacman_x", "tiny_y", -1),
+            ("pacman_x", "tiny_y", 1),
+            ("pacman_y", "tiny_x", -1),
+            ("pacman_y", "tiny_x", 1),
+        )):
+            envs = moving & (current == d)
+            getattr(self, attr)[envs] += step * PACMAN_SPEED
+            getattr(self, tiny)[envs] += step
+        self.pacman_rect[:, 0] = self.pacman_x
+        self.pacman_rect[:, 1] = self.pacman_y
+        # boundary_check: the tunnel
+        subdiv = level.subdiv
+        right = self.tiny_y + subdiv * 2 >= level.tiny_cols - 1
+        left = ~right & (self.tiny_y - 1 < 0)
+        self.tiny_y[right] = 0
+        self.pacman_x[right] = level.start_x
+        self.tiny_y[left] = level.tiny_cols - subdiv * 3
+        self.pacman_x[left] = level.start_x + (level.tiny_cols - subdiv * 2 - 4) * PACMAN_SPEED
+        # eat_dots, at the pre-move rect
+        row, col = level.coords_cell(rect_x, rect_y)
+        col = np.where(col < 0, col + level.num_cols, col)
+        envs = np.arange(self.num_envs)
+        kind = self.dots[envs, row, col]
+        eaten = kind != NO_DOT
+        if eaten.any():
+            self.dots[envs[eaten], row[eaten], col[eaten]] = NO_DOT
+            self.collectibles[eaten] -= 1
+            self.points[kind == DOT] += DOT_POINT
+            self.points[kind == POWER] += POWER_POINT
+            power = np.nonzero(kind == POWER)[0]
+            # create_power_up_event
+            self.power_due[power] = self.ticks[power] + level.power_up_time
+            self.power_interval[power] = level.power_up_time
+            self.powered[power] = True
+            self.power_trigger[power] = self.ticks[power]
+        self.level_complete |= self.collectibles == 0
+
+    # -- Ghosts ------------------------------------------------------------
+
+    def _update_ghost(self, g):
+        level = self.level
+        # build_bounding_boxes
+        rect_x = rect_round(self.ghost_x[:, g])
+        rect_y = rect_round(self.ghost_y[:, g])
+        # check_is_released
+        envs = np.nonzero(
+            ~self.released[:, g] & (self.ticks - self.creation_time[:, g] > self.dead_wait[:, g])
+        )[0]
+        if len(envs):
+            self.released[envs, g] = True
+            self.dead_wait[envs, g] = GHOST_REDEN_WAIT
+            x, y = level.cell_coords(np.int64(GHOST_RELEASE_ROW), np.int64(level.ghost_den[1] + g))
+            self.ghost_x[envs, g] = x
+            self.ghost_y[envs, g] = y
+            self.release_time[envs, g] = self.ticks[envs]
+        # _boundary_check
+        col = self.next_tile[:, g, 1]
+        self.next_tile[:, g, 1] = np.where(
+            self.has_next[:, g] & (col >= level.num_cols),
+            0,
+            np.where(self.has_next[:, g] & (col < 0), level.num_cols - 1, col),
+        )
+        self._move_ghost(g, np.nonzero(self.released[:, g])[0])
+        # check_if_pacman_powered
+        released = self.released[:, g]
+        self.blue[~released, g] = False
+        active = released & ~((self.power_trigger >= 0) & (self.release_time[:, g] > self.power_trigger))
+        envs = np.nonzero(active & self.powered & ~self.blue[:, g])[0]
+        if len(envs):
+            # make_ghost_scared
+            self.blue[envs, g] = True
+            self.ghost_direction[envs, g] = (self.ghost_direction[envs, g] + 2) % 4
+            self.scared[envs, g] = True
+            self._prepare_movement(g, envs)
+        calm = active & ~self.powered & self.blue[:, g]
+        self.blue[calm, g] = False
+        self.scared[calm, g] = False
+        # check_collisions: half-size rects at the pre-move positions; the
+        # Rect constructor truncates GameState.pacman_rect.
+        half_w, half_h = PACMAN[0] // 2, PACMAN[1] // 2
+        pacman_x = np.trunc(self.pacman_rect[:, 0])
+        pacman_y = np.trunc(self.pacman_rect[:, 1])
+        hit = (
+            (rect_x < pacman_x + half_w) & (pacman_x < rect_x + half_w)
+            & (rect_y < pacman_y + half_h) & (pacman_y < rect_y + half_h)
+        )
+        eaten = np.nonzero(hit & self.scared[:, g])[0]
+        killed = np.nonzero(hit & ~self.scared[:, g])[0]
+        if len(eaten):
+            self._reset_ghost(eaten, g)
+            self.points[eaten] += GHOST_POINT
+        self.dead[killed] = True
+        self.ticks[killed] += DEATH_WAIT_MS
+
+    def _move_ghost(self, g, envs):
+        if not len(envs):
+            return
+        level = self.level
+        fresh = envs[~self.has_target[envs, g]]
+        if len(fresh):
+            self._prepare_movement(g, fresh)
+        x1, y1 = level.cell_coords(self.prev_tile[envs, g, 0], self.prev_tile[envs, g, 1])
+        x2, y2 = level.cell_coords(self.next_tile[envs, g, 0], self.next_tile[envs, g, 1])
+        # lerp, with the sprite's float arithmetic
+        t = self.lerp_t[envs, g]
+        done = t == 1
+        t = np.where(done, t, np.where(t < 1, t + GHOST_ACCELERATE, 1.0))
+        self.lerp_t[envs, g] = t
+        x = np.where(done, x1, (1 - t) * x1 + t * x2)
+        y = np.where(done, y1, (1 - t) * y1 + t * y2)
+        self.ghost_x[envs, g] = x
+        self.ghost_y[envs, g] = y
+        row, col = level.coords_cell(x, y)
+        if GHOST_NAMES[g] == "blinky":
+            self.blinky_pos[envs, 0] = row
+            self.blinky_pos[envs, 1] = col
+        self.curr_pos[envs, g, 0] = row
+        self.curr_pos[envs, g, 1] = col
+        self.has_curr[envs, g] = True
+        arrived = envs[(t == 1) | ((x == x2) & (y == y2))]
+        if not len(arrived):
+            return
+        direction = self.ghost_direction[arrived, g].astype(np.int64)
+        tile = self.next_tile[arrived, g]
+        valid = level.ghost_moves[tile[:, 0], tile[:, 1] + COL_PAD]
+        # get_is_intersection, ignoring the way back
+        choices = valid.sum(axis=1) - valid[np.arange(len(arrived)), (direction + 2) % 4]
+        ahead = valid[np.arange(len(arrived)), direction]
+        straight = (choices <= 1) & ahead
+        envs = arrived[straight]
+        self.prev_tile[envs, g] = tile[straight]
+        self.next_tile[envs, g, 0] = tile[straight, 0] + np.take(GHOST_DR, direction[straight])
+        self.next_tile[envs, g, 1] = tile[straight, 1] + np.take(GHOST_DC, direction[straight])
+        self.lerp_t[envs, g] = 0
+        turning = arrived[~straight]
+        if len(turning):
+            self._prepare_movement(g, turning)
+
+    def _prepare_movement(self, g, envs):
+        level = self.level
+        row, col = level.coords_cell(self.ghost_x[envs, g], self.ghost_y[envs, g])
+        has_next = self.has_next[envs, g]
+        row = np.where(has_next, self.next_tile[envs, g, 0], row)
+        col = np.where(has_next, self.next_tile[envs, g, 1], col)
+        target_row, target_col = self._targets(g, envs)
+        # get_direction: closest next tile to the target, never reversing
+        direction = self.ghost_direction[envs, g].astype(np.int64)
+        back = np.where(direction >= 0, (direction + 2) % 4, -1)
+        valid = level.ghost_moves[row, col + COL_PAD].copy()
+        next_rows = row[:, None] + np.array(GHOST_DR)
+        next_cols = col[:, None] + np.array(GHOST_DC)
+        valid &= (next_rows >= 0) & (next_rows < level.num_rows)
+        valid &= np.arange(4) != back[:, None]
+        if not valid.any(axis=1).all():
+            raise ValueError("Oh my god, I don't know what to do, im crashing the game")
+        distance = (next_rows - target_row[:, None]) ** 2 + (next_cols - target_col[:, None]) ** 2
+        chosen = np.where(valid, distance, np.iinfo(np.int64).max).argmin(axis=1)
+        self.ghost_direction[envs, g] = chosen
+        self.has_target[envs, g] = True
+        self.lerp_t[envs, g] = 0
+        self.next_tile[envs, g, 0] = row + np.take(GHOST_DR, chosen)
+        self.next_tile[envs, g, 1] = col + np.take(GHOST_DC, chosen)
+        self.has_next[envs, g] = True
+        self.prev_tile[envs, g, 0] = row
+        self.prev_tile[envs, g, 1] = col
+
+    def _random_target(self, env):
+        rng = self.rngs[env]
+        return rng.randrange(0, self.level.num_rows), rng.randrange(0, self.level.num_cols)
+
+    def _targets(self, g, envs):
+        # determine_target of each ghost type; scared ghosts pick random tiles.
+        level = self.level
+        name = GHOST_NAMES[g]
+        pacman_row, pacman_col = level.coords_cell(self.pacman_rect[envs, 0], self.pacman_rect[envs, 1])
+        scatter = GHOST_SCATTER_TARGETS[name]
+        target_row = np.full(len(envs), scatter[0], dtype=np.int64)
+        target_col = np.full(len(envs), scatter[1], dtype=np.int64)
+        chase = self.chase[envs]
+        if name == "blinky":
+            chase_row, chase_col = pacman_row, pacman_col
+        elif name == "pinky":
+            chase_row, chase_col = self._ahead_of_pacman(envs, pacman_row, pacman_col, 4)
+        elif name == "inky":
+            ahead_row, ahead_col = self._ahead_of_pacman(envs, pacman_row, pacman_col, 2)
+            blinky_row, blinky_col = self.blinky_pos[envs, 0], self.blinky_pos[envs, 1]
+            chase_row = blinky_row + (ahead_row - blinky_row) * 2
+            chase_col = blinky_col + (ahead_col - blinky_col) * 2
+        else:
+            chase_row, chase_col = pacman_row, pacman_col
+        target_row = np.where(chase, chase_row, target_row)
+        target_col = np.where(chase, chase_col, target_col)
+        randomized = self.scared[envs, g].copy()
+        if name == "clyde":
+            # get_clyde_random_target: random once Pacman is more than 8 tiles away
+            far = (
+                np.abs(pacman_row - self.curr_pos[envs, g, 0])
+                + np.abs(pacman_col - self.curr_pos[envs, g, 1])
+            ) > 8
+            randomized |= chase & self.has_curr[envs, g] & far
+        for i in np.nonzero(randomized)[0]:
+            target_row[i], target_col[i] = self._random_target(envs[i])
+        return target_row, target_col
+
+    def _ahead_of_pacman(self, envs, row, col, look_ahead):
+        # Ghost.get_target_pacman_dir
+        num_cols = self.level.num_cols
+        direction = self.pacman_direction[envs]
+        left_col = np.where(col - look_ahead < 0, num_cols - look_ahead - 1, col - look_ahead)
+        right_col = np.where(col + look_ahead > num_cols, 0, col + look_ahead)
+        target_row = np.select([direction == 2, direction == 3], [row - look_ahead, row + look_ahead], row)
+        target_col = np.select([direction == 0, direction == 1], [left_col, right_col], col)
+        return target_row, target_col
+
+    def report(self) -> dict:
+        return {
+            "games": self.num_envs,
+            "frames": self.frame,
+            "points_mean": round(float(self.points.mean()), 2),
+            "points_max": int(self.points.max()),
+            "deaths": int(self.deaths.sum()),
+            "levels_completed": int(self.levels_completed.sum()),
+        }
+
+
+def run_batch(num_envs: int, frames: int, seed: int = 0, level_number: int = 1, seeds=None) -> dict:
+    """
+    Play `num_envs` games with random input for `frames` steps. The games
+    use `seeds`, by default range(seed * num_envs, (seed + 1) * num_envs).
+    """
+    if seeds is None:
+        seeds = range(seed * num_envs, (seed + 1) * num_envs)
+    game = BatchGame(num_envs, seeds, level_number)
+    policy = BatchRandomPolicy(num_envs, list(seeds))
+    started = time.perf_counter()
+    for frame in range(frames):
+        game.step(policy(frame))
+    report = game.report()
+    report["wall_s"] = round(time.perf_counter() - started, 3)
+    return report
+
+
+def _run_shard(args):
+    return run_batch(*args)
+
+
+def shard_seeds(num_envs: int, processes: int, seed: int = 0):
+    """Split run_batch's game seeds into `processes` consecutive ranges."""
+    ranges = []
+    start = seed * num_envs
+    for index in range(processes):
+        size = num_envs // processes + (index < num_envs % processes)
+        ranges.append(range(start, start + size))
+        start += size
+    return ranges
+
+
+def run_sharded(num_envs: int, frames: int, processes: int = None, seed: int = 0, level_number: int = 1) -> dict:
+    """
+    run_batch split over a process pool, one shard of games per process;
+    returns the combined report with game steps per second. The games are
+    those of run_batch(num_envs, frames, seed), whatever the process count.
+    """
+    processes = max(1, min(processes or multiprocessing.cpu_count(), num_envs))
+    shards = [
+        (len(seeds), frames, seed, level_number, seeds)
+        for seeds in shard_seeds(num_envs, processes, seed)
+    ]
+    started = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        reports = pool.map(_run_shard, shards)
+    elapsed = time.perf_counter() - started
+    games = sum(report["games"] for report in reports)
+    return {
+        "games": games,
+        "frames": frames,
+        "processes": processes,
+        "points_mean": round(sum(r["points_mean"] * r["games"] for r in reports) / games, 2),
+        "points_max": max(report["points_max"] for report in reports),
+        "deaths": sum(report["deaths"] for report in reports),
+        "levels_completed": sum(report["levels_completed"] for report in reports),
+        "wall_s": round(elapsed, 3),
+        "game_steps_per_s": round(games * frames / elapsed),
+    }
@@ -1,7 +1,6 @@
 from pygame import (K_DOWN, K_ESCAPE, K_LEFT, K_RIGHT, K_SPACE, K_UP, KEYDOWN,
                     QUIT, K_q)
 from pygame import USEREVENT
-from pygame.time import set_timer
 
 class EventHandler:
     def __init__(self, screen, game_state):
@@ -35,7 +34,7 @@ class EventHandler:
             elif curr_mode == 'chase':
                 self._game_screen.ghost_mode = 'scatter'
             CUSTOM_EVENT = USEREVENT + 1
-            set_timer(CUSTOM_EVENT, 
+            self._game_screen.clock.set_timer(CUSTOM_EVENT, 
                                 self._game_screen.mode_change_events * 1000)
             self._game_screen.custom_event = CUSTOM_EVENT
         
@@ -1,4 +1,5 @@
 from src.configs import DOT_POINT
+from src.game.time_source import WallClock
 
 class GameState:
     def __init__(self):
@@ -25,6 +26,16 @@ class GameState:
         self._mins_played = 0
         self._points = -DOT_POINT
         self._level_complete = False
+        self._clock = WallClock()
+
+    @property
+    def clock(self):
+        """Time source of the game logic: ticks, timers and waits."""
+        return self._clock
+
+    @clock.setter
+    def clock(self, val):
+        self._clock = val
 
     @property
     def level_complete(self):
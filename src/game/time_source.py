@@ -0,0 +1,85 @@
+import pygame
+
+
+def step_ms(step: int, rate: int) -> int:
+    """
+    Length in milliseconds of fixed step `step` at `rate` steps per second,
+    rounded so that the steps add up to exact seconds without drift.
+    """
+    return (step + 1) * 1000 // rate - step * 1000 // rate
+
+
+class WallClock:
+    """
+    pygame's real clock: milliseconds since pygame.init(), timers posted to
+    the event queue and blocking waits.
+    """
+
+    def get_ticks(self) -> int:
+        return pygame.time.get_ticks()
+
+    def set_timer(self, event_type: int, millis: int):
+        pygame.time.set_timer(event_type, millis)
+
+    def wait(self, millis: int):
+        pygame.time.wait(millis)
+
+
+class VirtualClock:
+    """
+    Simulated milliseconds, advanced only by the caller. Timers fire from
+    pop_events() once virtual time reaches them and waits just move the
+    clock forward, so nothing here ever sleeps.
+    """
+
+    def __init__(self, start: int = 0):
+        self.ticks = start
+        self._timers = {}  # event type -> (due tick, interval)
+
+    def get_ticks(self) -> int:
+        return self.ticks
+
+    def advance(self, millis: int):
+        self.ticks += millis
+
+    def wait(self, millis: int):
+        self.advance(millis)
+
+    def set_timer(self, event_type: int, millis: int):
+        # Same contract as pygame.time.set_timer: repeats until reset, 0 stops.
+        if millis <= 0:
+            self._timers.pop(event_type, None)
+        else:
+            self._timers[event_type] = (self.ticks + millis, millis)
+
+    def pop_events(self) -> list:
+        """Timer events that became due, in firing order."""
+        fired = []
+        for event_type, (due, interval) in list(self._timers.items()):
+            while due <= self.ticks:
+                fired.append((due, event_type))
+                due += interval
+            self._timers[event_type] = (due, interval)
+        fired.sort()
+        return [pygame.event.Event(event_type) for _, event_type in fired]
+
+
+class SteppedClock(VirtualClock):
+    """
+    Virtual clock of a fixed-timestep loop in front of a player: wait()
+    still blocks for real (the pause after a death), and take_waited()
+    tells the loop how long, so that time is not simulated twice.
+    """
+
+    def __init__(self, start: int = 0):
+        super().__init__(start)
+        self._waited = 0
+
+    def wait(self, millis: int):
+        super().wait(millis)
+        pygame.time.wait(millis)
+        self._waited += millis
+
+    def take_waited(self) -> int:
+        waited, self._waited = self._waited, 0
+        return waited
@@ -1,5 +1,8 @@
 import json
 
+from pygame import Surface
+from pygame.rect import Rect
+
 from src.configs import *
 from src.sprites.pacman import Pacman
 from src.sprites.ghosts import GhostManager
@@ -9,6 +12,10 @@ from src.utils.draw_utils import (draw_circle, draw_debug_rects, draw_rect)
 from src.log_handle import get_logger
 logger = get_logger(__name__)
 
+# Cells that never change during a level, and the ones Pacman.eat_dots empties.
+STATIC_CELLS = ("wall", "elec")
+COLLECTIBLE_CELLS = ("dot", "power")
+
 class PacmanGrid:
     def __init__(self, screen, game_state):
         logger.info("initializing pacman grid")
@@ -23,8 +30,12 @@ class PacmanGrid:
         }
         self._screen = screen
         self._game_state = game_state
+        self._dirty_rects = []
+        self._full_redraw = True
+        self._drawn = False
         self._level_number = self._game_state.level
         self.load_level(self._level_number)
+        self.build_layers()
         logger.info("level loaded")
         self.pacman = Pacman(
             self._screen,
@@ -42,6 +53,11 @@ class PacmanGrid:
         )
         logger.info("pacman created")
         
+    @property
+    def matrix(self):
+        """Level cells; eaten dots and pellets are set to "void" in place."""
+        return self._matrix
+
     def get_json(self, path):
         with open(path) as fp:
             payload = json.load(fp)
@@ -82,36 +98,98 @@ class PacmanGrid:
             kwargs["y"],
             kwargs["w"],
             kwargs["h"],
-            self._screen,
+            kwargs["surface"],
             Colors.WALL_BLUE,
         )
 
     def draw_dot(self, **kwargs):
         dot_x = kwargs["x"] + kwargs["w"]
         dot_y = kwargs["y"] + kwargs["h"]
-        draw_rect(dot_x, dot_y, 2, 2, self._screen, Colors.WHITE)
+        draw_rect(dot_x, dot_y, 2, 2, kwargs["surface"], Colors.WHITE)
 
-    def draw_special_point(self): ...
+    def draw_special_point(self, **kwargs): ...
 
     def draw_power(self, **kwargs):
         circle_x = kwargs["x"] + kwargs["w"]
         circle_y = kwargs["y"] + kwargs["h"]
-        draw_circle(circle_x, circle_y, 3, self._screen, Colors.YELLOW)
+        draw_circle(circle_x, circle_y, 3, kwargs["surface"], Colors.YELLOW)
 
     def draw_elec(self, **kwargs):
-        draw_rect(kwargs["x"], kwargs["y"], kwargs["w"], 1, self._screen, Colors.RED)
+        draw_rect(kwargs["x"], kwargs["y"], kwargs["w"], 1, kwargs["surface"], Colors.RED)
+
+    def build_layers(self):
+        """
+        Pre-render the level into two black-keyed layers: walls and the
+        electric gate, which never change, and the dots and power pellets,
+        which are only repainted where Pacman.eat_dots empties a cell.
+        """
+        self._static_layer = self._new_layer()
+        self._collectible_layer = self._new_layer()
+        self.paint_cells(self._static_layer, STATIC_CELLS)
+        self.paint_cells(self._collectible_layer, COLLECTIBLE_CELLS)
+
+    def _new_layer(self):
+        layer = Surface(self._screen.get_size())
+        layer.fill(Colors.BLACK)
+        layer.set_colorkey(Colors.BLACK)
+        return layer
+
+    def paint_cells(self, surface, kinds, rows=None, cols=None):
+        rows = range(self.num_rows) if rows is None else rows
+        cols = range(self.num_cols) if cols is None else cols
+        for r in rows:
+            for c in cols:
+                cell = self._matrix[r][c]
+                if cell in kinds:
+                    x, y = self._coord_matrix[r][c]
+                    self.function_mapper[cell](
+                        x=x, y=y, w=CELL_SIZE[0], h=CELL_SIZE[0], surface=surface
+                    )
 
     def draw_level(self):
-        curr_x, curr_y = self.start_x, self.start_y
-        for _, row in enumerate(self._matrix):
-            for _, col in enumerate(row):
-                draw_func = self.function_mapper[col]
-                draw_func(x=curr_x, y=curr_y, w=CELL_SIZE[0], h=CELL_SIZE[0])
-                curr_x += CELL_SIZE[0]
-            curr_x = self.start_x
-            curr_y += CELL_SIZE[0]
+        self._drawn = True
+        self.collect_eaten_cells()
+        # Collectibles go underneath: a wall drawn after a neighbouring dot
+        # or pellet covers its overhang, as in a cell-by-cell redraw.
+        self._screen.blit(self._collectible_layer, (0, 0))
+        self._screen.blit(self._static_layer, (0, 0))
+
+    def collect_eaten_cells(self):
+        # Cells eaten since the previous draw are repainted by this one.
+        w = h = CELL_SIZE[0]
+        layer = self._collectible_layer
+        for r, c in self.pacman.eaten_cells:
+            x, y = self._coord_matrix[r][c]
+            # Dots and power pellets are drawn around the cell's far corner.
+            rect = Rect(x + w - 3, y + h - 3, 7, 7)
+            self._dirty_rects.append(rect)
+            # Clear the cell and repaint the neighbours overlapping its rect.
+            layer.set_clip(rect)
+            layer.fill(Colors.BLACK)
+            self.paint_cells(
+                layer,
+                COLLECTIBLE_CELLS,
+                range(max(0, r - 2), min(self.num_rows, r + 3)),
+                range(max(0, c - 2), min(self.num_cols, c + 3)),
+            )
+            layer.set_clip(None)
+        self.pacman.eaten_cells.clear()
+
+    def pop_dirty_rects(self):
+        """
+        Screen rects repainted differently since the last call, or None until
+        the whole level has been drawn for the first time.
+        """
+        rects = self._dirty_rects
+        self._dirty_rects = []
+        if self._full_redraw:
+            if self._drawn:
+                self._full_redraw = False
+            return None
+        return rects
 
     def reset_stage(self):
+        self.collect_eaten_cells()
         self.pacman = Pacman(
             self._screen,
             self._game_state,
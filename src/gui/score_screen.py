@@ -1,3 +1,5 @@
+from collections import OrderedDict
+
 from pygame.surface import Surface
 from pygame import font
 
@@ -5,6 +7,8 @@ from src.game.state_management import GameState
 from src.configs import *
 from src.utils.coord_utils import place_elements_offset
 
+TEXT_CACHE_SIZE = 8  # rendered strings kept; the score texts change rarely
+
 class ScoreScreen:
     def __init__(self,
                  screen: Surface,
@@ -21,13 +25,42 @@ class ScoreScreen:
         )
         font.init()
         self.font = font.Font(None, 16)
+        self._last_texts = {}
+        self._dirty_rects = []
+        self._text_cache: "OrderedDict[str, Surface]" = OrderedDict()
 
     def draw_scores(self):
         score_text = "SCORE: " + str(self._game_state.points)
-        score_surface = self.font.render(score_text, True, Colors.WHITE)
-        self._screen.blit(score_surface, (self.start_x, self.start_y))
+        score_surface = self._render_text(score_text)
+        score_rect = self._screen.blit(score_surface, (self.start_x, self.start_y))
+        self._track_text("score", score_text, score_rect)
 
         highscore_text = "HIGHSCORE: "+str(self._game_state.highscore)
-        hs_surface = self.font.render(highscore_text, True, Colors.WHITE)
-        self._screen.blit(hs_surface, (self.start_x + 300, self.start_y))
+        hs_surface = self._render_text(highscore_text)
+        hs_rect = self._screen.blit(hs_surface, (self.start_x + 300, self.start_y))
+        self._track_text("highscore", highscore_text, hs_rect)
+
+    def _render_text(self, text):
+        # Glyph rasterization is costly; only new strings are rendered.
+        surface = self._text_cache.get(text)
+        if surface is None:
+            surface = self.font.render(text, True, Colors.WHITE)
+            self._text_cache[text] = surface
+            if len(self._text_cache) > TEXT_CACHE_SIZE:
+                self._text_cache.popitem(last=False)
+        else:
+            self._text_cache.move_to_end(text)
+        return surface
+
+    def _track_text(self, key, text, rect):
+        last = self._last_texts.get(key)
+        if last is None or last[0] != text:
+            # Cover the old text too, a shorter string leaves it uncovered.
+            self._dirty_rects.append(rect.union(last[1]) if last else rect)
+            self._last_texts[key] = (text, rect)
+
+    def pop_dirty_rects(self):
+        rects = self._dirty_rects
+        self._dirty_rects = []
+        return rects
         
\ No newline at end of file
@@ -4,8 +4,6 @@ from src.gui.loading_screen import LoadingScreen
 from src.gui.score_screen import ScoreScreen
 from src.log_handle import get_logger
 
-from pygame.time import wait
-
 logger = get_logger(__name__)
 
 class ScreenManager:
@@ -35,7 +33,7 @@ class ScreenManager:
     
     def check_level_complete(self):
         if self._game_state.level_complete:
-            wait(2000)
+            self._game_state.clock.wait(2000)
             self.all_sprites.empty()
             self.pacman = PacmanGrid(self._screen, self._game_state)
             self.score_screen = ScoreScreen(self._screen, self._game_state)
@@ -45,8 +43,27 @@ class ScreenManager:
                 self.all_sprites.add(ghost)
             self._game_state.level_complete = False
 
+    def pop_dirty_rects(self):
+        """
+        Rects of the grid and score layers that changed since the last call,
+        or None when the whole screen has to be considered dirty.
+        """
+        grid_rects = self.pacman.pop_dirty_rects()
+        score_rects = self.score_screen.pop_dirty_rects()
+        if grid_rects is None:
+            return None
+        return grid_rects + score_rects
+
+    def update_screens(self):
+        """Per logic step: Pacman's death and level completion."""
+        self.pacman_dead_reset()
+        self.check_level_complete()
+
+    def discard_drawing(self):
+        """Drop what draw_screens would repaint, for runs that never draw."""
+        self.pacman.collect_eaten_cells()
+        self.pop_dirty_rects()
+
     def draw_screens(self):
         self.pacman.draw_level()
-        self.pacman_dead_reset()
         self.score_screen.draw_scores()
-        self.check_level_complete()
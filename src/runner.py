@@ -6,12 +6,22 @@ import json
 from src.configs import *
 from src.game.event_management import EventHandler
 from src.game.state_management import GameState
+from src.game.time_source import SteppedClock, step_ms
 from src.gui.screen_management import ScreenManager
 from src.sounds import SoundManager
 from src.utils.screen_streamer import ScreenStreamer
+from src.utils.stream_profiles import MultiStreamer
+from src.utils.vector_trace import IvrayWriter, MazeTracer
 from src.log_handle import get_logger
 logger = get_logger(__name__)
 
+# Real time one rendered frame may hand to the simulation; after a longer
+# stall the game slows down instead of running a burst of catch-up steps.
+MAX_FRAME_LAG_MS = 250
+# Sprites that moved further in one step (tunnel wrap, respawn) are drawn
+# where they are instead of being interpolated across the maze.
+MAX_INTERPOLATION_PX = CELL_SIZE[0] * 2
+
 class GameRun:
     def __init__(
         self,
@@ -20,6 +30,28 @@ class GameRun:
         stream_serial=None,
         stream_serial_baud: int = 115200,
         bw_mode: bool = False,
+        delta_mode: bool = False,
+        keyframe_interval: int = 60,
+        send_queue_size: int = 8,
+        send_policy: str = "drop-oldest",
+        server_mode: str = "threads",
+        stream_pipeline: bool = False,
+        stream_adaptive: bool = False,
+        stream_target_latency: float = 0.25,
+        compact_stream: bool = False,
+        stream_compression=None,
+        stream_compression_level: int = 6,
+        stream_timestamps: bool = False,
+        stream_stats_path=None,
+        stream_capture_path=None,
+        stream_profiles=None,
+        bw_threshold: int = ScreenStreamer.BW_THRESHOLD,
+        bw_dither: str = "none",
+        vector_stream: bool = False,
+        vector_ivray_path=None,
+        vector_scale: int = 1,
+        logic_rate=None,
+        render_fps=None,
     ):
         logger.info("About to initialize pygame")
         pygame.init()
@@ -27,25 +59,134 @@ class GameRun:
         pygame.display.set_caption("Py-Pacman")
         logger.info("pygame initialized")
         self.game_state = GameState()
+        # Game logic runs in fixed steps on a virtual clock; rendering and
+        # streaming run once per displayed frame, at their own rate.
+        self.logic_clock = SteppedClock()
+        self.game_state.clock = self.logic_clock
+        self.logic_rate = logic_rate or self.game_state.fps
+        if render_fps:
+            self.game_state.fps = render_fps
+        self.logic_step = 0
+        self._prev_positions = {}
         logger.info("game state object created")
         self.events = EventHandler(self.screen, self.game_state)
         logger.info("event handler object created")
-        self.all_sprites = pygame.sprite.Group()
+        # RenderUpdates.draw() reports the rects each sprite touched, which
+        # feeds dirty-rect streaming.
+        self.all_sprites = pygame.sprite.RenderUpdates()
         self.gui = ScreenManager(self.screen, self.game_state, self.all_sprites)
         logger.info("screen manager object created")
         self.streamer = None
-        if enable_stream and (stream_port or stream_serial):
+        self.stream_target_latency = stream_target_latency
+        # Vector mode: beam paths traced from the level matrix and sprite
+        # positions, streamed instead of raster frames and/or saved as IVRY.
+        self.vector_stream = vector_stream
+        self.vector_tracer = None
+        self.ivray_writer = None
+        if vector_stream and stream_profiles:
+            raise ValueError("vector streaming does not support stream profiles")
+        if vector_stream or vector_ivray_path:
+            self.vector_tracer = MazeTracer(CELL_SIZE[0], vector_scale)
+        if vector_ivray_path:
+            self.ivray_writer = IvrayWriter(vector_ivray_path)
+        stream_scale = vector_scale if vector_stream else 1
+        stream_options = dict(
+            serial_baud=stream_serial_baud,
+            bw_mode=bw_mode,
+            bw_threshold=bw_threshold,
+            dither=bw_dither,
+            delta_mode=delta_mode,
+            keyframe_interval=keyframe_interval,
+            send_queue_size=send_queue_size,
+            send_policy=send_policy,
+            server_mode=server_mode,
+            adaptive=stream_adaptive,
+            target_latency=stream_target_latency,
+            compact=compact_stream,
+            compression=stream_compression,
+            compression_level=stream_compression_level,
+            timestamps=stream_timestamps,
+            stats_path=stream_stats_path,
+        )
+        if enable_stream and stream_profiles:
+            # One render, several outputs (resolution / mode / transport each).
+            self.streamer = MultiStreamer(
+                SCREEN_WIDTH, SCREEN_HEIGHT, stream_profiles, **stream_options
+            )
+            self.streamer.start()
+            logger.info("Screen streamer started")
+        elif enable_stream and (stream_port or stream_serial):
             self.streamer = ScreenStreamer(
-                SCREEN_WIDTH,
-                SCREEN_HEIGHT,
+                SCREEN_WIDTH * stream_scale,
+                SCREEN_HEIGHT * stream_scale,
                 tcp_port=stream_port,
                 serial_path=stream_serial,
-                serial_baud=stream_serial_baud,
-                bw_mode=bw_mode,
+                pipeline=stream_pipeline,
+                capture_path=stream_capture_path,
+                **stream_options,
             )
             self.streamer.start()
             logger.info("Screen streamer started")
 
+    def stream_stats(self) -> dict:
+        """Target latency plus the adaptive streamer's current decisions."""
+        stats = {"target_latency_ms": round(self.stream_target_latency * 1000, 1)}
+        if self.streamer:
+            stats.update(self.streamer.adaptive_stats())
+        return stats
+
+    def trace_vectors(self):
+        """Trace the current frame into beam vectors (and the IVRY file)."""
+        grid = self.gui.pacman
+        start, vectors = self.vector_tracer.trace(
+            grid.matrix,
+            (grid.start_x, grid.start_y),
+            [ghost.rect for ghost in grid.ghost.ghosts_list],
+            grid.pacman.rect,
+        )
+        if self.ivray_writer:
+            self.ivray_writer.write_frame(vectors)
+        return start, vectors
+
+    def update_logic(self):
+        """Advance the game by one fixed step of the virtual clock."""
+        self.game_state.current_time = self.logic_clock.get_ticks()
+        for event in self.logic_clock.pop_events():
+            self.events.handle_events(event)
+        self.gui.update_screens()
+        self._prev_positions = {
+            sprite: sprite.rect.topleft for sprite in self.all_sprites
+        }
+        dt = step_ms(self.logic_step, self.logic_rate)
+        self.all_sprites.update(dt / 100)
+        self.check_highscores()
+        self.logic_clock.advance(dt)
+        self.logic_step += 1
+
+    def draw_sprites(self, alpha: float):
+        """
+        Draw the sprites `alpha` of the way from their position before the
+        last logic step to the current one; returns the touched rects.
+        """
+        moved = []
+        for sprite in self.all_sprites:
+            prev = self._prev_positions.get(sprite)
+            if prev is None:
+                continue
+            x, y = sprite.rect.topleft
+            prev_x, prev_y = prev
+            if abs(x - prev_x) + abs(y - prev_y) > MAX_INTERPOLATION_PX:
+                continue
+            moved.append((sprite, (x, y)))
+            sprite.rect.topleft = (
+                round(prev_x + (x - prev_x) * alpha),
+                round(prev_y + (y - prev_y) * alpha),
+            )
+        rects = self.all_sprites.draw(self.screen)
+        for sprite, position in moved:
+            sprite.rect.topleft = position
+        return rects
+
     def initialize_highscore(self):
         with open("levels/stats.json") as fp:
             stats = json.load(fp)
@@ -54,7 +195,7 @@ class GameRun:
     
     def create_ghost_mode_event(self):
         CUSTOM_EVENT = pygame.USEREVENT + 1
-        pygame.time.set_timer(CUSTOM_EVENT, 
+        self.logic_clock.set_timer(CUSTOM_EVENT, 
                               self.game_state.mode_change_events * 1000)
         self.game_state.custom_event = CUSTOM_EVENT
 
@@ -77,26 +218,49 @@ class GameRun:
             
     def main(self):
         clock = pygame.time.Clock()
-        dt = None
         self.create_ghost_mode_event()
         self.initialize_sounds()
         self.initialize_highscore()
+        lag = 0
+        last_ticks = pygame.time.get_ticks()
         while self.game_state.running:
-            self.game_state.current_time = pygame.time.get_ticks()
+            # Input and quit come from pygame; game timers from the logic clock.
             for event in pygame.event.get():
                 self.events.handle_events(event)
+            ticks = pygame.time.get_ticks()
+            elapsed = ticks - last_ticks - self.logic_clock.take_waited()
+            lag += min(max(elapsed, 0), MAX_FRAME_LAG_MS)
+            last_ticks = ticks
+            while self.game_state.running and lag >= step_ms(self.logic_step, self.logic_rate):
+                lag -= step_ms(self.logic_step, self.logic_rate)
+                self.update_logic()
             self.screen.fill(Colors.BLACK)
             self.gui.draw_screens()
-            self.all_sprites.draw(self.screen)
-            self.all_sprites.update(dt)
-            self.check_highscores()
+            sprite_rects = self.draw_sprites(lag / step_ms(self.logic_step, self.logic_rate))
+            dirty_rects = self.gui.pop_dirty_rects()
+            if dirty_rects is not None:
+                dirty_rects.extend(sprite_rects)
             pygame.display.flip()
+            vector_frame = self.trace_vectors() if self.vector_tracer else None
             if self.streamer:
-                self.streamer.send_surface(self.screen)
-            dt = clock.tick(self.game_state.fps)
-            dt /= 100
+                if self.vector_stream:
+                    self.streamer.send_vectors(*vector_frame)
+                else:
+                    self.streamer.send_surface(self.screen, dirty_rects)
+            clock.tick(self.game_state.fps)
         self.update_highscore()
+        if self.ivray_writer:
+            self.ivray_writer.close()
+            logger.info("IVRY vector table written: %d frames", self.ivray_writer.frame_count)
         if self.streamer:
+            for stats in self.streamer.sender_stats():
+                logger.info("stream sender stats: %s", stats)
+            if self.streamer.pipeline:
+                logger.info("stream pipeline stats: %s", self.streamer.pipeline_stats())
+            if self.streamer.compression:
+                logger.info("stream compression stats: %s", self.streamer.compression_stats())
+            if self.streamer.adaptive:
+                logger.info("stream adaptive stats: %s", self.stream_stats())
             self.streamer.stop()
         pygame.quit()
         sys.exit()
@@ -0,0 +1,149 @@
+"""
+Headless simulation of the game: the same GameState, Pacman and
+GhostManager logic as GameRun, driven by a virtual clock with no window,
+no drawing, no audio and no sleeps. Input comes from a policy, a callable
+(frame, game_state) -> direction ("l", "r", "u", "d") or None to keep the
+current one.
+"""
+import os
+import random
+import time
+
+import pygame
+from pygame import K_DOWN, K_LEFT, K_RIGHT, K_UP, KEYDOWN
+
+from src.configs import *
+from src.game.event_management import EventHandler
+from src.game.state_management import GameState
+from src.game.time_source import VirtualClock, step_ms
+from src.gui.screen_management import ScreenManager
+from src.sounds import SoundManager
+from src.log_handle import get_logger
+logger = get_logger(__name__)
+
+DIRECTION_KEYS = {"l": K_LEFT, "r": K_RIGHT, "u": K_UP, "d": K_DOWN}
+
+
+class RandomPolicy:
+    """Picks a random direction and holds it for a random number of frames."""
+
+    def __init__(self, seed=None, min_hold: int = 8, max_hold: int = 40):
+        self._random = random.Random(seed)
+        self.min_hold = min_hold
+        self.max_hold = max_hold
+        self._next_change = 0
+
+    def __call__(self, frame, game_state):
+        if frame < self._next_change:
+            return None
+        self._next_change = frame + self._random.randint(self.min_hold, self.max_hold)
+        return self._random.choice("lrud")
+
+
+class ScriptedPolicy:
+    """Presses the scripted direction at each listed frame."""
+
+    def __init__(self, steps):
+        self.steps = dict(steps)
+
+    def __call__(self, frame, game_state):
+        return self.steps.get(frame)
+
+
+def load_input_script(path: str) -> ScriptedPolicy:
+    """
+    Read an input script: one "frame direction" pair per line, e.g. "120 u";
+    blank lines and lines starting with # are ignored.
+    """
+    steps = []
+    with open(path) as fp:
+        for number, line in enumerate(fp, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                frame, direction = line.split()
+                frame = int(frame)
+            except ValueError:
+                raise ValueError(f"{path}:{number}: expected 'frame direction', got {line!r}") from None
+            if direction not in DIRECTION_KEYS:
+                raise ValueError(f"{path}:{number}: unknown direction {direction!r}")
+            steps.append((frame, direction))
+    return ScriptedPolicy(steps)
+
+
+class HeadlessRun:
+    """
+    GameRun's loop without rendering or real time: every step advances the
+    virtual clock by one frame at game_state.fps and runs as fast as the
+    CPU allows. `seed` seeds the ghosts' random targets (the global random
+    module) so runs with the same seed and input repeat exactly.
+    """
+
+    def __init__(self, policy=None, seed=None):
+        # Sprites load their images with convert_alpha(), which needs a
+        # display surface; the dummy driver gives one without a window.
+        os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+        pygame.display.init()
+        self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+        SoundManager().muted = True
+        if seed is not None:
+            random.seed(seed)
+        self.policy = policy if policy is not None else RandomPolicy(seed)
+        self.clock = VirtualClock()
+        self.game_state = GameState()
+        self.game_state.clock = self.clock
+        self.events = EventHandler(self.screen, self.game_state)
+        self.all_sprites = pygame.sprite.Group()
+        self.gui = ScreenManager(self.screen, self.game_state, self.all_sprites)
+        self.frame = 0
+        self.deaths = 0
+        self.levels_completed = 0
+        self.create_ghost_mode_event()
+
+    def create_ghost_mode_event(self):
+        CUSTOM_EVENT = pygame.USEREVENT + 1
+        self.clock.set_timer(CUSTOM_EVENT,
+                             self.game_state.mode_change_events * 1000)
+        self.game_state.custom_event = CUSTOM_EVENT
+
+    def step(self):
+        """Advance the game by one frame."""
+        self.game_state.current_time = self.clock.get_ticks()
+        events = self.clock.pop_events()
+        direction = self.policy(self.frame, self.game_state)
+        if direction:
+            events.append(pygame.event.Event(KEYDOWN, key=DIRECTION_KEYS[direction]))
+        for event in events:
+            self.events.handle_events(event)
+        if self.game_state.is_pacman_dead:
+            self.deaths += 1
+        if self.game_state.level_complete:
+            self.levels_completed += 1
+        self.gui.update_screens()
+        self.gui.discard_drawing()
+        frame_ms = step_ms(self.frame, self.game_state.fps)
+        self.all_sprites.update(frame_ms / 100)
+        if self.game_state.points > self.game_state.highscore:
+            self.game_state.highscore = self.game_state.points
+        self.clock.advance(frame_ms)
+        self.frame += 1
+
+    def run(self, frames: int) -> dict:
+        """Run `frames` steps (or until the game stops running); returns a report."""
+        started = time.perf_counter()
+        start_frame = self.frame
+        while self.frame - start_frame < frames and self.game_state.running:
+            self.step()
+        elapsed = time.perf_counter() - started
+        steps = self.frame - start_frame
+        return {
+            "frames": steps,
+            "virtual_s": round(self.clock.get_ticks() / 1000, 3),
+            "wall_s": round(elapsed, 3),
+            "fps": round(steps / elapsed, 1) if elapsed else None,
+            "points": self.game_state.points,
+            "deaths": self.deaths,
+            "levels_completed": self.levels_completed,
+            "dots_left": self.gui.pacman.pacman.collectibles,
+        }
@@ -15,8 +15,10 @@ class SoundManager:
             self._sounds = {}
             self._channels = {}
             self._background_music = None
+            self.muted = False
             pygame.mixer.pre_init()
-            pygame.mixer.set_num_channels(64)
+            if pygame.mixer.get_init():
+                pygame.mixer.set_num_channels(64)
             # pygame.mixer.init()
     
     def load_sound(self, name, filepath, 
@@ -32,6 +34,8 @@ class SoundManager:
 
     def play_sound(self, name):
         """Plays a specific sound effect."""
+        if self.muted:
+            return
         if name in self._sounds:
             # if not pygame.mixer.get_busy():
                 now = pygame.time.get_ticks()
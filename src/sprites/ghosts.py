@@ -12,8 +12,6 @@ from abc import abstractmethod, ABC
 from pygame.sprite import Sprite
 from pygame import Surface
 from pygame import image, transform
-import pygame.time as pytime
-from pygame.time import wait
 from pygame.rect import Rect
 
 import random
@@ -45,7 +43,7 @@ class Ghost(Sprite, ABC):
         self.num_cols = len(self._matrix[0])
         self._game_state = game_state
         self._is_released = False
-        self._creation_time = pytime.get_ticks()
+        self._creation_time = self._game_state.clock.get_ticks()
         self._dead_wait = GHOST_DELAYS[self.name]
         self.move_direction_mapper = {"up": (-1, 0), "down":(2, 0), 
                                       "right": (0, 2), "left": (0, -1)}
@@ -106,12 +104,12 @@ class Ghost(Sprite, ABC):
     def check_is_released(self):
         if self._is_released:
             return
-        curr_time = pytime.get_ticks()
+        curr_time = self._game_state.clock.get_ticks()
         if (curr_time - self._creation_time) > self._dead_wait:
             self._is_released = True
             self._dead_wait = 1500
             self.rect_x, self.rect_y = self._get_coords_from_idx((11, self._ghost_matrix_pos[1]))
-            self.release_time = pytime.get_ticks()
+            self.release_time = self._game_state.clock.get_ticks()
 
     def move_ghost(self):
         if not self._is_released:
@@ -252,7 +250,7 @@ class Ghost(Sprite, ABC):
         self.rect_x = x
         self.rect_y = y
         self._is_released = False
-        self._creation_time = pytime.get_ticks()
+        self._creation_time = self._game_state.clock.get_ticks()
 
     def check_collisions(self):
         ghost_rect = Rect(self.rect.x, self.rect.y, 
@@ -270,7 +268,7 @@ class Ghost(Sprite, ABC):
             else:
                 self._game_state.is_pacman_dead = True
                 self.sounds.play_sound("death")
-                wait(1000)
+                self._game_state.clock.wait(1000)
 
     def update(self, dt):
         self.build_bounding_boxes(self.rect_x, self.rect_y)
@@ -3,7 +3,6 @@ from math import ceil
 from pygame import image, transform
 from pygame.sprite import Sprite
 from pygame import Surface, USEREVENT
-from pygame.time import set_timer, get_ticks
 
 from src.configs import CELL_SIZE, PACMAN_SPEED, PACMAN, DOT_POINT, POWER_POINT
 from src.game.state_management import GameState
@@ -37,6 +36,7 @@ class Pacman(Sprite):
         self.frame_delay = 5
         self.sound = SoundManager()
         self.collectibles = self.count_dots_powers()
+        self.eaten_cells = []  # matrix cells emptied since the last grid draw
 
     def count_dots_powers(self):
         collectibles = 0
@@ -147,11 +147,11 @@ class Pacman(Sprite):
 
     def create_power_up_event(self):
         CUSTOM_EVENT = USEREVENT + 2
-        set_timer(CUSTOM_EVENT, 
+        self.game_state.clock.set_timer(CUSTOM_EVENT, 
                 self.game_state.scared_time)
         self.game_state.power_up_event = CUSTOM_EVENT
         self.game_state.is_pacman_powered = True
-        self.game_state.power_event_trigger_time = get_ticks()
+        self.game_state.power_event_trigger_time = self.game_state.clock.get_ticks()
 
     def eat_dots(self):
         r, c = get_idx_from_coords(
@@ -160,11 +160,13 @@ class Pacman(Sprite):
         match self.matrix[r][c]:
             case "dot":
                 self.matrix[r][c] = "void"
+                self.eaten_cells.append((r, c))
                 self.sound.play_sound("dot")
                 self.collectibles -= 1
                 self.game_state.points += DOT_POINT
             case "power":
                 self.matrix[r][c] = "void"
+                self.eaten_cells.append((r, c))
                 self.create_power_up_event()
                 self.sound.play_sound("dot")
                 self.collectibles -= 1
@@ -1,68 +1,101 @@
 import heapq
 
-def a_star(matrix, start, target, subdivs=4):
+# Walkability maps per (matrix, subdivs); walls are assumed not to change.
+_walkable_cache = {}
+
+
+def walkable_map(matrix, subdivs=4):
+    """
+    Flat row-major bytearray: 1 where the (subdivs*2) x (subdivs*2) block
+    with its top-left corner on the cell lies inside the matrix and holds no
+    wall. Built from a summed-area table of the walls.
+    """
+    key = (id(matrix), subdivs)
+    cached = _walkable_cache.get(key)
+    if cached is not None and cached[0] is matrix:
+        return cached[1]
     rows, cols = len(matrix), len(matrix[0])
+    size = subdivs * 2
+    # table[r][c]: walls in matrix[:r][:c]
+    table = [[0] * (cols + 1)]
+    for r in range(rows):
+        above = table[r]
+        line = [0] * (cols + 1)
+        running = 0
+        for c in range(cols):
+            running += matrix[r][c] == 'wall'
+            line[c + 1] = above[c + 1] + running
+        table.append(line)
+    walkable = bytearray(rows * cols)
+    for r in range(rows - size + 1):
+        top, bottom = table[r], table[r + size]
+        base = r * cols
+        for c in range(cols - size + 1):
+            if bottom[c + size] - top[c + size] - bottom[c] + top[c] == 0:
+                walkable[base + c] = 1
+    if len(_walkable_cache) > 8:
+        _walkable_cache.clear()
+    # The matrix is kept so its id cannot be reused by another one.
+    _walkable_cache[key] = (matrix, walkable)
+    return walkable
 
-    def is_valid(x, y):
-        """Check if all cells in the subdivs x subdivs block are valid."""
-        if not (0 <= x < rows and 0 <= y < cols):
-            return False
-        for dx in range(subdivs*2):
-            for dy in range(subdivs*2):
-                if x + dx >= rows or y + dy >= cols or matrix[x + dx][y + dy] == 'wall':
-                    return False
-        return True
 
-    def heuristic(a, b):
+def a_star(matrix, start, target, subdivs=4):
+    """
+    Shortest 4-connected path from start to target (both included) for a
+    (subdivs*2)-sized block, or the path to the reached cell closest to
+    the target (Manhattan) when the target cannot be reached.
+    """
+    rows, cols = len(matrix), len(matrix[0])
+    walkable = walkable_map(matrix, subdivs)
+    target_x, target_y = target
+
+    def heuristic(x, y):
         """Calculate Manhattan distance."""
-        return abs(a[0] - b[0]) + abs(a[1] - b[1])
-    
-    def path_builder(current, came_from):
+        return abs(x - target_x) + abs(y - target_y)
+
+    def path_builder(node):
         path = []
-        while current in came_from:
-            path.append(current)
-            current = came_from[current]
+        while node != start_index:
+            path.append(divmod(node, cols))
+            node = came_from[node]
         path.append(start)
         return path[::-1]
 
-    # Directions: Up, Down, Left, Right
-    directions = [
-        (-1, 0), (1, 0), (0, -1), (0, 1)
-    ]
-
-    open_set = []
-    heapq.heappush(open_set, (0, start))  # (priority, position)
-    came_from = {}  # To reconstruct the path
-
-    g_score = {start: 0}
-    f_score = {start: heuristic(start, target)}
-    closest_node = start
-    closest_distance = heuristic(start, target)
+    start_index = start[0] * cols + start[1]
+    target_index = target_x * cols + target_y if 0 <= target_x < rows and 0 <= target_y < cols else -1
+    g_score = {start_index: 0}
+    came_from = {}
+    closed = set()
+    closest_node = start_index
+    closest_distance = heuristic(*start)
+    # (f, position, index); entries superseded by a better g are skipped
+    # when popped (lazy deletion) instead of being searched for.
+    open_set = [(closest_distance, start, start_index)]
 
     while open_set:
-        _, current = heapq.heappop(open_set)
-
-        if current == target:
-            # Reconstruct path
-            return path_builder(current, came_from) #
-            
-
-        for dx, dy in directions:
-            neighbor = (current[0] + dx, current[1] + dy)
-
-            if is_valid(neighbor[0], neighbor[1]):
-                tentative_g_score = g_score[current] + 1  # All moves cost 1
-                if neighbor not in g_score or tentative_g_score < g_score[neighbor]:
-                    came_from[neighbor] = current
-                    g_score[neighbor] = tentative_g_score
-                    f_score[neighbor] = tentative_g_score + heuristic(neighbor, target)
-
-                    if neighbor not in [pos for _, pos in open_set]:
-                        heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                
-                h_dist = heuristic(neighbor, target)
+        _, _, current = heapq.heappop(open_set)
+        if current in closed:
+            continue
+        if current == target_index:
+            return path_builder(current)
+        closed.add(current)
+        x, y = divmod(current, cols)
+        next_g = g_score[current] + 1  # All moves cost 1
+        # Directions: Up, Down, Left, Right
+        for nx, ny in ((x - 1, y), (x + 1, y), (x, y - 1), (x, y + 1)):
+            if not (0 <= nx < rows and 0 <= ny < cols):
+                continue
+            neighbor = nx * cols + ny
+            if not walkable[neighbor] or neighbor in closed:
+                continue
+            if next_g < g_score.get(neighbor, next_g + 1):
+                came_from[neighbor] = current
+                g_score[neighbor] = next_g
+                h_dist = heuristic(nx, ny)
+                heapq.heappush(open_set, (next_g + h_dist, (nx, ny), neighbor))
                 if h_dist < closest_distance:
                     closest_node = neighbor
                     closest_distance = h_dist
 
-    return path_builder(closest_node, came_from)  #
\ No newline at end of file
+    return path_builder(closest_node)
@@ -1,18 +1,44 @@
+import collections
+import lzma
 import os
 import socket
 import struct
 import threading
 import queue
 import time
+import zlib
 from typing import List, Tuple, Optional
 
 import pygame
 
+from src.log_handle import get_logger
+from src.utils.stream_adaptive import AdaptiveController
+from src.utils.stream_capture import CaptureWriter
+from src.utils.stream_dither import DITHER_DIFFUSION, DITHER_MODES, DITHER_NONE, to_bw, warm_up
+from src.utils.stream_senders import DROP_OLDEST, DROP_TO_KEYFRAME, PacketSender
+from src.utils.stream_server import FanoutServer
+from src.utils.stream_stats import StreamStats
+from src.utils.vector_trace import pack_ivry_frame, unpack_ivry_frame
+
 try:
     import serial  # type: ignore
 except ImportError:  # pragma: no cover - handled at runtime
     serial = None
 
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - handled at runtime
+    np = None
+
+if np is not None:
+    # Packed (unaligned) record layouts matching RUN_STRUCT / BW_RUN_STRUCT.
+    RUN_DTYPE = np.dtype([("offset", "<u4"), ("gray", "u1"), ("run_len", "<u2")])
+    BW_RUN_DTYPE = np.dtype([("offset", "<u4"), ("run_len", "<u2")])
+else:  # pragma: no cover - handled at runtime
+    RUN_DTYPE = None
+    BW_RUN_DTYPE = None
+
+logger = get_logger(__name__)
 
 class ScreenStreamer:
     """
@@ -24,14 +50,37 @@ class ScreenStreamer:
     START_BYTE = 0xA5
     MAGIC = b"IVG"
     VERSION = 1
+    DELTA_VERSION = 2  # packets that need the previous frame to decode
     FLAG_BW = 0x01
+    FLAG_DELTA = 0x02
+    FLAG_COMPACT = 0x04  # varint runs in blocks (see _compact_payload)
+    FLAG_COMPRESSED = 0x08  # codec id byte + compressed payload
+    FLAG_TIMESTAMP = 0x10  # payload starts with the capture time
+    FLAG_VECTOR = 0x20  # beam start + IVRY vector record instead of runs
     HEADER_STRUCT = struct.Struct("<B3sB B I H H I")  # start, magic, version, flags, frame_id, w, h, payload_len
     RUN_STRUCT = struct.Struct("<I B H")  # grayscale runs
     BW_RUN_STRUCT = struct.Struct("<I H")  # BW runs (only "set" pixels)
+    TIMESTAMP_STRUCT = struct.Struct("<Q")  # capture time, monotonic microseconds
+    VECTOR_START_STRUCT = struct.Struct("<h h")  # beam position before the first vector
     HEADER_SIZE = HEADER_STRUCT.size
     RUN_SIZE = RUN_STRUCT.size
     BW_RUN_SIZE = BW_RUN_STRUCT.size
     START_SEQ = bytes([START_BYTE]) + MAGIC
+    MAX_RUN_LEN = 65535
+    COMPACT_BLOCK_STRUCT = struct.Struct("<I H")  # base offset, byte size
+    COMPACT_BLOCK_RUNS = 256  # runs per block (one absolute resync point each)
+    COMPACT_MAX_PALETTE = 128
+    # Codec id (first payload byte of FLAG_COMPRESSED frames) per codec name.
+    COMPRESSION_CODECS = {"zlib": 1, "lzma": 2}
+    COMPRESS_MIN_BYTES = 64  # smaller payloads are always sent as is
+    COMPRESS_MIN_SAVING = 0.1  # fraction of the payload compression must save
+    COMPRESS_BACKOFF = 30  # frames sent uncompressed after a poor result
+    GRAY_PALETTE = [(i, i, i) for i in range(256)]
+    # "threads": accept thread + one writer thread per viewer (PacketSender).
+    # "selectors": one FanoutServer thread for hundreds of viewers.
+    SERVER_MODES = ("threads", "selectors")
+    BW_THRESHOLD = 10  # default: gray >= threshold is sent as a "set" pixel
+    CAPTURE_QUEUE_SIZE = 256  # packets buffered for the capture writer
 
     def __init__(
         self,
@@ -41,23 +90,130 @@ class ScreenStreamer:
         serial_path: Optional[str] = None,
         serial_baud: int = 115200,
         bw_mode: bool = False,
+        use_numpy: bool = True,
+        delta_mode: bool = False,
+        keyframe_interval: int = 60,
+        send_queue_size: int = 8,
+        send_policy: str = DROP_OLDEST,
+        server_mode: str = "threads",
+        pipeline: bool = False,
+        adaptive: bool = False,
+        target_latency: float = 0.25,
+        compact: bool = False,
+        compression: Optional[str] = None,
+        compression_level: int = 6,
+        compress_budget: float = 0.002,
+        timestamps: bool = False,
+        stats_path: Optional[str] = None,
+        stats_interval: float = 1.0,
+        capture_path: Optional[str] = None,
+        bw_threshold: int = BW_THRESHOLD,
+        dither: str = DITHER_NONE,
     ):
+        if server_mode not in self.SERVER_MODES:
+            raise ValueError(f"Unknown server mode {server_mode!r}")
+        if dither not in DITHER_MODES:
+            raise ValueError(f"Unknown dither mode {dither!r}")
+        if not 1 <= bw_threshold <= 255:
+            raise ValueError(f"B/W threshold must be 1..255, got {bw_threshold}")
+        if compression is not None and compression not in self.COMPRESSION_CODECS:
+            raise ValueError(f"Unknown compression codec {compression!r}")
         self.width = width
         self.height = height
         self.tcp_port = tcp_port
         self.serial_path = serial_path
         self.serial_baud = serial_baud
         self.bw_mode = bw_mode
+        # B/W conversion stage (see stream_dither.to_bw); the viewer uses the
+        # same one when it thresholds gray frames itself.
+        self.bw_threshold = bw_threshold
+        self.dither = dither
+        warm_up(dither)
+        # Vectorized encoder; falls back to the pure Python loops without NumPy.
+        self.use_numpy = use_numpy and np is not None
+        # Delta mode (protocol v2): send only changed pixels between keyframes.
+        self.delta_mode = delta_mode
+        self.keyframe_interval = max(1, keyframe_interval)
+        # Compact payloads: gap/length varints and per-frame gray palettes.
+        self.compact = compact
+        # Per-frame payload compression; skipped when it does not pay off
+        # in size or takes longer than `compress_budget` seconds.
+        self.compression = compression
+        self.compression_level = compression_level
+        self.compress_budget = compress_budget
+        self._compress_skip = 0
+        self.frames_compressed = 0
+        self.frames_uncompressed = 0
+        self.compress_saved_bytes = 0
+        self.compress_time = 0.0
+        self._prev_frame = None
+        self._frames_since_keyframe = 0
+        self._force_keyframe = False
         self.frame_id = 0
+        # Every destination gets its own bounded queue and writer thread.
+        self.send_queue_size = send_queue_size
+        self.send_policy = send_policy
+        self.server_mode = server_mode
+        self._fanout: Optional[FanoutServer] = None
+        # Pipeline mode: send_surface only snapshots, a worker encodes/sends.
+        self.pipeline = pipeline
+        self._snapshots: List[pygame.Surface] = []
+        self._pending_snapshot: Optional[int] = None
+        self._pending_dirty = None
+        self._encoding_snapshot: Optional[int] = None
+        self._pipeline_cond = threading.Condition()
+        self._pipeline_thread = None
+        self.frames_submitted = 0
+        self.frames_coalesced = 0
+        # Adaptive mode: skip frames / lower quality to hold target_latency.
+        self.gray_mask = 0xFF
+        self._gray_table: Optional[bytes] = None
+        self.adaptive: Optional[AdaptiveController] = None
+        if adaptive:
+            self.adaptive = AdaptiveController(target_latency, bw_only=bw_mode)
+        self._skipped_dirty = False
+        # Capture timestamps in the header extension, plus per-frame counters
+        # closed every `stats_interval` seconds (JSON lines in `stats_path`).
+        self.timestamps = timestamps
+        self._capture_time: Optional[float] = None
+        self._pending_captured = 0.0
+        self.frame_stats = StreamStats("streamer", stats_path, stats_interval)
+        # Every broadcast packet is also teed into this capture file, through
+        # its own queue and writer thread like any other destination.
+        self.capture_path = capture_path
+        self._capture_sender: Optional[PacketSender] = None
         self._stop_event = threading.Event()
         self._accept_thread = None
         self._listener = None
-        self._clients: List[socket.socket] = []
+        self._clients: List[PacketSender] = []
         self._clients_lock = threading.Lock()
         self._serial = None
+        self._serial_sender: Optional[PacketSender] = None
 
     def start(self):
-        if self.tcp_port:
+        if self.capture_path:
+            capture = CaptureWriter(self.capture_path)
+            # A stalled disk drops whole keyframe intervals, so the file
+            # never holds deltas without their base.
+            self._capture_sender = PacketSender(
+                f"capture:{self.capture_path}",
+                capture.write_at,
+                capture.close,
+                max_queue=max(self.send_queue_size, self.CAPTURE_QUEUE_SIZE),
+                policy=DROP_TO_KEYFRAME,
+                on_keyframe_needed=self.request_keyframe,
+                timed=True,
+            )
+            self._capture_sender.start()
+        if self.tcp_port and self.server_mode == "selectors":
+            self._fanout = FanoutServer(
+                self.tcp_port,
+                max_queue=self.send_queue_size,
+                policy=self.send_policy,
+                on_keyframe_needed=self.request_keyframe,
+            )
+            self._fanout.start()
+        elif self.tcp_port:
             self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
             self._listener.bind(("0.0.0.0", self.tcp_port))
@@ -73,9 +229,44 @@ class ScreenStreamer:
             self._serial = serial.Serial(
                 self.serial_path, baudrate=self.serial_baud, timeout=0
             )
+            # 8N1 framing: 10 bits on the wire per byte.
+            self._serial_sender = self._make_sender(
+                self.serial_path,
+                self._serial.write,
+                self._serial.close,
+                link_capacity=self.serial_baud / 10,
+                os_backlog=lambda: self._serial.out_waiting,
+            )
+            self._serial_sender.start()
+        if self.pipeline:
+            self._pipeline_thread = threading.Thread(
+                target=self._pipeline_loop, name="stream-encode", daemon=True
+            )
+            self._pipeline_thread.start()
+
+    def _make_sender(
+        self, name: str, write, close, on_closed=None, link_capacity=None, os_backlog=None
+    ) -> PacketSender:
+        return PacketSender(
+            name,
+            write,
+            close,
+            max_queue=self.send_queue_size,
+            policy=self.send_policy,
+            on_keyframe_needed=self.request_keyframe,
+            on_closed=on_closed,
+            link_capacity=link_capacity,
+            os_backlog=os_backlog,
+        )
 
     def stop(self):
         self._stop_event.set()
+        if self._pipeline_thread:
+            with self._pipeline_cond:
+                self._pipeline_cond.notify_all()
+            self._pipeline_thread.join(timeout=1)
+        if self._fanout:
+            self._fanout.stop()
         if self._listener:
             try:
                 self._listener.close()
@@ -84,69 +275,443 @@ class ScreenStreamer:
         if self._accept_thread:
             self._accept_thread.join(timeout=1)
         with self._clients_lock:
-            for client in self._clients:
-                try:
-                    client.close()
-                except OSError:
-                    pass
+            clients = list(self._clients)
             self._clients.clear()
-        if self._serial:
-            try:
-                self._serial.close()
-            except OSError:
-                pass
+        for client in clients:
+            client.close()
+            client.join(timeout=1)
+        if self._serial_sender:
+            self._serial_sender.close()
+            self._serial_sender.join(timeout=1)
+        if self._capture_sender:
+            # Unlike a viewer, the recording gets what is still queued.
+            self._capture_sender.flush(timeout=2)
+            self._capture_sender.close()
+            self._capture_sender.join(timeout=1)
 
     def _accept_loop(self):
         while not self._stop_event.is_set():
             try:
                 self._listener.settimeout(1.0)
-                conn, _addr = self._listener.accept()
+                conn, addr = self._listener.accept()
                 conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                sender = self._make_sender(
+                    f"{addr[0]}:{addr[1]}",
+                    conn.sendall,
+                    conn.close,
+                    on_closed=self._drop_client,
+                )
                 with self._clients_lock:
-                    self._clients.append(conn)
+                    self._clients.append(sender)
+                sender.start()
+                # A new viewer cannot apply deltas until it sees a keyframe.
+                self.request_keyframe()
             except socket.timeout:
                 continue
             except OSError:
                 break
 
+    def _drop_client(self, sender: PacketSender):
+        with self._clients_lock:
+            if sender in self._clients:
+                self._clients.remove(sender)
+
     def _broadcast(self, data: bytes):
-        stale: List[socket.socket] = []
+        # Only enqueues: the per-destination writer threads do the I/O.
+        is_keyframe = not data[5] & self.FLAG_DELTA
         with self._clients_lock:
-            for client in self._clients:
-                try:
-                    client.sendall(data)
-                except OSError:
-                    stale.append(client)
-            for dead in stale:
-                try:
-                    dead.close()
-                except OSError:
-                    pass
-                if dead in self._clients:
-                    self._clients.remove(dead)
-        if self._serial:
-            try:
-                self._serial.write(data)
-            except OSError:
-                pass
+            clients = list(self._clients)
+        for client in clients:
+            client.enqueue(data, is_keyframe)
+        if self._fanout:
+            self._fanout.publish(data, is_keyframe)
+        if self._serial_sender:
+            self._serial_sender.enqueue(data, is_keyframe)
+        if self._capture_sender:
+            self._capture_sender.enqueue(data, is_keyframe)
 
-    def send_surface(self, surface: pygame.Surface):
-        packet = self.encode_surface(surface)
+    def send_packet(self, packet: bytes):
+        """Send an already encoded packet (e.g. replayed from a capture)."""
+        self._broadcast(bytes(packet))
+
+    def sender_stats(self) -> List[dict]:
+        """Queue depth, drop and throughput counters for every destination."""
+        with self._clients_lock:
+            clients = list(self._clients)
+        if self._serial_sender:
+            clients.append(self._serial_sender)
+        if self._capture_sender:
+            clients.append(self._capture_sender)
+        stats = [client.stats() for client in clients]
+        if self._fanout:
+            stats.extend(self._fanout.stats())
+        return stats
+
+    def link_estimate(self) -> Tuple[int, float]:
+        """
+        (backlog bytes, capacity bytes/s) of the destination whose backlog
+        takes longest to drain. Without any backlog, the slowest known
+        capacity is reported (0.0 when nothing has been measured yet).
+        """
+        with self._clients_lock:
+            senders = list(self._clients)
+        if self._serial_sender:
+            senders.append(self._serial_sender)
+        estimates = [sender.link_estimate() for sender in senders]
+        if self._fanout:
+            estimates.append(self._fanout.link_estimate())
+        worst = (0, 0.0)
+        worst_delay = 0.0
+        for backlog, capacity in estimates:
+            if not backlog:
+                continue
+            delay = backlog / capacity if capacity else float("inf")
+            if delay >= worst_delay:
+                worst, worst_delay = (backlog, capacity), delay
+        if worst[0]:
+            return worst
+        capacities = [capacity for _backlog, capacity in estimates if capacity]
+        return 0, min(capacities) if capacities else 0.0
+
+    def adaptive_stats(self) -> dict:
+        """Target latency and the current skip/quality decisions."""
+        if self.adaptive is None:
+            return {}
+        return self.adaptive.stats()
+
+    def send_surface(self, surface: pygame.Surface, dirty_rects=None):
+        captured = time.monotonic()
+        if self.pipeline:
+            self._submit_snapshot(surface, dirty_rects, captured)
+            return
+        self._send_frame(surface, dirty_rects, captured)
+
+    def send_gray(self, gray, captured: Optional[float] = None):
+        """
+        Send a row-major luma buffer of width x height pixels (bytes, or a
+        uint8 array with NumPy) computed by the caller, e.g. one shared by
+        several outputs (see MultiStreamer). Always synchronous.
+        """
+        self._send_frame(None, None, time.monotonic() if captured is None else captured, gray)
+
+    def _send_frame(
+        self, surface: Optional[pygame.Surface], dirty_rects, captured: float, gray=None
+    ):
+        started = time.monotonic()
+        self.frame_stats.add("queue_wait_ms", (started - captured) * 1000)
+        if self.adaptive is not None:
+            if not self.adaptive.offer_frame(*self.link_estimate()):
+                # The next frame must also cover what this one changed.
+                self._skipped_dirty = True
+                return
+            self._apply_quality(self.adaptive.bw_mode, self.adaptive.gray_mask)
+            if self._skipped_dirty:
+                dirty_rects = None
+                self._skipped_dirty = False
+        self._capture_time = captured
+        try:
+            if gray is not None:
+                packet = self.encode_gray(gray)
+            else:
+                packet = self.encode_surface(surface, dirty_rects)
+        finally:
+            self._capture_time = None
+        self.frame_stats.add("encode_ms", (time.monotonic() - started) * 1000)
+        self.frame_stats.add("packet_bytes", len(packet))
+        self.frame_stats.count("frames")
+        if self.adaptive is not None:
+            self.adaptive.record_packet(len(packet))
+        self._broadcast(packet)
+        self.frame_stats.maybe_flush(self._stats_extra)
+
+    def send_vectors(self, start: Tuple[int, int], vectors: List[Tuple[int, int]]):
+        """
+        Send one traced vector frame (see vector_trace.MazeTracer) instead
+        of raster runs: the beam start and its (dx, dy) steps.
+        """
+        started = time.monotonic()
+        self._capture_time = started
+        try:
+            payload = self.VECTOR_START_STRUCT.pack(*start) + pack_ivry_frame(vectors)
+            packet = self._pack_frame(self.FLAG_VECTOR, payload)
+        finally:
+            self._capture_time = None
+        self.frame_stats.add("vectors", len(vectors))
+        self.frame_stats.add("packet_bytes", len(packet))
+        self.frame_stats.count("frames")
         self._broadcast(packet)
+        self.frame_stats.maybe_flush(self._stats_extra)
+
+    def _stats_extra(self) -> dict:
+        extra = {
+            "frame_id": self.frame_id,
+            "size": f"{self.width}x{self.height}",
+            "senders": self.sender_stats(),
+        }
+        if self.adaptive is not None:
+            extra["adaptive"] = self.adaptive.stats()
+        return extra
+
+    def _apply_quality(self, bw_mode: bool, gray_mask: int):
+        if bw_mode == self.bw_mode and gray_mask == self.gray_mask:
+            return
+        logger.info(
+            "stream quality -> %s, gray mask 0x%02X", "bw" if bw_mode else "gray", gray_mask
+        )
+        self.bw_mode = bw_mode
+        self.gray_mask = gray_mask
+        self._gray_table = None
+        if gray_mask != 0xFF:
+            self._gray_table = bytes(g & gray_mask for g in range(256))
+        # Delta references were built at the old quality.
+        self.request_keyframe()
+
+    def _submit_snapshot(self, surface: pygame.Surface, dirty_rects, captured: float):
+        """
+        Copy `surface` into a reusable snapshot for the encode worker. If the
+        worker has not picked up the previous snapshot yet, it is overwritten
+        (frames coalesce to the latest one) and the dirty rects are merged.
+        """
+        with self._pipeline_cond:
+            if len(self._snapshots) != 2 or self._snapshots[0].get_size() != surface.get_size():
+                self._snapshots = [surface.copy(), surface.copy()]
+                self._pending_snapshot = None
+                self._encoding_snapshot = None
+            if self._pending_snapshot is not None:
+                target = self._pending_snapshot
+                self.frames_coalesced += 1
+                if self._pending_dirty is None or dirty_rects is None:
+                    dirty_rects = None
+                else:
+                    dirty_rects = self._pending_dirty + list(dirty_rects)
+            else:
+                target = 1 if self._encoding_snapshot == 0 else 0
+                if dirty_rects is not None:
+                    dirty_rects = list(dirty_rects)
+            self._snapshots[target].blit(surface, (0, 0))
+            self._pending_snapshot = target
+            self._pending_dirty = dirty_rects
+            self._pending_captured = captured
+            self.frames_submitted += 1
+            self._pipeline_cond.notify()
+
+    def _pipeline_loop(self):
+        while True:
+            with self._pipeline_cond:
+                while self._pending_snapshot is None and not self._stop_event.is_set():
+                    self._pipeline_cond.wait()
+                if self._stop_event.is_set():
+                    return
+                index = self._pending_snapshot
+                snapshot = self._snapshots[index]
+                dirty_rects = self._pending_dirty
+                captured = self._pending_captured
+                self._pending_snapshot = None
+                self._pending_dirty = None
+                self._encoding_snapshot = index
+            try:
+                self._send_frame(snapshot, dirty_rects, captured)
+            finally:
+                with self._pipeline_cond:
+                    self._encoding_snapshot = None
+
+    def pipeline_stats(self) -> dict:
+        with self._pipeline_cond:
+            return {
+                "frames_submitted": self.frames_submitted,
+                "frames_coalesced": self.frames_coalesced,
+                "frames_encoded": self.frame_id,
+            }
+
+    def encode_surface(self, surface: pygame.Surface, dirty_rects=None) -> bytes:
+        """
+        Encode `surface` into one packet. In delta mode, `dirty_rects` (the
+        only regions that may have changed since the previous call) limits
+        the work to those regions; None means "anything may have changed".
+        """
+        if (
+            self.delta_mode
+            and dirty_rects is not None
+            and not self._keyframe_due(surface.get_width() * surface.get_height())
+            # Error diffusion spreads a change past its dirty rect.
+            and not (self.bw_mode and self.dither == DITHER_DIFFUSION)
+        ):
+            return self._encode_dirty_frame(surface, dirty_rects)
+        if self.use_numpy:
+            gray = self._surface_to_gray_np(surface)
+        else:
+            gray = self._rgb_to_gray(pygame.image.tostring(surface, "RGB"))
+        return self.encode_gray(gray)
+
+    def encode_gray(self, gray) -> bytes:
+        """Encode a row-major luma buffer of width x height into one packet."""
+        if self.use_numpy and not isinstance(gray, np.ndarray):
+            gray = np.frombuffer(gray, dtype=np.uint8).copy()
+        elif not self.use_numpy and not isinstance(gray, bytes):
+            gray = bytes(gray)
+        gray = self._quantize(gray)
+        if self.delta_mode:
+            return self._encode_delta_frame(gray)
+        return self._pack_frame(*self._encode_keyframe(gray))
+
+    def _encode_keyframe(self, gray, bw_frame=None) -> Tuple[int, bytes]:
+        """
+        Full run table for `gray`; returns (flags, payload). B/W frames are
+        encoded from `bw_frame` when the caller already converted it.
+        """
+        if self.bw_mode:
+            gray = self._threshold_frame(gray) if bw_frame is None else bw_frame
+            if self.use_numpy:
+                return self.FLAG_BW, self._encode_bw_runs_np(gray)
+            return self.FLAG_BW, self._encode_bw_runs(gray)
+        if self.use_numpy:
+            return 0, self._encode_runs_np(gray)
+        return 0, self._encode_runs(gray)
 
-    def encode_surface(self, surface: pygame.Surface) -> bytes:
-        rgb_bytes = pygame.image.tostring(surface, "RGB")
-        gray_values = self._rgb_to_gray(rgb_bytes)
-        flags = 0
+    def _encode_delta_frame(self, gray) -> bytes:
+        # The reference frame is what the viewer will display, so B/W frames
+        # are kept as 0/255 after thresholding.
         if self.bw_mode:
-            payload = self._encode_bw_runs(gray_values)
-            flags |= self.FLAG_BW
+            shown = self._threshold_frame(gray)
+        else:
+            shown = gray
+        if self._keyframe_due(len(shown)):
+            flags, payload = self._encode_keyframe(gray, shown if self.bw_mode else None)
+            self._force_keyframe = False
+            self._frames_since_keyframe = 0
+            packet = self._pack_frame(flags, payload)
+        else:
+            if self.use_numpy:
+                payload = self._encode_delta_runs_np(shown, self._prev_frame)
+            else:
+                payload = self._encode_delta_runs(shown, self._prev_frame)
+            packet = self._pack_delta(payload)
+        self._prev_frame = shown if self.use_numpy else bytearray(shown)
+        return packet
+
+    def _keyframe_due(self, pixel_count: int) -> bool:
+        return (
+            self._force_keyframe
+            or self._prev_frame is None
+            or len(self._prev_frame) != pixel_count
+            or self._frames_since_keyframe + 1 >= self.keyframe_interval
+        )
+
+    def _pack_delta(self, payload: bytes) -> bytes:
+        flags = self.FLAG_DELTA | (self.FLAG_BW if self.bw_mode else 0)
+        self._frames_since_keyframe += 1
+        return self._pack_frame(flags, payload, self.DELTA_VERSION)
+
+    def _encode_dirty_frame(self, surface: pygame.Surface, dirty_rects) -> bytes:
+        """
+        Delta packet built from the dirty regions only: luma conversion and
+        the comparison against the previous frame never touch other pixels.
+        """
+        frame_width = surface.get_width()
+        rects = self._merge_rects(dirty_rects, surface.get_rect())
+        if self.use_numpy:
+            offsets_parts = []
+            values_parts = []
+            for rect in rects:
+                patch = self._quantize(self._surface_to_gray_np(surface, rect))
+                if self.bw_mode:
+                    patch = self._threshold_frame(patch, rect.width, rect.topleft)
+                offsets = (
+                    np.arange(rect.top, rect.bottom)[:, None] * frame_width
+                    + np.arange(rect.left, rect.right)
+                ).ravel()
+                changed = patch != self._prev_frame[offsets]
+                offsets_parts.append(offsets[changed])
+                values_parts.append(patch[changed])
+                self._prev_frame[offsets] = patch
+            if offsets_parts:
+                offsets = np.concatenate(offsets_parts)
+                values = np.concatenate(values_parts)
+                order = np.argsort(offsets, kind="stable")
+                payload = self._encode_sparse_runs_np(offsets[order], values[order])
+            else:
+                payload = b""
+        else:
+            changes = []
+            for rect in rects:
+                rgb_bytes = pygame.image.tostring(surface.subsurface(rect), "RGB")
+                patch = self._quantize(self._rgb_to_gray(rgb_bytes))
+                if self.bw_mode:
+                    patch = self._threshold_frame(patch, rect.width, rect.topleft)
+                for row in range(rect.height):
+                    base = (rect.top + row) * frame_width + rect.left
+                    for col in range(rect.width):
+                        value = patch[row * rect.width + col]
+                        if self._prev_frame[base + col] != value:
+                            changes.append((base + col, value))
+                            self._prev_frame[base + col] = value
+            payload = self._encode_sparse_runs(sorted(changes))
+        return self._pack_delta(payload)
+
+    @staticmethod
+    def _merge_rects(rects, bounds: pygame.Rect) -> List[pygame.Rect]:
+        """Clip rects to `bounds` and merge overlapping ones."""
+        merged: List[pygame.Rect] = []
+        for rect in rects:
+            rect = pygame.Rect(rect).clip(bounds)
+            if not rect.width or not rect.height:
+                continue
+            hit = rect.collidelist(merged)
+            while hit != -1:
+                rect.union_ip(merged.pop(hit))
+                hit = rect.collidelist(merged)
+            merged.append(rect)
+        return merged
+
+    def _encode_sparse_runs(self, changes: List[Tuple[int, int]]) -> bytes:
+        """Grayscale runs for ascending (offset, value) pixel changes."""
+        payload = bytearray()
+        start = prev_offset = current = None
+        run_len = 0
+        for offset, value in changes:
+            if (
+                start is not None
+                and offset == prev_offset + 1
+                and value == current
+                and run_len < self.MAX_RUN_LEN
+            ):
+                run_len += 1
+            else:
+                if start is not None:
+                    payload += self.RUN_STRUCT.pack(start, current, run_len)
+                start, current, run_len = offset, value, 1
+            prev_offset = offset
+        if start is not None:
+            payload += self.RUN_STRUCT.pack(start, current, run_len)
+        return bytes(payload)
+
+    def request_keyframe(self):
+        """Make the next delta-mode frame a keyframe (e.g. for a new viewer)."""
+        self._force_keyframe = True
+
+    def _pack_frame(self, flags: int, payload: bytes, version: Optional[int] = None) -> bytes:
+        if flags & self.FLAG_VECTOR:
+            pass  # no runs, nothing to compact
+        elif flags & self.FLAG_BW and not flags & self.FLAG_DELTA:
+            self.frame_stats.add("runs", len(payload) // self.BW_RUN_SIZE)
         else:
-            payload = self._encode_runs(gray_values)
+            self.frame_stats.add("runs", len(payload) // self.RUN_SIZE)
+        if self.compact and not flags & self.FLAG_VECTOR:
+            flags |= self.FLAG_COMPACT
+            payload = self._compact_payload(flags, payload)
+        if self.compression:
+            compressed = self._compress_payload(payload)
+            if compressed is not None:
+                flags |= self.FLAG_COMPRESSED
+                payload = compressed
+        if self.timestamps:
+            captured = self._capture_time if self._capture_time is not None else time.monotonic()
+            flags |= self.FLAG_TIMESTAMP
+            payload = self.TIMESTAMP_STRUCT.pack(int(captured * 1_000_000)) + payload
         header = self.HEADER_STRUCT.pack(
             self.START_BYTE,
             self.MAGIC,
-            self.VERSION,
+            self.VERSION if version is None else version,
             flags,
             self.frame_id,
             self.width,
@@ -156,6 +721,120 @@ class ScreenStreamer:
         self.frame_id = (self.frame_id + 1) & 0xFFFFFFFF
         return header + payload
 
+    def _quantize(self, gray):
+        """Drop the low gray bits cleared in `gray_mask` (longer runs)."""
+        if self.gray_mask == 0xFF:
+            return gray
+        if self.use_numpy:
+            # Not in place: the buffer may be shared with other outputs.
+            return gray & self.gray_mask
+        return gray.translate(self._gray_table)
+
+    def _compress_payload(self, payload: bytes) -> Optional[bytes]:
+        """Compressed payload, or None when this frame is sent as is."""
+        if len(payload) < self.COMPRESS_MIN_BYTES:
+            return None
+        if self._compress_skip:
+            self._compress_skip -= 1
+            self.frames_uncompressed += 1
+            return None
+        started = time.perf_counter()
+        if self.compression == "lzma":
+            data = lzma.compress(payload, preset=self.compression_level)
+        else:
+            data = zlib.compress(payload, self.compression_level)
+        elapsed = time.perf_counter() - started
+        self.compress_time += elapsed
+        saved = len(payload) - len(data) - 1
+        if saved < len(payload) * self.COMPRESS_MIN_SAVING or elapsed > self.compress_budget:
+            # Not worth it now; retry after a while as the content changes.
+            self._compress_skip = self.COMPRESS_BACKOFF
+            self.frames_uncompressed += 1
+            return None
+        self.frames_compressed += 1
+        self.compress_saved_bytes += saved
+        return bytes([self.COMPRESSION_CODECS[self.compression]]) + data
+
+    def compression_stats(self) -> dict:
+        return {
+            "codec": self.compression,
+            "level": self.compression_level,
+            "frames_compressed": self.frames_compressed,
+            "frames_uncompressed": self.frames_uncompressed,
+            "saved_bytes": self.compress_saved_bytes,
+            "compress_time_ms": round(self.compress_time * 1000, 1),
+        }
+
+    @classmethod
+    def split_timestamp(cls, flags: int, payload: bytes) -> Tuple[Optional[int], int, bytes]:
+        """
+        Strip the FLAG_TIMESTAMP extension. Returns (capture time in monotonic
+        microseconds or None, flags without FLAG_TIMESTAMP, payload).
+        """
+        if not flags & cls.FLAG_TIMESTAMP:
+            return None, flags, payload
+        if len(payload) < cls.TIMESTAMP_STRUCT.size:
+            raise ValueError("payload too short for its timestamp")
+        (captured_us,) = cls.TIMESTAMP_STRUCT.unpack_from(payload)
+        return captured_us, flags & ~cls.FLAG_TIMESTAMP, payload[cls.TIMESTAMP_STRUCT.size:]
+
+    @classmethod
+    def decompress_payload(cls, flags: int, payload: bytes, max_size: int) -> bytes:
+        """
+        Undo FLAG_COMPRESSED. Raises ValueError for unknown codecs, corrupt
+        data or output beyond `max_size` bytes.
+        """
+        if not flags & cls.FLAG_COMPRESSED:
+            return payload
+        if not payload:
+            raise ValueError("empty compressed payload")
+        codec = payload[0]
+        try:
+            if codec == cls.COMPRESSION_CODECS["zlib"]:
+                decompressor = zlib.decompressobj()
+                data = decompressor.decompress(payload[1:], max_size)
+                complete = decompressor.eof
+            elif codec == cls.COMPRESSION_CODECS["lzma"]:
+                decompressor = lzma.LZMADecompressor()
+                data = decompressor.decompress(payload[1:], max_size)
+                complete = decompressor.eof
+            else:
+                raise ValueError(f"unknown compression codec {codec}")
+        except (zlib.error, lzma.LZMAError) as exc:
+            raise ValueError(f"corrupt compressed payload: {exc}") from exc
+        if not complete:
+            raise ValueError("compressed payload truncated or too large")
+        return data
+
+    @classmethod
+    def _max_payload_size(cls, pixel_count: int) -> int:
+        # One fixed grayscale record per pixel is the largest sane payload.
+        return pixel_count * cls.RUN_SIZE + 1024
+
+    def _threshold_frame(self, gray, width: Optional[int] = None, origin=(0, 0)):
+        """0/255 frame (or dirty region at `origin`) shown in B/W mode."""
+        return to_bw(gray, width or self.width, self.bw_threshold, self.dither, origin)
+
+    def _encode_delta_runs(self, frame: bytes, prev: bytes) -> bytes:
+        """Grayscale runs covering only the pixels that differ from `prev`."""
+        payload = bytearray()
+        total = len(frame)
+        idx = 0
+        while idx < total:
+            while idx < total and frame[idx] == prev[idx]:
+                idx += 1
+            if idx >= total:
+                break
+            current = frame[idx]
+            start = idx
+            run_len = 0
+            limit = min(total - idx, self.MAX_RUN_LEN)
+            while run_len < limit and frame[idx] == current and prev[idx] != current:
+                run_len += 1
+                idx += 1
+            payload += self.RUN_STRUCT.pack(start, current, run_len)
+        return bytes(payload)
+
     def _encode_runs(self, gray_values: bytes) -> bytes:
         payload = bytearray()
         total = len(gray_values)
@@ -163,7 +842,7 @@ class ScreenStreamer:
         while idx < total:
             current = gray_values[idx]
             run_len = 1
-            limit = min(total - idx, 65535)
+            limit = min(total - idx, self.MAX_RUN_LEN)
             while run_len < limit and gray_values[idx + run_len] == current:
                 run_len += 1
             payload += self.RUN_STRUCT.pack(idx, current, run_len)
@@ -176,14 +855,14 @@ class ScreenStreamer:
         idx = 0
         while idx < total:
             # Skip zeros (black pixels)
-            while idx < total and gray_values[idx] < 10:
+            while idx < total and gray_values[idx] < self.BW_THRESHOLD:
                 idx += 1
             if idx >= total:
                 break
             run_len = 0
             start = idx
-            limit = min(total - idx, 65535)
-            while run_len < limit and gray_values[idx] >= 10:
+            limit = min(total - idx, self.MAX_RUN_LEN)
+            while run_len < limit and gray_values[idx] >= self.BW_THRESHOLD:
                 run_len += 1
                 idx += 1
             payload += self.BW_RUN_STRUCT.pack(start, run_len)
@@ -201,57 +880,470 @@ class ScreenStreamer:
             gi += 1
         return bytes(gray)
 
+    @staticmethod
+    def _surface_to_gray_np(
+        surface: pygame.Surface, rect: Optional[pygame.Rect] = None
+    ) -> "np.ndarray":
+        """
+        Row-major uint8 luma of `surface` (or of `rect` within it),
+        bit-identical to `_rgb_to_gray`. The float64 expression is evaluated
+        in the same order as the scalar code and truncated the same way, so
+        both paths produce equal bytes.
+        """
+        try:
+            rgb = pygame.surfarray.pixels3d(surface)
+        except ValueError:
+            # Palettized / 16-bit surfaces cannot be referenced directly.
+            rgb = pygame.surfarray.array3d(surface)
+        if rect is not None:
+            rgb = rgb[rect.left:rect.right, rect.top:rect.bottom]
+        try:
+            gray = 0.299 * rgb[..., 0] + 0.587 * rgb[..., 1] + 0.114 * rgb[..., 2]
+        finally:
+            # Release the surface lock held by the pixels3d view.
+            del rgb
+        # surfarray is indexed [x, y]; the protocol is row-major.
+        return gray.T.astype(np.uint8, order="C").ravel()
+
     @classmethod
-    def extract_frames(cls, buffer: bytes) -> Tuple[List[Tuple[int, int, int, bytes, bool]], bytes]:
+    def _split_long_runs_np(cls, starts, lengths):
+        """
+        Split runs longer than MAX_RUN_LEN the same way the scalar encoders
+        do: consecutive pieces of MAX_RUN_LEN starting at the run start.
+        Returns (starts, lengths, source), `source` mapping every output run
+        back to the input run it was cut from.
+        """
+        source = np.arange(starts.size)
+        if lengths.size == 0 or int(lengths.max()) <= cls.MAX_RUN_LEN:
+            return starts, lengths, source
+        counts = (lengths + cls.MAX_RUN_LEN - 1) // cls.MAX_RUN_LEN
+        source = np.repeat(source, counts)
+        first = np.repeat(np.cumsum(counts) - counts, counts)
+        piece = (np.arange(source.size) - first) * cls.MAX_RUN_LEN
+        starts = starts[source] + piece
+        lengths = np.minimum(lengths[source] - piece, cls.MAX_RUN_LEN)
+        return starts, lengths, source
+
+    @classmethod
+    def _encode_runs_np(cls, gray: "np.ndarray") -> bytes:
+        total = gray.size
+        if total == 0:
+            return b""
+        starts = np.flatnonzero(gray[1:] != gray[:-1]) + 1
+        starts = np.concatenate((np.zeros(1, dtype=starts.dtype), starts))
+        lengths = np.diff(np.append(starts, total))
+        starts, lengths, _source = cls._split_long_runs_np(starts, lengths)
+        runs = np.empty(starts.size, dtype=RUN_DTYPE)
+        runs["offset"] = starts
+        runs["gray"] = gray[starts]
+        runs["run_len"] = lengths
+        return runs.tobytes()
+
+    @classmethod
+    def _encode_delta_runs_np(cls, frame: "np.ndarray", prev: "np.ndarray") -> bytes:
+        offsets = np.flatnonzero(frame != prev)
+        return cls._encode_sparse_runs_np(offsets, frame[offsets])
+
+    @classmethod
+    def _encode_sparse_runs_np(cls, offsets: "np.ndarray", values: "np.ndarray") -> bytes:
+        """
+        Grayscale runs for an ascending set of absolute pixel `offsets`: a run
+        breaks at every gap in the offsets and at every value change.
+        """
+        if offsets.size == 0:
+            return b""
+        breaks = np.flatnonzero(
+            (offsets[1:] != offsets[:-1] + 1) | (values[1:] != values[:-1])
+        ) + 1
+        firsts = np.concatenate((np.zeros(1, dtype=breaks.dtype), breaks))
+        lengths = np.diff(np.append(firsts, offsets.size))
+        starts, lengths, source = cls._split_long_runs_np(offsets[firsts], lengths)
+        runs = np.empty(starts.size, dtype=RUN_DTYPE)
+        runs["offset"] = starts
+        runs["gray"] = values[firsts][source]
+        runs["run_len"] = lengths
+        return runs.tobytes()
+
+    @classmethod
+    def _encode_bw_runs_np(cls, gray: "np.ndarray") -> bytes:
+        mask = (gray >= cls.BW_THRESHOLD).view(np.int8)
+        edges = np.diff(mask, prepend=np.int8(0), append=np.int8(0))
+        starts = np.flatnonzero(edges == 1)
+        lengths = np.flatnonzero(edges == -1) - starts
+        starts, lengths, _source = cls._split_long_runs_np(starts, lengths)
+        runs = np.empty(starts.size, dtype=BW_RUN_DTYPE)
+        runs["offset"] = starts
+        runs["run_len"] = lengths
+        return runs.tobytes()
+
+    def _compact_payload(self, flags: int, payload: bytes) -> bytes:
+        """
+        Re-encode fixed run records as a FLAG_COMPACT payload:
+          - `palette_len (u8) | palette` (not for B/W keyframes); 0 means raw
+            gray values;
+          - blocks of `offset (u32) | size (u16)` followed by `size` bytes of
+            runs, at most COMPACT_BLOCK_RUNS runs per block.
+        Each run is a `gap` varint (pixels skipped since the previous run of
+        the block ended, or since the block offset) and a `token` varint:
+        `run_len` for B/W keyframes, otherwise `run_len << bits | index` with
+        `bits` wide enough for the palette (8 for raw gray).
+        """
+        bw = bool(flags & self.FLAG_BW) and not flags & self.FLAG_DELTA
+        if self.use_numpy:
+            return self._compact_payload_np(payload, bw)
+        if bw:
+            runs = [(offset, 0, run_len) for offset, run_len in self.BW_RUN_STRUCT.iter_unpack(payload)]
+            out = bytearray()
+            tokens = [run_len for _offset, _gray, run_len in runs]
+        else:
+            runs = list(self.RUN_STRUCT.iter_unpack(payload))
+            palette, bits = self._choose_palette(sorted({gray for _o, gray, _l in runs}), len(runs))
+            index = {gray: i for i, gray in enumerate(palette)}
+            out = bytearray([len(palette)]) + bytes(palette)
+            tokens = [
+                run_len << bits | (index[gray] if palette else gray)
+                for _offset, gray, run_len in runs
+            ]
+        end = 0
+        for first in range(0, len(runs), self.COMPACT_BLOCK_RUNS):
+            block = bytearray()
+            base = end
+            for (offset, _gray, run_len), token in zip(
+                runs[first:first + self.COMPACT_BLOCK_RUNS],
+                tokens[first:first + self.COMPACT_BLOCK_RUNS],
+            ):
+                self._put_varint(block, offset - end)
+                self._put_varint(block, token)
+                end = offset + run_len
+            out += self.COMPACT_BLOCK_STRUCT.pack(base, len(block)) + block
+        return bytes(out)
+
+    @classmethod
+    def _choose_palette(cls, grays: List[int], run_count: int) -> Tuple[List[int], int]:
+        """(palette, index bits) for the distinct `grays`; ([], 8) means raw gray."""
+        if grays and len(grays) <= cls.COMPACT_MAX_PALETTE:
+            bits = (len(grays) - 1).bit_length()
+            # The palette costs a byte per entry; every run saves 8 - bits bits.
+            if len(grays) * 8 < run_count * (8 - bits):
+                return grays, bits
+        return [], 8
+
+    @staticmethod
+    def _put_varint(out: bytearray, value: int):
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+
+    @classmethod
+    def _compact_payload_np(cls, payload: bytes, bw: bool) -> bytes:
+        if bw:
+            runs = np.frombuffer(payload, dtype=BW_RUN_DTYPE)
+            prefix = b""
+            tokens = runs["run_len"].astype(np.int64)
+        else:
+            runs = np.frombuffer(payload, dtype=RUN_DTYPE)
+            grays = runs["gray"]
+            present = np.flatnonzero(np.bincount(grays, minlength=256))
+            palette, bits = cls._choose_palette(present.tolist(), runs.size)
+            if palette:
+                lookup = np.zeros(256, dtype=np.int64)
+                lookup[present] = np.arange(present.size)
+                index = lookup[grays]
+            else:
+                index = grays.astype(np.int64)
+            prefix = bytes([len(palette)]) + bytes(palette)
+            tokens = (runs["run_len"].astype(np.int64) << bits) | index
+        offsets = runs["offset"].astype(np.int64)
+        ends = offsets + runs["run_len"]
+        bases = np.concatenate((np.zeros(1, dtype=np.int64), ends[:-1]))
+        values = np.empty(2 * offsets.size, dtype=np.int64)
+        values[0::2] = offsets - bases
+        values[1::2] = tokens
+        data, sizes = cls._varints_np(values)
+        run_sizes = sizes[0::2] + sizes[1::2]
+        out = [prefix]
+        pos = 0
+        for first in range(0, offsets.size, cls.COMPACT_BLOCK_RUNS):
+            size = int(run_sizes[first:first + cls.COMPACT_BLOCK_RUNS].sum())
+            out.append(cls.COMPACT_BLOCK_STRUCT.pack(int(bases[first]), size))
+            out.append(data[pos:pos + size])
+            pos += size
+        return b"".join(out)
+
+    @staticmethod
+    def _varints_np(values: "np.ndarray") -> Tuple[bytes, "np.ndarray"]:
+        """LEB128 bytes of non-negative `values` plus the byte size of each."""
+        sizes = np.ones(values.size, dtype=np.int64)
+        for shift in (7, 14, 21, 28):
+            sizes += values >= (1 << shift)
+        starts = np.cumsum(sizes) - sizes
+        out = np.empty(int(sizes.sum()), dtype=np.uint8)
+        for k in range(int(sizes.max()) if sizes.size else 0):
+            has = sizes > k
+            more = (sizes[has] > k + 1).astype(np.int64) << 7
+            out[starts[has] + k] = ((values[has] >> (7 * k)) & 0x7F) | more
+        return out.tobytes(), sizes
+
+    @classmethod
+    def split_packets(
+        cls, buffer: bytes
+    ) -> Tuple[List[Tuple[int, int, int, int, int, bytes]], bytes]:
+        """
+        Split a byte buffer into complete packets. Returns (packets, remainder).
+        Each packet tuple: (version, flags, frame_id, width, height, payload).
+        """
+        parser = StreamParser(len(buffer))
+        packets = parser.feed(buffer)
+        return packets, parser.unparsed()
+
+    @classmethod
+    def extract_frames(
+        cls, buffer: bytes, use_numpy: Optional[bool] = None
+    ) -> Tuple[List[Tuple[int, int, int, bytes, bool]], bytes]:
         """
         Extract complete frames from a byte buffer. Returns (frames, remainder).
         Each frame tuple: (frame_id, width, height, grayscale_bytes, is_bw).
+        `use_numpy` selects the vectorized run decoder (default: when available).
+        Delta packets are skipped; they need the framebuffer kept by StreamClient.
         """
+        packets, remainder = cls.split_packets(buffer)
         frames: List[Tuple[int, int, int, bytes, bool]] = []
-        search_from = 0
-        while True:
-            start_idx = buffer.find(cls.START_SEQ, search_from)
-            if start_idx == -1:
-                # Keep a small tail to handle split markers.
-                tail = buffer[-3:] if len(buffer) > 3 else buffer
-                return frames, tail
-            if len(buffer) < start_idx + cls.HEADER_SIZE:
-                return frames, buffer[start_idx:]
-            header_chunk = buffer[start_idx:start_idx + cls.HEADER_SIZE]
+        for _version, flags, frame_id, width, height, payload in packets:
+            if flags & cls.FLAG_DELTA:
+                continue
             try:
-                (
-                    start_byte,
-                    magic,
-                    version,
-                    flags,
-                    frame_id,
-                    width,
-                    height,
-                    payload_len,
-                ) = cls.HEADER_STRUCT.unpack(header_chunk)
-            except struct.error:
-                search_from = start_idx + 1
+                if flags & cls.FLAG_VECTOR:
+                    gray = cls.render_vectors(
+                        *cls.decode_vectors(flags, payload, width * height), width, height
+                    )
+                else:
+                    gray = cls.decode_keyframe(flags, payload, width * height, use_numpy)
+            except ValueError:
+                continue  # corrupt compressed or timestamped payload
+            frames.append((frame_id, width, height, gray, bool(flags & cls.FLAG_BW)))
+        return frames, remainder
+
+    @classmethod
+    def decode_vectors(
+        cls, flags: int, payload: bytes, pixel_count: int
+    ) -> Tuple[Tuple[int, int], List[Tuple[int, int]]]:
+        """(beam start, [(dx, dy), ...]) of a FLAG_VECTOR packet; ValueError if malformed."""
+        _captured, flags, payload = cls.split_timestamp(flags, payload)
+        payload = cls.decompress_payload(flags, payload, cls._max_payload_size(pixel_count))
+        if len(payload) < cls.VECTOR_START_STRUCT.size:
+            raise ValueError("truncated vector frame")
+        start = cls.VECTOR_START_STRUCT.unpack_from(payload)
+        vectors, _end = unpack_ivry_frame(payload, cls.VECTOR_START_STRUCT.size)
+        return start, vectors
+
+    @classmethod
+    def render_vectors(
+        cls, start: Tuple[int, int], vectors: List[Tuple[int, int]], width: int, height: int
+    ) -> bytes:
+        """Gray bytes of the beam path drawn as white lines on black."""
+        surface = pygame.Surface((width, height), 0, 8)
+        surface.set_palette(cls.GRAY_PALETTE)
+        surface.fill(0)
+        x, y = start
+        points = [(x, y)]
+        for dx, dy in vectors:
+            x += dx
+            y += dy
+            points.append((x, y))
+        if len(points) > 1:
+            pygame.draw.lines(surface, 255, False, points)
+        return pygame.image.tostring(surface, "P")
+
+    @classmethod
+    def decode_keyframe(
+        cls, flags: int, payload: bytes, pixel_count: int, use_numpy: Optional[bool] = None
+    ) -> bytes:
+        if use_numpy is None:
+            use_numpy = np is not None
+        _captured, flags, payload = cls.split_timestamp(flags, payload)
+        payload = cls.decompress_payload(flags, payload, cls._max_payload_size(pixel_count))
+        if flags & cls.FLAG_COMPACT:
+            payload = cls.expand_compact(flags, payload, use_numpy)
+        if flags & cls.FLAG_BW:
+            if use_numpy:
+                return cls._decode_bw_payload_np(payload, pixel_count)
+            return cls._decode_bw_payload(payload, pixel_count)
+        if use_numpy:
+            return cls._decode_payload_np(payload, pixel_count)
+        return cls._decode_payload(payload, pixel_count)
+
+    @classmethod
+    def apply_delta(
+        cls,
+        framebuffer: bytearray,
+        payload: bytes,
+        use_numpy: Optional[bool] = None,
+        flags: int = FLAG_DELTA,
+    ) -> None:
+        """Paint the grayscale runs of a delta payload over `framebuffer`."""
+        if use_numpy is None:
+            use_numpy = np is not None
+        _captured, flags, payload = cls.split_timestamp(flags, payload)
+        payload = cls.decompress_payload(
+            flags, payload, cls._max_payload_size(len(framebuffer))
+        )
+        if flags & cls.FLAG_COMPACT:
+            payload = cls.expand_compact(flags, payload, use_numpy)
+        if use_numpy:
+            runs = np.frombuffer(
+                payload, dtype=RUN_DTYPE, count=len(payload) // cls.RUN_SIZE
+            )
+            gray = np.frombuffer(framebuffer, dtype=np.uint8)
+            cls._fill_runs_np(gray, runs["offset"], runs["run_len"], runs["gray"])
+        else:
+            cls._paint_runs(framebuffer, payload)
+
+    @classmethod
+    def expand_compact(
+        cls, flags: int, payload: bytes, use_numpy: Optional[bool] = None
+    ) -> bytes:
+        """
+        Expand a FLAG_COMPACT payload back to fixed run records (B/W records
+        for B/W keyframes, grayscale records otherwise). A corrupt block is
+        dropped; the following blocks still start at their absolute offsets.
+        """
+        if use_numpy is None:
+            use_numpy = np is not None
+        bw = bool(flags & cls.FLAG_BW) and not flags & cls.FLAG_DELTA
+        palette: Optional[bytes] = None
+        bits = 0
+        pos = 0
+        if not bw:
+            if not payload:
+                return b""
+            count = payload[0]
+            palette = payload[1:1 + count] if count else None
+            bits = (count - 1).bit_length() if count else 8
+            pos = 1 + count
+        blocks = []
+        while pos + cls.COMPACT_BLOCK_STRUCT.size <= len(payload):
+            base, size = cls.COMPACT_BLOCK_STRUCT.unpack_from(payload, pos)
+            pos += cls.COMPACT_BLOCK_STRUCT.size
+            body = payload[pos:pos + size]
+            pos += size
+            if len(body) < size:
+                break
+            blocks.append((base, body))
+        if use_numpy:
+            return cls._expand_compact_np(blocks, palette, bits, bw)
+        out = bytearray()
+        for base, body in blocks:
+            try:
+                out += cls._expand_compact_block(base, body, palette, bits, bw)
+            except (IndexError, ValueError, struct.error):
                 continue
-            if start_byte != cls.START_BYTE or magic != cls.MAGIC:
-                search_from = start_idx + 1
+        return bytes(out)
+
+    @classmethod
+    def _expand_compact_block(
+        cls, base: int, body: bytes, palette: Optional[bytes], bits: int, bw: bool
+    ) -> bytes:
+        out = bytearray()
+        mask = (1 << bits) - 1
+        end = base
+        pos = 0
+        while pos < len(body):
+            gap, pos = cls._get_varint(body, pos)
+            token, pos = cls._get_varint(body, pos)
+            offset = end + gap
+            run_len = token >> bits
+            gray = token & mask
+            if palette is not None:
+                gray = palette[gray]
+            end = offset + run_len
+            while run_len > 0:
+                piece = min(run_len, cls.MAX_RUN_LEN)
+                if bw:
+                    out += cls.BW_RUN_STRUCT.pack(offset, piece)
+                else:
+                    out += cls.RUN_STRUCT.pack(offset, gray, piece)
+                offset += piece
+                run_len -= piece
+        return bytes(out)
+
+    @staticmethod
+    def _get_varint(data: bytes, pos: int) -> Tuple[int, int]:
+        value = shift = 0
+        while True:
+            byte = data[pos]
+            pos += 1
+            value |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return value, pos
+            shift += 7
+            if shift > 28:
+                raise ValueError("varint longer than 5 bytes")
+
+    @classmethod
+    def _expand_compact_np(cls, blocks, palette: Optional[bytes], bits: int, bw: bool) -> bytes:
+        offsets_parts = []
+        lengths_parts = []
+        grays_parts = []
+        for base, body in blocks:
+            values = cls._read_varints_np(body)
+            if values is None or values.size % 2:
                 continue
-            total_len = cls.HEADER_SIZE + payload_len
-            if len(buffer) < start_idx + total_len:
-                return frames, buffer[start_idx:]
-            payload = buffer[start_idx + cls.HEADER_SIZE:start_idx + total_len]
-            if flags & cls.FLAG_BW:
-                gray = cls._decode_bw_payload(payload, width * height)
-                is_bw = True
+            run_lens = values[1::2] >> bits
+            index = values[1::2] & ((1 << bits) - 1)
+            if palette is not None:
+                if index.size and int(index.max()) >= len(palette):
+                    continue
+                grays = np.frombuffer(palette, dtype=np.uint8)[index]
             else:
-                gray = cls._decode_payload(payload, width * height)
-                is_bw = False
-            frames.append((frame_id, width, height, gray, is_bw))
-            buffer = buffer[start_idx + total_len :]
-            search_from = 0
+                grays = index.astype(np.uint8)
+            ends = base + np.cumsum(values[0::2] + run_lens)
+            offsets_parts.append(ends - run_lens)
+            lengths_parts.append(run_lens)
+            grays_parts.append(grays)
+        if not offsets_parts:
+            return b""
+        offsets = np.concatenate(offsets_parts)
+        lengths = np.concatenate(lengths_parts)
+        grays = np.concatenate(grays_parts)
+        keep = (lengths > 0) & (offsets + lengths <= 0xFFFFFFFF)
+        offsets, lengths, grays = offsets[keep], lengths[keep], grays[keep]
+        starts, lengths, source = cls._split_long_runs_np(offsets, lengths)
+        runs = np.empty(starts.size, dtype=BW_RUN_DTYPE if bw else RUN_DTYPE)
+        runs["offset"] = starts
+        runs["run_len"] = lengths
+        if not bw:
+            runs["gray"] = grays[source]
+        return runs.tobytes()
+
+    @staticmethod
+    def _read_varints_np(body: bytes) -> Optional["np.ndarray"]:
+        """Decode LEB128 varints; None when `body` is truncated or malformed."""
+        data = np.frombuffer(body, dtype=np.uint8)
+        if data.size == 0:
+            return np.zeros(0, dtype=np.int64)
+        if data[-1] & 0x80:
+            return None
+        ends = np.flatnonzero(data < 0x80)
+        starts = np.concatenate((np.zeros(1, dtype=ends.dtype), ends[:-1] + 1))
+        sizes = ends - starts + 1
+        if int(sizes.max()) > 5:
+            return None
+        values = np.zeros(ends.size, dtype=np.int64)
+        for k in range(int(sizes.max())):
+            has = sizes > k
+            values[has] |= (data[starts[has] + k].astype(np.int64) & 0x7F) << (7 * k)
+        return values
 
     @classmethod
     def _decode_payload(cls, payload: bytes, pixel_count: int) -> bytes:
         gray = bytearray(pixel_count)
+        cls._paint_runs(gray, payload)
+        return bytes(gray)
+
+    @classmethod
+    def _paint_runs(cls, gray: bytearray, payload: bytes) -> None:
+        pixel_count = len(gray)
         for i in range(0, len(payload), cls.RUN_SIZE):
             chunk = payload[i : i + cls.RUN_SIZE]
             if len(chunk) < cls.RUN_SIZE:
@@ -261,7 +1353,6 @@ class ScreenStreamer:
             if offset >= pixel_count or offset >= end:
                 continue
             gray[offset:end] = bytes([gval]) * (end - offset)
-        return bytes(gray)
 
     @classmethod
     def _decode_bw_payload(cls, payload: bytes, pixel_count: int) -> bytes:
@@ -277,20 +1368,183 @@ class ScreenStreamer:
             gray[offset:end] = b"\xFF" * (end - offset)
         return bytes(gray)
 
+    @classmethod
+    def _decode_payload_np(cls, payload: bytes, pixel_count: int) -> bytes:
+        runs = np.frombuffer(payload, dtype=RUN_DTYPE, count=len(payload) // cls.RUN_SIZE)
+        gray = np.zeros(pixel_count, dtype=np.uint8)
+        cls._fill_runs_np(gray, runs["offset"], runs["run_len"], runs["gray"])
+        return gray.tobytes()
+
+    @classmethod
+    def _decode_bw_payload_np(cls, payload: bytes, pixel_count: int) -> bytes:
+        runs = np.frombuffer(
+            payload, dtype=BW_RUN_DTYPE, count=len(payload) // cls.BW_RUN_SIZE
+        )
+        gray = np.zeros(pixel_count, dtype=np.uint8)
+        cls._fill_runs_np(gray, runs["offset"], runs["run_len"], None)
+        return gray.tobytes()
+
     @staticmethod
-    def gray_to_surface(gray: bytes, width: int, height: int) -> pygame.Surface:
+    def _fill_runs_np(gray: "np.ndarray", offsets, run_lens, values) -> None:
+        """
+        Paint runs into `gray` in place; `values=None` paints white (B/W).
+        Out-of-range runs are skipped like in the scalar decoders.
+        """
+        offsets = offsets.astype(np.int64)
+        ends = np.minimum(offsets + run_lens, gray.size)
+        valid = offsets < ends
+        if not valid.all():
+            offsets, ends = offsets[valid], ends[valid]
+            if values is not None:
+                values = values[valid]
+        if offsets.size == 0:
+            return
+        if offsets.size > 1 and np.any(offsets[1:] < ends[:-1]):
+            # Overlapping or unordered runs: later runs must win, paint in order.
+            fill = [255] * offsets.size if values is None else values.tolist()
+            for start, end, value in zip(offsets.tolist(), ends.tolist(), fill):
+                gray[start:end] = value
+            return
+        lengths = ends - offsets
+        first = np.cumsum(lengths) - lengths
+        index = np.repeat(offsets - first, lengths) + np.arange(int(lengths.sum()))
+        gray[index] = 255 if values is None else np.repeat(values, lengths)
+
+    @classmethod
+    def gray_to_surface(
+        cls, gray: bytes, width: int, height: int, palettized: bool = False
+    ) -> pygame.Surface:
+        """
+        Wrap gray bytes in a surface. `palettized` builds an 8-bit surface with
+        a gray palette directly over the buffer instead of expanding to RGB.
+        """
+        if palettized:
+            surface = pygame.image.frombuffer(gray, (width, height), "P")
+            surface.set_palette(cls.GRAY_PALETTE)
+            return surface
         rgb = bytearray()
         for g in gray:
             rgb.extend((g, g, g))
         return pygame.image.frombuffer(bytes(rgb), (width, height), "RGB")
 
 
+class StreamParser:
+    """
+    Incremental IVG packet parser over one reusable bytearray. Each call
+    parses only the bytes that just arrived and returns the packets they
+    complete as (version, flags, frame_id, width, height, payload) tuples;
+    consumed bytes are never copied again.
+
+    Bytes come in through feed(), or without an extra copy by reading into
+    get_buffer() and then calling buffer_updated(n), which matches
+    asyncio.BufferedProtocol (and socket.recv_into for reader threads).
+    Not thread-safe: use it from one thread or one event loop.
+    """
+
+    MIN_READ = 4096
+
+    def __init__(self, initial_size: int = 65536):
+        self._buf = bytearray(max(initial_size, 1))
+        self._start = 0  # first byte not consumed yet
+        self._end = 0  # end of received bytes
+        self._header: Optional[tuple] = None  # header parsed at _start
+        self.bad_headers = 0
+
+    def feed(self, data) -> List[Tuple[int, int, int, int, int, bytes]]:
+        size = len(data)
+        self.get_buffer(size)[:size] = data
+        return self.buffer_updated(size)
+
+    def get_buffer(self, size_hint: int = -1) -> memoryview:
+        """Writable view for at least `size_hint` (default MIN_READ) bytes."""
+        need = size_hint if size_hint > 0 else self.MIN_READ
+        if len(self._buf) - self._end < need:
+            self._make_room(need)
+        return memoryview(self._buf)[self._end:]
+
+    def buffer_updated(self, nbytes: int) -> List[Tuple[int, int, int, int, int, bytes]]:
+        self._end += nbytes
+        return self._parse()
+
+    def unparsed(self) -> bytes:
+        """Received bytes not consumed by a complete packet yet."""
+        return bytes(self._buf[self._start:self._end])
+
+    def _make_room(self, need: int):
+        pending = self._end - self._start
+        if pending + need <= len(self._buf):
+            # Same-size slice assignment: safe while views are exported.
+            self._buf[:pending] = self._buf[self._start:self._end]
+        else:
+            size = len(self._buf)
+            while size < pending + need:
+                size *= 2
+            buf = bytearray(size)
+            buf[:pending] = self._buf[self._start:self._end]
+            self._buf = buf
+        self._start = 0
+        self._end = pending
+
+    def _parse(self) -> List[Tuple[int, int, int, int, int, bytes]]:
+        packets: List[Tuple[int, int, int, int, int, bytes]] = []
+        buf = self._buf
+        header_size = ScreenStreamer.HEADER_SIZE
+        while True:
+            if self._header is None:
+                idx = buf.find(ScreenStreamer.START_SEQ, self._start, self._end)
+                if idx == -1:
+                    # Keep a small tail to handle split markers.
+                    self._start = max(self._start, self._end - len(ScreenStreamer.START_SEQ) + 1)
+                    break
+                self._start = idx
+                if self._end - idx < header_size:
+                    break
+                header = ScreenStreamer.HEADER_STRUCT.unpack_from(buf, idx)
+                width, height, payload_len = header[-3:]
+                if payload_len > ScreenStreamer._max_payload_size(width * height):
+                    # Not a real header (a start marker inside a payload).
+                    self.bad_headers += 1
+                    self._start = idx + 1
+                    continue
+                self._header = header
+            _start_byte, _magic, version, flags, frame_id, width, height, payload_len = self._header
+            total = header_size + payload_len
+            if self._end - self._start < total:
+                break
+            with memoryview(buf) as view:
+                payload = bytes(view[self._start + header_size:self._start + total])
+            packets.append((version, flags, frame_id, width, height, payload))
+            self._start += total
+            self._header = None
+        if self._start == self._end:
+            self._start = self._end = 0
+        return packets
+
+
 class StreamClient:
     """
     Simple client that reads frames from a TCP socket or serial file and yields
     decoded surfaces.
+
+    With `latest_only`, the reader thread decodes every packet itself (deltas
+    must all be applied) and keeps just the newest decoded frame; poll_frames
+    returns at most that one and frames replaced before a poll are counted
+    in `frames_dropped`. Otherwise the reader queues parsed packets (at most
+    `max_queued_packets`) and poll_frames decodes them all.
+
+    The reader receives straight into the parser's buffer (recv_into /
+    readinto) and blocks with a short timeout instead of sleep-polling.
+
+    `frame_stats` collects decode, surface and (via frame_presented) present
+    times; timestamped streams add transport and end-to-end latency. A
+    record is closed every `stats_interval` seconds during poll_frames.
     """
 
+    MIN_READ = 4096
+    MAX_READ = 1 << 20
+    READ_TIMEOUT = 0.2  # seconds; bounds how long stop() waits for the reader
+    FRAME_TIMES_KEPT = 64  # decoded frames remembered for frame_presented()
+
     def __init__(
         self,
         host: Optional[str] = None,
@@ -298,6 +1552,13 @@ class StreamClient:
         serial_path: Optional[str] = None,
         serial_baud: int = 115200,
         expect_bw: bool = False,
+        fast_decode: bool = True,
+        latest_only: bool = False,
+        bw_threshold: int = ScreenStreamer.BW_THRESHOLD,
+        dither: str = DITHER_NONE,
+        max_queued_packets: int = 256,
+        stats_path: Optional[str] = None,
+        stats_interval: float = 1.0,
     ):
         if not port and not serial_path:
             raise ValueError("Either port or serial_path is required")
@@ -306,9 +1567,33 @@ class StreamClient:
         self.serial_path = serial_path
         self.serial_baud = serial_baud
         self.expect_bw = expect_bw
+        # Gray frames shown with expect_bw go through the sender's B/W stage.
+        self.bw_threshold = bw_threshold
+        self.dither = dither
+        warm_up(dither)
+        # Vectorized run decoding plus palettized surfaces; False keeps the
+        # original per-run / per-pixel path.
+        self.fast_decode = fast_decode
         self._conn = None
-        self._buffer = b""
-        self._queue: "queue.Queue[bytes]" = queue.Queue()
+        self._parser = StreamParser()
+        # Persistent framebuffer for protocol v2 delta packets. None means we
+        # are waiting for a keyframe (startup, resync or a missed packet).
+        self._framebuffer: Optional[bytearray] = None
+        self._framebuffer_size: Tuple[int, int] = (0, 0)
+        self._last_frame_id: Optional[int] = None
+        self.latest_only = latest_only
+        self._queue: "queue.Queue[tuple]" = queue.Queue(maxsize=max_queued_packets)
+        self._read_size = self.MIN_READ
+        self._latest: Optional[Tuple[int, int, int, int, bytes]] = None
+        self._latest_lock = threading.Lock()
+        self.frames_decoded = 0
+        self.frames_dropped = 0
+        self.frame_stats = StreamStats("viewer", stats_path, stats_interval)
+        # frame_id -> (capture time in us or None, decode end time)
+        self._frame_times: "collections.OrderedDict[int, Tuple[Optional[int], float]]" = (
+            collections.OrderedDict()
+        )
+        self._frame_times_lock = threading.Lock()
         self._reader_thread = None
         self._stop_event = threading.Event()
 
@@ -317,12 +1602,13 @@ class StreamClient:
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect((self.host, self.port))
             sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(self.READ_TIMEOUT)
             self._conn = sock
         else:
             if serial is None:
                 raise RuntimeError("pyserial is required for serial streaming")
             self._conn = serial.Serial(
-                self.serial_path, baudrate=self.serial_baud, timeout=0
+                self.serial_path, baudrate=self.serial_baud, timeout=self.READ_TIMEOUT
             )
         self._reader_thread = threading.Thread(target=self._reader_loop, daemon=True)
         self._reader_thread.start()
@@ -338,39 +1624,170 @@ class StreamClient:
                 pass
 
     def _reader_loop(self):
+        is_socket = isinstance(self._conn, socket.socket)
         while not self._stop_event.is_set():
+            view = self._parser.get_buffer(self._read_size)[:self._read_size]
             try:
-                if isinstance(self._conn, socket.socket):
-                    chunk = self._conn.recv(4096)
+                if is_socket:
+                    count = self._conn.recv_into(view)
+                    if not count:
+                        break  # peer closed the connection
                 else:
-                    chunk = self._conn.read(4096)
-                if not chunk:
-                    time.sleep(0.01)
-                    continue
-                self._queue.put(chunk)
+                    # Wait (up to the timeout) for one byte, then take all
+                    # that is already buffered.
+                    wanted = min(max(1, self._conn.in_waiting), self._read_size)
+                    count = self._conn.readinto(view[:wanted])
+                    if not count:
+                        continue
+            except socket.timeout:
+                continue
             except (BlockingIOError, InterruptedError):
-                time.sleep(0.01)
+                continue
             except OSError:
                 break
+            finally:
+                view.release()
+            self._adapt_read_size(count)
+            packets = self._parser.buffer_updated(count)
+            if self.latest_only:
+                self._decode_latest(packets)
+            else:
+                for packet in packets:
+                    self._enqueue_packet(packet)
+
+    def _adapt_read_size(self, count: int):
+        # Full reads mean a backlog: read more at once. Small ones: shrink.
+        if count >= self._read_size:
+            self._read_size = min(self._read_size * 2, self.MAX_READ)
+        elif count < self._read_size // 4:
+            self._read_size = max(self._read_size // 2, self.MIN_READ)
+
+    def _enqueue_packet(self, packet: tuple):
+        # A full queue blocks the reader, which pushes back on the sender.
+        while not self._stop_event.is_set():
+            try:
+                self._queue.put(packet, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _decode_latest(self, packets: List[tuple]):
+        for _version, flags, frame_id, width, height, payload in packets:
+            gray = self._apply_packet(flags, frame_id, width, height, payload)
+            if gray is None:
+                continue
+            with self._latest_lock:
+                self.frames_decoded += 1
+                if self._latest is not None:
+                    self.frames_dropped += 1
+                self._latest = (frame_id, width, height, flags, gray)
 
     def poll_frames(self) -> List[Tuple[int, int, int, pygame.Surface]]:
+        if self.latest_only:
+            with self._latest_lock:
+                latest, self._latest = self._latest, None
+            self.frame_stats.maybe_flush(self.stats)
+            if latest is None:
+                return []
+            return [self._to_surface(*latest)]
         frames: List[Tuple[int, int, int, pygame.Surface]] = []
+        packets = []
         while not self._queue.empty():
-            chunk = self._queue.get()
-            self._buffer += chunk
-        if not self._buffer:
-            return frames
-        decoded, self._buffer = ScreenStreamer.extract_frames(self._buffer)
-        for frame_id, width, height, gray, is_bw in decoded:
-            if self.expect_bw and not is_bw:
-                gray = self._threshold_bw(gray)
-            surface = ScreenStreamer.gray_to_surface(gray, width, height)
-            frames.append((frame_id, width, height, surface))
+            packets.append(self._queue.get())
+        for _version, flags, frame_id, width, height, payload in packets:
+            gray = self._apply_packet(flags, frame_id, width, height, payload)
+            if gray is None:
+                continue
+            self.frames_decoded += 1
+            frames.append(self._to_surface(frame_id, width, height, flags, gray))
+        self.frame_stats.maybe_flush(self.stats)
         return frames
 
-    @staticmethod
-    def _threshold_bw(gray: bytes) -> bytes:
-        buf = bytearray(len(gray))
-        for i, g in enumerate(gray):
-            buf[i] = 255 if g >= 128 else 0
-        return bytes(buf)
+    def _to_surface(
+        self, frame_id: int, width: int, height: int, flags: int, gray: bytes
+    ) -> Tuple[int, int, int, pygame.Surface]:
+        started = time.monotonic()
+        if self.expect_bw and not flags & ScreenStreamer.FLAG_BW:
+            gray = to_bw(gray, width, self.bw_threshold, self.dither)
+        surface = ScreenStreamer.gray_to_surface(
+            gray, width, height, palettized=self.fast_decode
+        )
+        self.frame_stats.add("surface_ms", (time.monotonic() - started) * 1000)
+        return frame_id, width, height, surface
+
+    def frame_presented(self, frame_id: int):
+        """Report that `frame_id` is on screen (e.g. right after flip())."""
+        now = time.monotonic()
+        with self._frame_times_lock:
+            times = self._frame_times.pop(frame_id, None)
+        self.frame_stats.count("frames_presented")
+        if times is None:
+            return
+        captured_us, decoded = times
+        self.frame_stats.add("present_ms", (now - decoded) * 1000)
+        if captured_us is not None:
+            self.frame_stats.add("end_to_end_ms", (now * 1_000_000 - captured_us) / 1000)
+
+    def stats(self) -> dict:
+        return {
+            "frames_decoded": self.frames_decoded,
+            "frames_dropped": self.frames_dropped,
+            "queued_packets": self._queue.qsize(),
+        }
+
+    def _apply_packet(
+        self, flags: int, frame_id: int, width: int, height: int, payload: bytes
+    ) -> Optional[bytes]:
+        use_numpy = self.fast_decode and np is not None
+        started = time.monotonic()
+        self.frame_stats.add("packet_bytes", ScreenStreamer.HEADER_SIZE + len(payload))
+        try:
+            captured_us, flags, payload = ScreenStreamer.split_timestamp(flags, payload)
+            gray = self._decode_packet(flags, frame_id, width, height, payload, use_numpy)
+        except ValueError:
+            # Undecodable compressed payload: resync on the next keyframe.
+            self._framebuffer = None
+            return None
+        if gray is None:
+            return None
+        decoded = time.monotonic()
+        self.frame_stats.add("decode_ms", (decoded - started) * 1000)
+        if captured_us is not None:
+            # Monotonic clocks only agree between processes on one host.
+            self.frame_stats.add("receive_latency_ms", (started * 1_000_000 - captured_us) / 1000)
+        with self._frame_times_lock:
+            self._frame_times[frame_id] = (captured_us, decoded)
+            while len(self._frame_times) > self.FRAME_TIMES_KEPT:
+                self._frame_times.popitem(last=False)
+        return gray
+
+    def _decode_packet(
+        self, flags: int, frame_id: int, width: int, height: int, payload: bytes, use_numpy: bool
+    ) -> Optional[bytes]:
+        if flags & ScreenStreamer.FLAG_VECTOR:
+            start, vectors = ScreenStreamer.decode_vectors(flags, payload, width * height)
+            # Raster deltas cannot build on a vector frame.
+            self._framebuffer = None
+            self._last_frame_id = frame_id
+            return ScreenStreamer.render_vectors(start, vectors, width, height)
+        if flags & ScreenStreamer.FLAG_DELTA:
+            expected_id = None
+            if self._last_frame_id is not None:
+                expected_id = (self._last_frame_id + 1) & 0xFFFFFFFF
+            if (
+                self._framebuffer is None
+                or self._framebuffer_size != (width, height)
+                or frame_id != expected_id
+            ):
+                # The delta base is gone; drop deltas until the next keyframe.
+                self._framebuffer = None
+                return None
+            ScreenStreamer.apply_delta(self._framebuffer, payload, use_numpy, flags)
+        else:
+            gray = ScreenStreamer.decode_keyframe(
+                flags, payload, width * height, use_numpy
+            )
+            self._framebuffer = bytearray(gray)
+            self._framebuffer_size = (width, height)
+        self._last_frame_id = frame_id
+        return bytes(self._framebuffer)
@@ -0,0 +1,137 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+
+class AdaptiveController:
+    """
+    Keeps end-to-end stream latency near `target_latency` on slow links.
+
+    Every offered frame, the streamer reports the worst transport backlog
+    (bytes waiting) and its estimated capacity (bytes/s):
+      - if the backlog alone takes longer than the target to drain, the frame
+        is skipped;
+      - if the bytes/s the current quality needs exceed the capacity, the
+        quality drops one step (coarser gray levels, then black/white);
+      - once the link has been comfortably idle for `hold` seconds, the
+        quality goes back up one step.
+    """
+
+    # (mode, gray mask): masking low bits lengthens runs, B/W is smallest.
+    LEVELS: List[Tuple[str, int]] = [
+        ("gray", 0xFF),
+        ("gray", 0xF0),
+        ("gray", 0xC0),
+        ("bw", 0xFF),
+    ]
+    DEGRADE_UTILIZATION = 0.9
+    UPGRADE_UTILIZATION = 0.4
+    EMA = 0.2
+
+    def __init__(
+        self,
+        target_latency: float = 0.25,
+        allow_bw: bool = True,
+        bw_only: bool = False,
+        hold: float = 2.0,
+    ):
+        self.target_latency = target_latency
+        self.hold = hold
+        if bw_only:
+            self.levels = [level for level in self.LEVELS if level[0] == "bw"]
+        elif allow_bw:
+            self.levels = list(self.LEVELS)
+        else:
+            self.levels = [level for level in self.LEVELS if level[0] == "gray"]
+        self.level = 0
+        self._last_change = time.monotonic()
+        self._last_offer: Optional[float] = None
+        self._offer_interval = 0.0
+        self._frame_bytes = 0.0
+        self.frames_offered = 0
+        self.frames_skipped = 0
+        self.frames_sent = 0
+        self.level_changes = 0
+        self.est_latency = 0.0
+        self.capacity = 0.0
+
+    @property
+    def bw_mode(self) -> bool:
+        return self.levels[self.level][0] == "bw"
+
+    @property
+    def gray_mask(self) -> int:
+        return self.levels[self.level][1]
+
+    def offer_frame(self, backlog: int, capacity: float) -> bool:
+        """Decide for one frame. Returns False when it should be skipped."""
+        now = time.monotonic()
+        if self._last_offer is not None:
+            interval = now - self._last_offer
+            self._offer_interval += self.EMA * (interval - self._offer_interval)
+        self._last_offer = now
+        self.frames_offered += 1
+        self.capacity = capacity
+        if capacity > 0:
+            self.est_latency = backlog / capacity
+        else:
+            self.est_latency = float("inf") if backlog else 0.0
+        self._adjust_level(now, backlog)
+        if self.est_latency > self.target_latency:
+            self.frames_skipped += 1
+            return False
+        self.frames_sent += 1
+        return True
+
+    def record_packet(self, size: int):
+        self._frame_bytes += self.EMA * (size - self._frame_bytes)
+
+    def demand(self) -> float:
+        """Bytes/s the current quality needs at the offered frame rate."""
+        if self._offer_interval <= 0:
+            return 0.0
+        return self._frame_bytes / self._offer_interval
+
+    def _adjust_level(self, now: float, backlog: int):
+        if now - self._last_change < self.hold:
+            return
+        if not self.capacity:
+            # Capacity is only measurable while bytes are queued; an empty,
+            # unmeasured link is treated as idle.
+            if not backlog and self.level > 0:
+                self._set_level(self.level - 1, now)
+            return
+        utilization = self.demand() / self.capacity
+        backlogged = self.est_latency > self.target_latency
+        if (
+            utilization > self.DEGRADE_UTILIZATION or backlogged
+        ) and self.level < len(self.levels) - 1:
+            self._set_level(self.level + 1, now)
+        elif (
+            utilization < self.UPGRADE_UTILIZATION
+            and not backlogged
+            and self.level > 0
+        ):
+            self._set_level(self.level - 1, now)
+
+    def _set_level(self, level: int, now: float):
+        self.level = level
+        self.level_changes += 1
+        self._last_change = now
+        # The next frame's size is unknown; do not judge it by the old level.
+        self._frame_bytes = 0.0
+
+    def stats(self) -> Dict[str, object]:
+        mode, mask = self.levels[self.level]
+        return {
+            "target_latency_ms": round(self.target_latency * 1000, 1),
+            "est_latency_ms": round(self.est_latency * 1000, 1),
+            "capacity_bps": round(self.capacity, 1),
+            "demand_bps": round(self.demand(), 1),
+            "mode": mode,
+            "gray_levels": 2 if mode == "bw" else 256 >> bin(0xFF ^ mask).count("1"),
+            "level": self.level,
+            "level_changes": self.level_changes,
+            "frames_offered": self.frames_offered,
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+        }
@@ -0,0 +1,181 @@
+import bisect
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import List, Optional, Tuple
+
+
+class CaptureWriter:
+    """
+    Tee IVG packets into an indexed capture file:
+
+        file header   "IVGC" | version (u16) | reserved (u16)
+        packets       wire bytes, back to back
+        index         per packet: offset (u64) | length (u32) | time_us (u64) | flags (u8)
+        trailer       index_offset (u64) | count (u32) | "IVGI"
+
+    `time_us` counts from the first packet. The index is written on close();
+    a file without it (crash, raw wire dump) is re-indexed by CaptureReader.
+    Writes and close() may come from different threads.
+    """
+
+    MAGIC = b"IVGC"
+    VERSION = 1
+    FILE_HEADER = struct.Struct("<4s H H")
+    INDEX_STRUCT = struct.Struct("<Q I Q B")
+    TRAILER = struct.Struct("<Q I 4s")
+    TRAILER_MAGIC = b"IVGI"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fp = open(path, "wb")
+        self._fp.write(self.FILE_HEADER.pack(self.MAGIC, self.VERSION, 0))
+        self._offset = self.FILE_HEADER.size
+        self._index: List[Tuple[int, int, int, int]] = []
+        self._started: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def write(self, packet: bytes, time_us: Optional[int] = None):
+        self._write(packet, time_us, time.monotonic())
+
+    def write_at(self, packet: bytes, sent: float):
+        """write() for a packet sent at `sent` (time.monotonic()), not now."""
+        self._write(packet, None, sent)
+
+    def _write(self, packet: bytes, time_us: Optional[int], sent: float):
+        with self._lock:
+            if self._fp is None:
+                return
+            if time_us is None:
+                if self._started is None:
+                    self._started = sent
+                time_us = max(0, int((sent - self._started) * 1_000_000))
+            self._fp.write(packet)
+            self._index.append((self._offset, len(packet), time_us, packet[5]))
+            self._offset += len(packet)
+
+    def close(self):
+        with self._lock:
+            if self._fp is None:
+                return
+            fp, self._fp = self._fp, None
+            index_offset = self._offset
+            fp.write(b"".join(self.INDEX_STRUCT.pack(*entry) for entry in self._index))
+            fp.write(self.TRAILER.pack(index_offset, len(self._index), self.TRAILER_MAGIC))
+            fp.close()
+
+
+class CaptureReader:
+    """
+    Memory-mapped, randomly seekable view of a capture file. packet(i)
+    returns a zero-copy memoryview of the i-th packet's wire bytes.
+    Files without an index are scanned once (see _scan_packets); raw wire
+    dumps are accepted too, using the timestamp extension when present.
+    """
+
+    DEFAULT_FRAME_US = 33333  # assumed pacing for raw dumps without timestamps
+    FLAG_DELTA = 0x02  # ScreenStreamer.FLAG_DELTA
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fp = open(path, "rb")
+        size = os.fstat(self._fp.fileno()).st_size
+        self._map = mmap.mmap(self._fp.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self._view = memoryview(self._map) if self._map is not None else memoryview(b"")
+        self.offsets: List[int] = []
+        self.lengths: List[int] = []
+        self.times_us: List[int] = []
+        self.flags: List[int] = []
+        if not self._read_index():
+            self._scan_packets()
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __enter__(self) -> "CaptureReader":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def packet(self, index: int) -> memoryview:
+        offset = self.offsets[index]
+        return self._view[offset:offset + self.lengths[index]]
+
+    @property
+    def duration_us(self) -> int:
+        return self.times_us[-1] - self.times_us[0] if self.times_us else 0
+
+    def is_keyframe(self, index: int) -> bool:
+        return not self.flags[index] & self.FLAG_DELTA
+
+    def index_at(self, time_us: int) -> int:
+        """Index of the last packet at or before `time_us` (0 if none)."""
+        return max(0, bisect.bisect_right(self.times_us, time_us) - 1)
+
+    def keyframe_at_or_before(self, index: int) -> int:
+        while index > 0 and not self.is_keyframe(index):
+            index -= 1
+        return index
+
+    def close(self):
+        self._view.release()
+        if self._map is not None:
+            self._map.close()
+        self._fp.close()
+
+    def _read_index(self) -> bool:
+        view = self._view
+        header = CaptureWriter.FILE_HEADER
+        trailer = CaptureWriter.TRAILER
+        if len(view) < header.size + trailer.size:
+            return False
+        magic, _version, _reserved = header.unpack_from(view, 0)
+        if magic != CaptureWriter.MAGIC:
+            return False
+        index_offset, count, trailer_magic = trailer.unpack_from(view, len(view) - trailer.size)
+        entry = CaptureWriter.INDEX_STRUCT
+        if (
+            trailer_magic != CaptureWriter.TRAILER_MAGIC
+            or index_offset + count * entry.size + trailer.size != len(view)
+        ):
+            return False
+        for offset, length, time_us, flags in entry.iter_unpack(
+            view[index_offset:index_offset + count * entry.size]
+        ):
+            self.offsets.append(offset)
+            self.lengths.append(length)
+            self.times_us.append(time_us)
+            self.flags.append(flags)
+        return True
+
+    def _scan_packets(self):
+        # Imported here: screen_streamer imports this module for the tee.
+        from src.utils.screen_streamer import ScreenStreamer
+
+        data = self._map if self._map is not None else b""
+        pos = 0
+        header_size = ScreenStreamer.HEADER_SIZE
+        while True:
+            start = data.find(ScreenStreamer.START_SEQ, pos)
+            if start == -1 or start + header_size > len(data):
+                break
+            header = ScreenStreamer.HEADER_STRUCT.unpack_from(data, start)
+            _start, _magic, _version, flags, _frame_id, width, height, payload_len = header
+            end = start + header_size + payload_len
+            if payload_len > ScreenStreamer._max_payload_size(width * height) or end > len(data):
+                pos = start + 1
+                continue
+            time_us = len(self.offsets) * self.DEFAULT_FRAME_US
+            if flags & ScreenStreamer.FLAG_TIMESTAMP and payload_len >= ScreenStreamer.TIMESTAMP_STRUCT.size:
+                (time_us,) = ScreenStreamer.TIMESTAMP_STRUCT.unpack_from(data, start + header_size)
+            self.offsets.append(start)
+            self.lengths.append(end - start)
+            self.times_us.append(time_us)
+            self.flags.append(flags)
+            pos = end
+        if self.times_us:
+            first = self.times_us[0]
+            self.times_us = [max(0, t - first) for t in self.times_us]
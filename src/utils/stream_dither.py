@@ -0,0 +1,184 @@
+from typing import Dict, List, Tuple
+
+try:
+    import numpy as np  # type: ignore
+except ImportError:  # pragma: no cover - handled at runtime
+    np = None
+
+try:
+    import numba  # type: ignore
+except ImportError:  # pragma: no cover - handled at runtime
+    numba = None
+
+DITHER_NONE = "none"
+DITHER_BAYER = "bayer"
+DITHER_DIFFUSION = "diffusion"
+DITHER_MODES = (DITHER_NONE, DITHER_BAYER, DITHER_DIFFUSION)
+
+# 4x4 ordered dither matrix, values 0..15.
+BAYER_4 = (
+    (0, 8, 2, 10),
+    (12, 4, 14, 6),
+    (3, 11, 1, 9),
+    (15, 7, 13, 5),
+)
+BAYER_SIZE = len(BAYER_4)
+
+_threshold_tables: Dict[int, bytes] = {}
+_bayer_tables: Dict[int, List[List[bytes]]] = {}
+_bayer_maps: Dict[Tuple[int, int, int, int, int], "np.ndarray"] = {}
+_diffusion_compiled = None
+
+# Error diffusion is a per-pixel recurrence; it runs fast enough for live
+# streams only as a numba-compiled kernel (well under 1 ms at 160x120). The
+# pure Python loop it falls back to costs about 10 ms per frame.
+FAST_DIFFUSION = np is not None and numba is not None
+
+
+def bayer_threshold(threshold: int, row: int, col: int) -> int:
+    """
+    Per-pixel threshold of ordered dithering: `threshold` shifted by the
+    Bayer cell, spread over -120..+120 and kept within 1..255.
+    """
+    offset = BAYER_4[row % BAYER_SIZE][col % BAYER_SIZE] * 16 + 8 - 128
+    return min(255, max(1, threshold + offset))
+
+
+def to_bw(gray, width: int, threshold: int, dither: str = DITHER_NONE, origin: Tuple[int, int] = (0, 0)):
+    """
+    Black/white conversion of a row-major luma buffer: every pixel becomes 0
+    or 255. A uint8 array gives an array, bytes give bytes; both produce the
+    same values. `origin` is the (x, y) of the buffer within the frame, so
+    ordered dithering of a dirty region lines up with the full frame.
+    Error diffusion (Floyd-Steinberg) needs the whole frame and is only
+    fast with numba (see FAST_DIFFUSION).
+    """
+    if dither not in DITHER_MODES:
+        raise ValueError(f"Unknown dither mode {dither!r}")
+    use_numpy = np is not None and isinstance(gray, np.ndarray)
+    if dither == DITHER_NONE:
+        table = _threshold_tables.get(threshold)
+        if table is None:
+            table = _threshold_tables[threshold] = bytes(255 if g >= threshold else 0 for g in range(256))
+        if use_numpy:
+            return np.frombuffer(table, dtype=np.uint8)[gray]
+        return bytes(gray).translate(table)
+    if dither == DITHER_BAYER:
+        if use_numpy:
+            return _bayer_np(gray, width, threshold, origin)
+        return _bayer(gray, width, threshold, origin)
+    if FAST_DIFFUSION:
+        if use_numpy:
+            return _diffusion_np(np.ascontiguousarray(gray, dtype=np.uint8).ravel(), width, threshold)
+        return _diffusion_np(np.frombuffer(bytes(gray), dtype=np.uint8), width, threshold).tobytes()
+    if use_numpy:
+        return np.frombuffer(_diffusion(gray.tobytes(), width, threshold), dtype=np.uint8).copy()
+    return _diffusion(bytes(gray), width, threshold)
+
+
+def warm_up(dither: str):
+    """Compile the kernel of `dither` now rather than on the first frame."""
+    if dither == DITHER_DIFFUSION and FAST_DIFFUSION:
+        to_bw(np.zeros(1, dtype=np.uint8), 1, 128, dither)
+
+
+def _bayer(gray: bytes, width: int, threshold: int, origin: Tuple[int, int]) -> bytes:
+    # One translate() table per Bayer cell; each row is converted in
+    # BAYER_SIZE strided slices (one per column phase).
+    tables = _bayer_tables.get(threshold)
+    if tables is None:
+        tables = _bayer_tables[threshold] = [
+            [
+                bytes(255 if g >= bayer_threshold(threshold, row, col) else 0 for g in range(256))
+                for col in range(BAYER_SIZE)
+            ]
+            for row in range(BAYER_SIZE)
+        ]
+    gray = bytes(gray)
+    out = bytearray(len(gray))
+    left, top = origin
+    for y in range(len(gray) // width):
+        base = y * width
+        row_tables = tables[(top + y) % BAYER_SIZE]
+        row = gray[base:base + width]
+        for phase in range(min(BAYER_SIZE, width)):
+            table = row_tables[(left + phase) % BAYER_SIZE]
+            out[base + phase:base + width:BAYER_SIZE] = row[phase::BAYER_SIZE].translate(table)
+    return bytes(out)
+
+
+def _bayer_np(gray: "np.ndarray", width: int, threshold: int, origin: Tuple[int, int]) -> "np.ndarray":
+    height = gray.size // width
+    key = (width, height, threshold) + tuple(origin)
+    thresholds = _bayer_maps.get(key)
+    if thresholds is None:
+        left, top = origin
+        cells = np.array(
+            [[bayer_threshold(threshold, row, col) for col in range(BAYER_SIZE)] for row in range(BAYER_SIZE)],
+            dtype=np.uint8,
+        )
+        rows = (np.arange(height) + top) % BAYER_SIZE
+        cols = (np.arange(width) + left) % BAYER_SIZE
+        thresholds = cells[rows[:, None], cols].ravel()
+        if len(_bayer_maps) > 64:
+            _bayer_maps.clear()  # dirty regions come in many shapes
+        _bayer_maps[key] = thresholds
+    return np.where(gray >= thresholds, 255, 0).astype(np.uint8)
+
+
+# Floyd-Steinberg in integer sixteenths: a pixel is gray * 16 plus the
+# error pushed into it; the error left after quantizing is split 7/3/5/1
+# with floor shifts. Every pixel depends on its left neighbour, so this is
+# one sequential pass (a NumPy wavefront over x + 2y diagonals measured
+# about twice as slow at 160x120): compiled with numba when available,
+# otherwise the loop below.
+def _diffusion(gray: bytes, width: int, threshold: int) -> bytes:
+    height = len(gray) // width
+    limit = threshold * 16
+    out = bytearray(len(gray))
+    below = [0] * (width + 2)
+    for y in range(height):
+        current, below = below, [0] * (width + 2)
+        base = y * width
+        carry = current[1]
+        x = 0
+        for g in gray[base:base + width]:
+            value = g * 16 + carry
+            if value >= limit:
+                out[base + x] = 255
+                value -= 4080
+            carry = current[x + 2] + ((value * 7) >> 4)
+            below[x] += (value * 3) >> 4
+            below[x + 1] += (value * 5) >> 4
+            below[x + 2] += value >> 4
+            x += 1
+    return bytes(out)
+
+
+def _diffusion_kernel(gray, out, width, height, limit):
+    # Same recurrence as _diffusion, on arrays, for numba to compile.
+    current = np.zeros(width + 2, dtype=np.int64)
+    below = np.zeros(width + 2, dtype=np.int64)
+    for y in range(height):
+        current, below = below, current
+        below[:] = 0
+        base = y * width
+        carry = current[1]
+        for x in range(width):
+            value = gray[base + x] * 16 + carry
+            if value >= limit:
+                out[base + x] = 255
+                value -= 4080
+            carry = current[x + 2] + ((value * 7) >> 4)
+            below[x] += (value * 3) >> 4
+            below[x + 1] += (value * 5) >> 4
+            below[x + 2] += value >> 4
+
+
+def _diffusion_np(gray: "np.ndarray", width: int, threshold: int) -> "np.ndarray":
+    global _diffusion_compiled
+    if _diffusion_compiled is None:
+        _diffusion_compiled = numba.njit(cache=True, nogil=True)(_diffusion_kernel)
+    out = np.zeros(gray.size, dtype=np.uint8)
+    _diffusion_compiled(gray, out, width, gray.size // width, threshold * 16)
+    return out
@@ -0,0 +1,173 @@
+import time
+from typing import Dict, List, Optional, Tuple
+
+import pygame
+
+from src.log_handle import get_logger
+from src.utils.screen_streamer import ScreenStreamer, np
+
+logger = get_logger(__name__)
+
+# Keys of a profile spec that are per output; everything else is shared.
+PROFILE_KEYS = {"port": int, "serial": str, "baud": int, "capture": str}
+
+
+def parse_profile(spec: str) -> dict:
+    """
+    Parse an output profile "WxH[,bw|gray][,delta][,port=N][,serial=PATH]
+    [,baud=N][,capture=PATH]", e.g. "80x60,bw,serial=/dev/ttyUSB0".
+    """
+    fields = [field.strip() for field in spec.split(",") if field.strip()]
+    if not fields:
+        raise ValueError("empty stream profile")
+    try:
+        width, height = (int(value) for value in fields[0].lower().split("x"))
+    except ValueError:
+        raise ValueError(f"bad profile size {fields[0]!r}, expected WxH") from None
+    profile = {"width": width, "height": height}
+    for field in fields[1:]:
+        key, _, value = field.partition("=")
+        if key in ("bw", "gray") and not value:
+            profile["bw_mode"] = key == "bw"
+        elif key == "delta" and not value:
+            profile["delta_mode"] = True
+        elif key in PROFILE_KEYS and value:
+            profile[key] = PROFILE_KEYS[key](value)
+        else:
+            raise ValueError(f"unknown stream profile field {field!r}")
+    if "port" not in profile and "serial" not in profile:
+        raise ValueError(f"stream profile {spec!r} needs port= or serial=")
+    return profile
+
+
+def downscale_gray(gray, width: int, height: int, out_width: int, out_height: int, use_numpy: bool):
+    """
+    Area-averaged downscale of a row-major luma buffer: every output pixel is
+    the truncated mean of its source box (boxes differ by at most one pixel
+    for non-integer ratios). Both paths produce the same bytes.
+    """
+    if (out_width, out_height) == (width, height):
+        return gray
+    if out_width > width or out_height > height:
+        raise ValueError(f"cannot downscale {width}x{height} to {out_width}x{out_height}")
+    xs = [x * width // out_width for x in range(out_width + 1)]
+    ys = [y * height // out_height for y in range(out_height + 1)]
+    if use_numpy:
+        image = np.asarray(gray, dtype=np.uint8).reshape(height, width)
+        # Summed-area table with a zero row/column in front.
+        table = np.zeros((height + 1, width + 1), dtype=np.int64)
+        table[1:, 1:] = image.cumsum(axis=0, dtype=np.int64).cumsum(axis=1)
+        x0, x1 = np.array(xs[:-1]), np.array(xs[1:])
+        y0, y1 = np.array(ys[:-1])[:, None], np.array(ys[1:])[:, None]
+        sums = table[y1, x1] - table[y0, x1] - table[y1, x0] + table[y0, x0]
+        areas = (y1 - y0) * (x1 - x0)
+        return (sums // areas).astype(np.uint8).ravel()
+    out = bytearray(out_width * out_height)
+    for oy in range(out_height):
+        columns = [0] * out_width
+        for y in range(ys[oy], ys[oy + 1]):
+            row = gray[y * width:(y + 1) * width]
+            for ox in range(out_width):
+                columns[ox] += sum(row[xs[ox]:xs[ox + 1]])
+        rows = ys[oy + 1] - ys[oy]
+        for ox in range(out_width):
+            out[oy * out_width + ox] = columns[ox] // (rows * (xs[ox + 1] - xs[ox]))
+    return bytes(out)
+
+
+class MultiStreamer:
+    """
+    Several stream outputs fed from one rendered surface. Every profile (see
+    parse_profile) is a ScreenStreamer with its own resolution, B/W mode and
+    transport; the remaining ScreenStreamer options are shared. The luma of
+    the surface is computed once per frame and downscaled once per distinct
+    output size. Outputs always encode synchronously (no pipeline).
+    """
+
+    def __init__(self, width: int, height: int, profiles: List[dict], use_numpy: bool = True, **options):
+        if not profiles:
+            raise ValueError("MultiStreamer needs at least one profile")
+        self.width = width
+        self.height = height
+        self.use_numpy = use_numpy and np is not None
+        self.streamers: List[ScreenStreamer] = []
+        for profile in profiles:
+            settings = dict(options)
+            settings.update(
+                tcp_port=profile.get("port"),
+                serial_path=profile.get("serial"),
+                serial_baud=profile.get("baud", options.get("serial_baud", 115200)),
+                bw_mode=profile.get("bw_mode", options.get("bw_mode", False)),
+                delta_mode=profile.get("delta_mode", options.get("delta_mode", False)),
+                capture_path=profile.get("capture"),
+                use_numpy=self.use_numpy,
+                pipeline=False,
+            )
+            if profile["width"] > width or profile["height"] > height:
+                raise ValueError(
+                    f"profile {profile['width']}x{profile['height']} is larger than {width}x{height}"
+                )
+            self.streamers.append(ScreenStreamer(profile["width"], profile["height"], **settings))
+        self.pipeline = False
+
+    def start(self):
+        for streamer in self.streamers:
+            streamer.start()
+            logger.info(
+                "stream output %dx%d %s started",
+                streamer.width,
+                streamer.height,
+                "bw" if streamer.bw_mode else "gray",
+            )
+
+    def stop(self):
+        for streamer in self.streamers:
+            streamer.stop()
+
+    def send_surface(self, surface: pygame.Surface, dirty_rects=None):
+        captured = time.monotonic()
+        full_size = [s for s in self.streamers if (s.width, s.height) == surface.get_size()]
+        if len(full_size) == len(self.streamers) == 1 and dirty_rects is not None:
+            # A single full resolution output keeps its dirty-rect encoder.
+            full_size[0].send_surface(surface, dirty_rects)
+            return
+        if self.use_numpy:
+            gray = ScreenStreamer._surface_to_gray_np(surface)
+        else:
+            gray = ScreenStreamer._rgb_to_gray(pygame.image.tostring(surface, "RGB"))
+        width, height = surface.get_size()
+        scaled: Dict[Tuple[int, int], object] = {}
+        for streamer in self.streamers:
+            size = (streamer.width, streamer.height)
+            if size not in scaled:
+                scaled[size] = downscale_gray(gray, width, height, *size, self.use_numpy)
+            streamer.send_gray(scaled[size], captured)
+
+    def sender_stats(self) -> List[dict]:
+        stats = []
+        for streamer in self.streamers:
+            for entry in streamer.sender_stats():
+                stats.append(dict(entry, output=f"{streamer.width}x{streamer.height}"))
+        return stats
+
+    def adaptive_stats(self) -> dict:
+        """Adaptive decisions per output size (outputs without adaptive are omitted)."""
+        return {
+            f"{streamer.width}x{streamer.height}": streamer.adaptive_stats()
+            for streamer in self.streamers
+            if streamer.adaptive is not None
+        }
+
+    def compression_stats(self) -> dict:
+        return {
+            f"{streamer.width}x{streamer.height}": streamer.compression_stats()
+            for streamer in self.streamers
+        }
+
+    @property
+    def compression(self) -> Optional[str]:
+        return self.streamers[0].compression
+
+    @property
+    def adaptive(self) -> bool:
+        return any(streamer.adaptive is not None for streamer in self.streamers)
@@ -0,0 +1,254 @@
+import collections
+import threading
+import time
+from typing import Callable, Deque, Dict, Optional, Tuple
+
+from src.log_handle import get_logger
+
+logger = get_logger(__name__)
+
+DROP_OLDEST = "drop-oldest"
+DROP_TO_KEYFRAME = "drop-to-keyframe"
+DISCONNECT = "disconnect"
+SEND_POLICIES = (DROP_OLDEST, DROP_TO_KEYFRAME, DISCONNECT)
+
+
+class RateMeter:
+    """Bytes per second averaged over windows of `window` seconds."""
+
+    def __init__(self, window: float = 1.0):
+        self.window = window
+        self._start = time.monotonic()
+        self._bytes = 0
+        self._rate = 0.0
+
+    def add(self, size: int):
+        self._bytes += size
+        now = time.monotonic()
+        elapsed = now - self._start
+        if elapsed >= self.window:
+            self._rate = self._bytes / elapsed
+            self._start = now
+            self._bytes = 0
+
+    @property
+    def rate(self) -> float:
+        elapsed = time.monotonic() - self._start
+        if elapsed >= self.window:
+            # No write finished a window lately (stalled or idle destination).
+            return self._bytes / elapsed
+        return self._rate
+
+
+class PacketSender:
+    """
+    One stream destination (TCP viewer or serial port) with its own bounded
+    packet queue and writer thread, so a slow destination never blocks the
+    game loop or the other destinations.
+
+    `write` must block until the packet is handed to the OS; `close` releases
+    the transport. With `timed`, `write` also gets the time.monotonic() at
+    which the packet was enqueued. When the queue is full the `policy` decides:
+      - drop-oldest: discard the oldest queued packet;
+      - drop-to-keyframe: discard the whole queue and every packet up to the
+        next keyframe (deltas are useless without their base);
+      - disconnect: close the destination.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        write: Callable[[bytes], object],
+        close: Callable[[], object],
+        max_queue: int = 8,
+        policy: str = DROP_OLDEST,
+        on_keyframe_needed: Optional[Callable[[], object]] = None,
+        on_closed: Optional[Callable[["PacketSender"], object]] = None,
+        link_capacity: Optional[float] = None,
+        os_backlog: Optional[Callable[[], int]] = None,
+        timed: bool = False,
+    ):
+        if policy not in SEND_POLICIES:
+            raise ValueError(f"Unknown send policy {policy!r}")
+        self.name = name
+        self.policy = policy
+        self.max_queue = max(1, max_queue)
+        self._write = write
+        self._close = close
+        self._timed = timed
+        self._on_keyframe_needed = on_keyframe_needed
+        self._on_closed = on_closed
+        # Known link speed in bytes/s (serial) and bytes buffered below us.
+        self.link_capacity = link_capacity
+        self._os_backlog = os_backlog
+        # (packet, enqueue time) pairs; the time measures queue wait.
+        self._queue: Deque[Tuple[bytes, float]] = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+        self._writing = False
+        self._await_keyframe = False
+        self._thread: Optional[threading.Thread] = None
+        self.enqueued_packets = 0
+        self.dropped_packets = 0
+        self.sent_packets = 0
+        self.sent_bytes = 0
+        self.max_queue_depth = 0
+        self.queued_bytes = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._rate = RateMeter()
+        self._peak_rate = 0.0
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def start(self):
+        self._thread = threading.Thread(
+            target=self._writer_loop, name=f"stream-send-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def enqueue(self, packet: bytes, is_keyframe: bool = True) -> bool:
+        """Queue `packet` without blocking. Returns False if it was dropped."""
+        disconnect = False
+        with self._cond:
+            if self._closed:
+                return False
+            if self._await_keyframe:
+                if not is_keyframe:
+                    self.dropped_packets += 1
+                    return False
+                self._await_keyframe = False
+            if len(self._queue) >= self.max_queue:
+                if self.policy == DISCONNECT:
+                    disconnect = True
+                elif self.policy == DROP_TO_KEYFRAME:
+                    self.dropped_packets += len(self._queue)
+                    self._queue.clear()
+                    self.queued_bytes = 0
+                    if not is_keyframe:
+                        self.dropped_packets += 1
+                        self._await_keyframe = True
+                        self._request_keyframe()
+                        return False
+                else:
+                    self.queued_bytes -= len(self._queue.popleft()[0])
+                    self.dropped_packets += 1
+                    # The viewer lost a delta base; get it a fresh keyframe.
+                    self._request_keyframe()
+            if not disconnect:
+                self._queue.append((packet, time.monotonic()))
+                self.queued_bytes += len(packet)
+                self.enqueued_packets += 1
+                self.max_queue_depth = max(self.max_queue_depth, len(self._queue))
+                # flush() may be waiting on the same condition.
+                self._cond.notify_all()
+        if disconnect:
+            logger.info("stream destination %s fell behind, disconnecting", self.name)
+            self.close()
+            return False
+        return True
+
+    def _request_keyframe(self):
+        if self._on_keyframe_needed:
+            self._on_keyframe_needed()
+
+    def _writer_loop(self):
+        while True:
+            with self._cond:
+                while not self._queue and not self._closed:
+                    self._cond.wait()
+                if self._closed:
+                    return
+                packet, enqueued = self._queue.popleft()
+                self.queued_bytes -= len(packet)
+                self._writing = True
+            started = time.monotonic()
+            self._wait_total += started - enqueued
+            self._wait_max = max(self._wait_max, started - enqueued)
+            try:
+                if self._timed:
+                    self._write(packet, enqueued)
+                else:
+                    self._write(packet)
+            except OSError:
+                self.close()
+                return
+            finally:
+                with self._cond:
+                    self._writing = False
+                    self._cond.notify_all()
+            self._count_sent(len(packet), time.monotonic() - started)
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait until every queued packet is written (e.g. before closing a
+        recording). Returns False on timeout or when the destination closed.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            while (self._queue or self._writing) and not self._closed:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+            return not self._closed
+
+    def _count_sent(self, size: int, write_time: float):
+        self.sent_packets += 1
+        self.sent_bytes += size
+        self._rate.add(size)
+        if write_time > 0:
+            # A blocking write drains at link speed; keep a smoothed peak.
+            instant = size / write_time
+            self._peak_rate = max(instant, 0.9 * self._peak_rate + 0.1 * instant)
+
+    def link_estimate(self) -> Tuple[int, float]:
+        """(bytes waiting to go out, estimated link capacity in bytes/s)."""
+        backlog = self.queued_bytes
+        if self._os_backlog:
+            try:
+                backlog += self._os_backlog()
+            except (OSError, AttributeError):
+                pass
+        capacity = self._peak_rate or self._rate.rate
+        if self.link_capacity:
+            capacity = min(capacity, self.link_capacity) if capacity else self.link_capacity
+        return backlog, capacity
+
+    def close(self):
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.clear()
+            self._cond.notify_all()
+        try:
+            self._close()
+        except OSError:
+            pass
+        if self._on_closed:
+            self._on_closed(self)
+
+    def join(self, timeout: Optional[float] = None):
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=timeout)
+
+    def stats(self) -> Dict[str, object]:
+        with self._cond:
+            depth = len(self._queue)
+        return {
+            "name": self.name,
+            "policy": self.policy,
+            "queue_depth": depth,
+            "queued_bytes": self.queued_bytes,
+            "max_queue_depth": self.max_queue_depth,
+            "enqueued_packets": self.enqueued_packets,
+            "dropped_packets": self.dropped_packets,
+            "sent_packets": self.sent_packets,
+            "sent_bytes": self.sent_bytes,
+            "bytes_per_sec": round(self._rate.rate, 1),
+            "queue_wait_ms_mean": round(self._wait_total / max(1, self.sent_packets) * 1000, 3),
+            "queue_wait_ms_max": round(self._wait_max * 1000, 3),
+        }
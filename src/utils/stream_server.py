@@ -0,0 +1,279 @@
+import collections
+import selectors
+import socket
+import threading
+from typing import Callable, Deque, Dict, List, Optional, Tuple
+
+from src.log_handle import get_logger
+from src.utils.stream_senders import (DISCONNECT, DROP_OLDEST, DROP_TO_KEYFRAME,
+                                     SEND_POLICIES, RateMeter)
+
+logger = get_logger(__name__)
+
+
+class _Connection:
+    """Per-viewer state of the fan-out server: shared packets still to send."""
+
+    def __init__(self, sock: socket.socket, name: str):
+        self.sock = sock
+        self.name = name
+        # (packet view, bytes already sent); views share the published bytes.
+        self.pending: Deque[Tuple[memoryview, int]] = collections.deque()
+        self.await_keyframe = False
+        self.writing = False
+        self.dropped_packets = 0
+        self.sent_packets = 0
+        self.sent_bytes = 0
+        self.max_queue_depth = 0
+        self.rate = RateMeter()
+
+    def pending_bytes(self) -> int:
+        return sum(len(view) - sent for view, sent in list(self.pending))
+
+
+class FanoutServer:
+    """
+    Single-threaded selectors-based TCP server for many viewers. Each packet
+    is encoded once and published as one immutable bytes object; every
+    connection only keeps memoryviews into it, so fan-out costs no copies.
+    Slow viewers are handled with the same policies as PacketSender.
+    """
+
+    RECV_DISCARD = 4096
+
+    def __init__(
+        self,
+        port: int,
+        host: str = "0.0.0.0",
+        max_queue: int = 8,
+        policy: str = DROP_OLDEST,
+        backlog: int = socket.SOMAXCONN,
+        on_keyframe_needed: Optional[Callable[[], object]] = None,
+    ):
+        if policy not in SEND_POLICIES:
+            raise ValueError(f"Unknown send policy {policy!r}")
+        self.port = port
+        self.host = host
+        self.max_queue = max(1, max_queue)
+        self.policy = policy
+        self.backlog = backlog
+        # Called for new viewers and after drops: both need a fresh keyframe.
+        self._on_keyframe_needed = on_keyframe_needed
+        self._selector = selectors.DefaultSelector()
+        self._listener: Optional[socket.socket] = None
+        self._wake_r, self._wake_w = socket.socketpair()
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._published: List[Tuple[bytes, bool]] = []
+        self._published_lock = threading.Lock()
+        self._connections: Dict[socket.socket, _Connection] = {}
+        self._stop_event = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.total_connections = 0
+
+    def start(self):
+        self._listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self._listener.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._listener.bind((self.host, self.port))
+        self._listener.listen(self.backlog)
+        self._listener.setblocking(False)
+        self._selector.register(self._listener, selectors.EVENT_READ, "accept")
+        self._selector.register(self._wake_r, selectors.EVENT_READ, "wake")
+        self._thread = threading.Thread(
+            target=self._serve, name="stream-fanout", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake()
+        if self._thread:
+            self._thread.join(timeout=1)
+        for conn in list(self._connections.values()):
+            self._close(conn)
+        for sock in (self._listener, self._wake_r, self._wake_w):
+            if sock:
+                try:
+                    sock.close()
+                except OSError:
+                    pass
+        self._selector.close()
+
+    def publish(self, packet: bytes, is_keyframe: bool = True):
+        """Hand one encoded packet to every viewer. Never blocks on I/O."""
+        with self._published_lock:
+            first = not self._published
+            self._published.append((packet, is_keyframe))
+        if first:
+            self._wake()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # a wake-up is already pending
+
+    def _serve(self):
+        while not self._stop_event.is_set():
+            for key, events in self._selector.select(timeout=1.0):
+                if key.data == "accept":
+                    self._accept()
+                elif key.data == "wake":
+                    self._drain_wake()
+                    self._fan_out()
+                else:
+                    conn = key.data
+                    if events & selectors.EVENT_READ and not self._read(conn):
+                        continue
+                    if events & selectors.EVENT_WRITE:
+                        self._flush(conn)
+
+    def _accept(self):
+        while True:
+            try:
+                sock, addr = self._listener.accept()
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                return
+            sock.setblocking(False)
+            sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            conn = _Connection(sock, f"{addr[0]}:{addr[1]}")
+            self._connections[sock] = conn
+            self._selector.register(sock, selectors.EVENT_READ, conn)
+            self.total_connections += 1
+            self._request_keyframe()
+
+    def _request_keyframe(self):
+        if self._on_keyframe_needed:
+            self._on_keyframe_needed()
+
+    def _drain_wake(self):
+        try:
+            while self._wake_r.recv(4096):
+                pass
+        except (BlockingIOError, InterruptedError):
+            pass
+
+    def _fan_out(self):
+        with self._published_lock:
+            published = self._published
+            self._published = []
+        for packet, is_keyframe in published:
+            view = memoryview(packet)
+            for conn in list(self._connections.values()):
+                self._enqueue(conn, view, is_keyframe)
+        for conn in list(self._connections.values()):
+            if conn.pending:
+                self._flush(conn)
+
+    def _enqueue(self, conn: _Connection, view: memoryview, is_keyframe: bool):
+        if conn.await_keyframe:
+            if not is_keyframe:
+                conn.dropped_packets += 1
+                return
+            conn.await_keyframe = False
+        if len(conn.pending) >= self.max_queue:
+            if self.policy == DISCONNECT:
+                logger.info("stream viewer %s fell behind, disconnecting", conn.name)
+                self._close(conn)
+                return
+            # The head may be half written; it has to go out whole.
+            head = conn.pending.popleft() if conn.pending[0][1] else None
+            if self.policy == DROP_TO_KEYFRAME:
+                conn.dropped_packets += len(conn.pending)
+                conn.pending.clear()
+                if not is_keyframe:
+                    conn.await_keyframe = True
+            elif conn.pending:
+                conn.pending.popleft()
+                conn.dropped_packets += 1
+            if head is not None:
+                conn.pending.appendleft(head)
+            self._request_keyframe()
+            if conn.await_keyframe:
+                conn.dropped_packets += 1
+                return
+        conn.pending.append((view, 0))
+        conn.max_queue_depth = max(conn.max_queue_depth, len(conn.pending))
+
+    def _flush(self, conn: _Connection):
+        while conn.pending:
+            view, sent = conn.pending[0]
+            try:
+                count = conn.sock.send(view[sent:])
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                self._close(conn)
+                return
+            conn.sent_bytes += count
+            conn.rate.add(count)
+            sent += count
+            if sent < len(view):
+                conn.pending[0] = (view, sent)
+                break
+            conn.pending.popleft()
+            conn.sent_packets += 1
+        want_write = bool(conn.pending)
+        if want_write != conn.writing:
+            events = selectors.EVENT_READ
+            if want_write:
+                events |= selectors.EVENT_WRITE
+            self._selector.modify(conn.sock, events, conn)
+            conn.writing = want_write
+
+    def _read(self, conn: _Connection) -> bool:
+        # Viewers do not talk back; reading only detects disconnects.
+        try:
+            data = conn.sock.recv(self.RECV_DISCARD)
+        except (BlockingIOError, InterruptedError):
+            return True
+        except OSError:
+            data = b""
+        if not data:
+            self._close(conn)
+            return False
+        return True
+
+    def _close(self, conn: _Connection):
+        if self._connections.pop(conn.sock, None) is None:
+            return
+        try:
+            self._selector.unregister(conn.sock)
+        except (KeyError, ValueError):
+            pass
+        try:
+            conn.sock.close()
+        except OSError:
+            pass
+
+    def link_estimate(self) -> Tuple[int, float]:
+        """(backlog bytes, bytes/s) of the viewer that is furthest behind."""
+        worst = (0, 0.0)
+        worst_delay = 0.0
+        for conn in list(self._connections.values()):
+            backlog = conn.pending_bytes()
+            if not backlog:
+                continue
+            rate = conn.rate.rate
+            delay = backlog / rate if rate else float("inf")
+            if delay >= worst_delay:
+                worst, worst_delay = (backlog, rate), delay
+        return worst
+
+    def stats(self) -> List[dict]:
+        stats = []
+        for conn in list(self._connections.values()):
+            stats.append(
+                {
+                    "name": conn.name,
+                    "policy": self.policy,
+                    "queue_depth": len(conn.pending),
+                    "max_queue_depth": conn.max_queue_depth,
+                    "dropped_packets": conn.dropped_packets,
+                    "sent_packets": conn.sent_packets,
+                    "sent_bytes": conn.sent_bytes,
+                }
+            )
+        return stats
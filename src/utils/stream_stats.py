@@ -0,0 +1,85 @@
+import json
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from src.log_handle import get_logger
+
+logger = get_logger(__name__)
+
+
+class StreamStats:
+    """
+    Per-interval stream counters. `add` records samples (count, mean and max
+    are reported), `count` increments plain totals. Every `interval` seconds
+    `maybe_flush` closes the interval into a record, appends it as one JSON
+    line to `path` (when given) and keeps it as `last_record`.
+    """
+
+    def __init__(self, source: str, path: Optional[str] = None, interval: float = 1.0):
+        self.source = source
+        self.path = path
+        self.interval = interval
+        self.last_record: Optional[dict] = None
+        self._lock = threading.Lock()
+        self._samples: Dict[str, List[float]] = {}
+        self._counts: Dict[str, int] = {}
+        self._started = time.monotonic()
+
+    def add(self, metric: str, value: float):
+        with self._lock:
+            sample = self._samples.get(metric)
+            if sample is None:
+                self._samples[metric] = [1, value, value]
+            else:
+                sample[0] += 1
+                sample[1] += value
+                sample[2] = max(sample[2], value)
+
+    def count(self, metric: str, amount: int = 1):
+        with self._lock:
+            self._counts[metric] = self._counts.get(metric, 0) + amount
+
+    def maybe_flush(self, extra: Optional[Callable[[], dict]] = None) -> Optional[dict]:
+        """
+        Close the interval if it has elapsed; returns the new record. `extra`
+        is only called then, its fields are merged into the record.
+        """
+        if time.monotonic() - self._started < self.interval:
+            return None
+        return self.flush(extra)
+
+    def flush(self, extra: Optional[Callable[[], dict]] = None) -> dict:
+        now = time.monotonic()
+        with self._lock:
+            samples, self._samples = self._samples, {}
+            counts, self._counts = self._counts, {}
+            elapsed, self._started = now - self._started, now
+        record = {
+            "source": self.source,
+            "time": round(time.time(), 3),
+            "interval_s": round(elapsed, 3),
+        }
+        record.update(counts)
+        for metric, (count, total, peak) in samples.items():
+            record[metric] = {
+                "count": count,
+                "mean": round(total / count, 3),
+                "max": round(peak, 3),
+            }
+        if extra:
+            record.update(extra())
+        self.last_record = record
+        if self.path:
+            try:
+                with open(self.path, "a") as fp:
+                    fp.write(json.dumps(record) + "\n")
+            except OSError as exc:
+                logger.warning("cannot write stream stats to %s: %s", self.path, exc)
+        return record
+
+    def mean(self, metric: str) -> Optional[float]:
+        """Mean of `metric` in the last closed interval, if it had samples."""
+        if self.last_record is None or metric not in self.last_record:
+            return None
+        return self.last_record[metric]["mean"]
@@ -0,0 +1,327 @@
+import struct
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.log_handle import get_logger
+
+logger = get_logger(__name__)
+
+Point = Tuple[int, int]
+Stroke = List[Point]  # polyline, drawn in either direction
+
+# IVRY vector table layout (see ivray_v_generator/parse_ivray.py).
+IVRY_HEADER_STRUCT = struct.Struct("<4sIff")  # magic, frame_count, brightness, speed
+IVRY_COUNT_STRUCT = struct.Struct("<I")
+IVRY_VECTOR_STRUCT = struct.Struct("<hh")
+IVRY_MAGIC = b"IVRY"
+IVRY_COUNT_OFFSET = 4  # frame_count within the header
+INT16_MIN, INT16_MAX = -32768, 32767
+
+_SIDES = ((-1, 0), (1, 0), (0, -1), (0, 1))
+
+
+def wall_outline(matrix: Sequence[Sequence[str]], wall: str = "wall") -> List[Stroke]:
+    """
+    Outline of the `wall` cells of a level matrix as polylines over cell
+    corners (x = column, y = row). Unit edges between a wall cell and any
+    other cell are chained into as few polylines as possible: walks start
+    at odd-degree corners and prefer to keep going straight.
+    """
+    rows = len(matrix)
+    cols = len(matrix[0]) if rows else 0
+    edges = set()
+    for r in range(rows):
+        for c in range(cols):
+            if matrix[r][c] != wall:
+                continue
+            for dr, dc in _SIDES:
+                nr, nc = r + dr, c + dc
+                if 0 <= nr < rows and 0 <= nc < cols and matrix[nr][nc] == wall:
+                    continue
+                if dr == -1:
+                    edges.add(((c, r), (c + 1, r)))
+                elif dr == 1:
+                    edges.add(((c, r + 1), (c + 1, r + 1)))
+                elif dc == -1:
+                    edges.add(((c, r), (c, r + 1)))
+                else:
+                    edges.add(((c + 1, r), (c + 1, r + 1)))
+    neighbours: Dict[Point, List[Point]] = {}
+    for a, b in edges:
+        neighbours.setdefault(a, []).append(b)
+        neighbours.setdefault(b, []).append(a)
+    strokes: List[Stroke] = []
+    starts = sorted(neighbours, key=lambda p: (len(neighbours[p]) % 2 == 0, p[1], p[0]))
+    for start in starts:
+        while neighbours[start]:
+            stroke = [start]
+            point, direction = start, None
+            while neighbours[point]:
+                options = neighbours[point]
+                nxt = options[0]
+                for option in options:
+                    if direction == (option[0] - point[0], option[1] - point[1]):
+                        nxt = option
+                        break
+                options.remove(nxt)
+                neighbours[nxt].remove(point)
+                direction = (nxt[0] - point[0], nxt[1] - point[1])
+                stroke.append(nxt)
+                point = nxt
+            strokes.append(simplify(stroke))
+    return strokes
+
+
+def simplify(stroke: Stroke) -> Stroke:
+    """Drop the points of a polyline that lie on a straight run."""
+    if len(stroke) < 3:
+        return list(stroke)
+    out = [stroke[0]]
+    for prev, point, nxt in zip(stroke, stroke[1:], stroke[2:]):
+        if (point[0] - prev[0]) * (nxt[1] - point[1]) != (point[1] - prev[1]) * (nxt[0] - point[0]):
+            out.append(point)
+    out.append(stroke[-1])
+    return out
+
+
+def order_strokes(strokes: Sequence[Stroke], start: Point, cell: int = 8) -> Tuple[List[Point], Point]:
+    """
+    Greedy nearest-endpoint ordering: from `start`, repeatedly draw the
+    stroke with the closest free endpoint (reversing it when its far end is
+    closer). Endpoints live in a `cell`-sized grid that is searched ring by
+    ring, so each step only looks at nearby strokes. Returns the beam path
+    (travel moves included) and where it ends.
+    """
+    grid: Dict[Point, List[Tuple[int, int]]] = {}
+    for index, stroke in enumerate(strokes):
+        for end in (0, 1):
+            x, y = stroke[-end]
+            grid.setdefault((x // cell, y // cell), []).append((index, end))
+    if not grid:
+        return [], start
+    min_gx = min(gx for gx, _gy in grid)
+    max_gx = max(gx for gx, _gy in grid)
+    min_gy = min(gy for _gx, gy in grid)
+    max_gy = max(gy for _gx, gy in grid)
+    used = [False] * len(strokes)
+    path: List[Point] = []
+    beam = start
+    for _ in range(len(strokes)):
+        bx, by = beam[0] // cell, beam[1] // cell
+        last_ring = max(bx - min_gx, max_gx - bx, by - min_gy, max_gy - by)
+        best = None
+        best_dist = 0
+        for ring in range(last_ring + 1):
+            for gx in range(bx - ring, bx + ring + 1):
+                edge = gx in (bx - ring, bx + ring)
+                for gy in range(by - ring, by + ring + 1) if edge else (by - ring, by + ring):
+                    bucket = grid.get((gx, gy))
+                    if not bucket:
+                        continue
+                    for index, end in bucket:
+                        if used[index]:
+                            continue
+                        x, y = strokes[index][-end]
+                        dist = (x - beam[0]) ** 2 + (y - beam[1]) ** 2
+                        if best is None or dist < best_dist:
+                            best, best_dist = (index, end), dist
+            # Endpoints in cells outside this ring are at least ring * cell away.
+            if best is not None and best_dist <= (ring * cell) ** 2:
+                break
+        if best is None:
+            break
+        index, end = best
+        used[index] = True
+        stroke = strokes[index] if end == 0 else strokes[index][::-1]
+        path.extend(stroke)
+        beam = stroke[-1]
+    return path, beam
+
+
+def to_vectors(path: Sequence[Point], start: Point) -> List[Point]:
+    """
+    (dx, dy) steps of the beam along `path` from `start`; steps that do
+    not fit int16 are split.
+    """
+    vectors: List[Point] = []
+    x, y = start
+    for px, py in path:
+        dx, dy = px - x, py - y
+        while dx or dy:
+            step_x = max(INT16_MIN, min(INT16_MAX, dx))
+            step_y = max(INT16_MIN, min(INT16_MAX, dy))
+            vectors.append((step_x, step_y))
+            dx -= step_x
+            dy -= step_y
+        x, y = px, py
+    return vectors
+
+
+class MazeTracer:
+    """
+    Beam paths for the Pac-Man screen built from the level matrix instead
+    of the rendered pixels: wall outlines (ordered once per level), the
+    remaining dots and pellets (re-ordered only when one is eaten) and the
+    sprites (ordered every frame). Coordinates are screen pixels times
+    `scale`; every frame continues from where the previous one ended.
+    """
+
+    def __init__(self, cell_size: int, scale: int = 1):
+        self.cell_size = cell_size
+        self.scale = scale
+        self.beam: Point = (0, 0)
+        self._maze_key = None
+        self._maze_matrix = None
+        self._maze_path: List[Point] = []
+        self._maze_end: Point = (0, 0)
+        self._static_key = None
+        self._static_path: List[Point] = []
+        self._static_vectors: List[Point] = []
+        self._static_end: Point = (0, 0)
+
+    def trace(
+        self, matrix, origin: Tuple[float, float], sprite_rects=(), pacman_rect=None
+    ) -> Tuple[Point, List[Point]]:
+        """
+        (start, vectors) for one frame: the beam position the vectors start
+        from and the (dx, dy) steps through maze, dots and sprites.
+        """
+        ox, oy = int(round(origin[0])), int(round(origin[1]))
+        self._maze(matrix, ox, oy)
+        static_path, static_vectors, static_end = self._static(matrix, ox, oy)
+        sprites = [self._box(rect) for rect in sprite_rects]
+        if pacman_rect is not None:
+            sprites.append(self._diamond(pacman_rect))
+        sprite_path, end = order_strokes(sprites, static_end)
+        start = self.beam
+        if static_path:
+            vectors = to_vectors(static_path[:1], start) + static_vectors
+            vectors += to_vectors(sprite_path, static_end)
+        else:
+            vectors = to_vectors(sprite_path, start)
+        if vectors:
+            self.beam = end
+        return start, vectors
+
+    def _maze(self, matrix, ox: int, oy: int):
+        # The level matrix object lives as long as its level; walls and the
+        # ghost door never change while it does.
+        key = (id(matrix), ox, oy)
+        if key != self._maze_key:
+            self._maze_matrix = matrix  # keeps id(matrix) from being reused
+            step = self.cell_size * self.scale
+            strokes = [
+                [(ox * self.scale + x * step, oy * self.scale + y * step) for x, y in stroke]
+                for stroke in wall_outline(matrix) + self._door_strokes(matrix)
+            ]
+            self._maze_path, self._maze_end = order_strokes(
+                strokes, (ox * self.scale, oy * self.scale)
+            )
+            self._maze_key = key
+            logger.info(
+                "maze traced: %d strokes, %d beam points", len(strokes), len(self._maze_path)
+            )
+
+    def _door_strokes(self, matrix) -> List[Stroke]:
+        strokes = []
+        for r, row in enumerate(matrix):
+            for c, cell in enumerate(row):
+                if cell == "elec":
+                    strokes.append([(c, r), (c + 1, r)])
+        return strokes
+
+    def _static(self, matrix, ox: int, oy: int) -> Tuple[List[Point], List[Point], Point]:
+        """
+        Beam path through the maze and the remaining dots, its vectors from
+        the first point on, and its end. Dots only ever disappear while a
+        level matrix lives, so their count tells when to re-order them.
+        """
+        left = sum(row.count("dot") + row.count("power") for row in matrix)
+        key = (self._maze_key, left)
+        if key != self._static_key:
+            cells = [
+                (r, c, cell == "power")
+                for r, row in enumerate(matrix)
+                for c, cell in enumerate(row)
+                if cell in ("dot", "power")
+            ]
+            size = self.cell_size
+            strokes = []
+            for r, c, power in cells:
+                # Drawn around the cell's far corner, like PacmanGrid.draw_dot.
+                x = (ox + c * size + size) * self.scale
+                y = (oy + r * size + size) * self.scale
+                if power:
+                    half = 2 * self.scale
+                    strokes.append(self._box((x - half, y - half, 2 * half, 2 * half), 1))
+                else:
+                    strokes.append([(x, y), (x + self.scale, y)])
+            dots_path, end = order_strokes(strokes, self._maze_end)
+            path = self._maze_path + dots_path
+            self._static_path = path
+            self._static_vectors = to_vectors(path[1:], path[0]) if path else []
+            self._static_end = end
+            self._static_key = key
+        return self._static_path, self._static_vectors, self._static_end
+
+    def _box(self, rect, scale: Optional[int] = None) -> Stroke:
+        s = self.scale if scale is None else scale
+        left, top = int(rect[0] * s), int(rect[1] * s)
+        right, bottom = int((rect[0] + rect[2]) * s), int((rect[1] + rect[3]) * s)
+        return [(left, top), (right, top), (right, bottom), (left, bottom), (left, top)]
+
+    def _diamond(self, rect) -> Stroke:
+        s = self.scale
+        cx, cy = int((rect[0] + rect[2] / 2) * s), int((rect[1] + rect[3] / 2) * s)
+        rx, ry = int(rect[2] / 2 * s), int(rect[3] / 2 * s)
+        return [(cx, cy - ry), (cx + rx, cy), (cx, cy + ry), (cx - rx, cy), (cx, cy - ry)]
+
+
+class IvrayWriter:
+    """
+    Write traced frames as an IVRY vector table (the format produced by
+    ivray_v_generator). The header's frame count is kept current after
+    every frame, so a game that is interrupted still leaves a valid file.
+    """
+
+    def __init__(self, path: str, brightness: float = 1.0, speed: float = 1.0):
+        self.path = path
+        self.brightness = brightness
+        self.speed = speed
+        self.frame_count = 0
+        self._fp = open(path, "wb")
+        self._fp.write(IVRY_HEADER_STRUCT.pack(IVRY_MAGIC, 0, brightness, speed))
+
+    def write_frame(self, vectors: Sequence[Point]):
+        if self._fp is None:
+            return
+        self._fp.write(pack_ivry_frame(vectors))
+        self.frame_count += 1
+        self._fp.seek(IVRY_COUNT_OFFSET)
+        self._fp.write(IVRY_COUNT_STRUCT.pack(self.frame_count))
+        self._fp.seek(0, 2)
+
+    def close(self):
+        if self._fp is None:
+            return
+        fp, self._fp = self._fp, None
+        fp.close()
+
+
+def pack_ivry_frame(vectors: Sequence[Point]) -> bytes:
+    """One IVRY frame record: vector count (u32) and (dx, dy) int16 pairs."""
+    flat = [value for vector in vectors for value in vector]
+    return IVRY_COUNT_STRUCT.pack(len(vectors)) + struct.pack(f"<{len(flat)}h", *flat)
+
+
+def unpack_ivry_frame(data: bytes, offset: int = 0) -> Tuple[List[Point], int]:
+    """(vectors, end offset) of the IVRY frame record at `offset`."""
+    if len(data) - offset < IVRY_COUNT_STRUCT.size:
+        raise ValueError("truncated IVRY frame")
+    (count,) = IVRY_COUNT_STRUCT.unpack_from(data, offset)
+    offset += IVRY_COUNT_STRUCT.size
+    end = offset + count * IVRY_VECTOR_STRUCT.size
+    if end > len(data):
+        raise ValueError("truncated IVRY frame")
+    flat = struct.unpack_from(f"<{count * 2}h", data, offset)
+    return list(zip(flat[0::2], flat[1::2])), end
+
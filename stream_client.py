@@ -1,7 +1,22 @@
 import argparse
 import pygame
 
-from src.utils.screen_streamer import StreamClient
+from src.utils.screen_streamer import ScreenStreamer, StreamClient
+from src.utils.stream_dither import DITHER_DIFFUSION, DITHER_MODES, FAST_DIFFUSION
+
+
+def draw_overlay(screen, font, record):
+    if not record:
+        return
+    interval = record["interval_s"] or 1.0
+    lines = [f"{record.get('frames_presented', 0) / interval:.0f} fps"]
+    for label, metric in (("e2e", "end_to_end_ms"), ("dec", "decode_ms"), ("rx", "receive_latency_ms")):
+        if metric in record:
+            lines.append(f"{label} {record[metric]['mean']:.1f} ms")
+    lines.append(f"drop {record.get('frames_dropped', 0)}")
+    for row, line in enumerate(lines):
+        text = font.render(line, True, (255, 255, 0), (0, 0, 0))
+        screen.blit(text, (2, 2 + row * 11))
 
 
 def main():
@@ -22,7 +37,41 @@ def main():
         action="store_true",
         help="Expect black/white stream (threshold grayscale if needed).",
     )
+    parser.add_argument(
+        "--bw-threshold",
+        type=int,
+        default=ScreenStreamer.BW_THRESHOLD,
+        help=f"--bw threshold for gray streams, as on the sender (default: {ScreenStreamer.BW_THRESHOLD}).",
+    )
+    parser.add_argument(
+        "--dither",
+        choices=DITHER_MODES,
+        default="none",
+        help="--bw dithering for gray streams, as on the sender (default: none; diffusion needs numba).",
+    )
+    parser.add_argument(
+        "--legacy-decode",
+        action="store_true",
+        help="Use the per-run decoder and RGB surfaces instead of the vectorized path.",
+    )
+    parser.add_argument(
+        "--latest-only",
+        action="store_true",
+        help="Decode in the reader thread and show only the newest frame; stale frames are dropped.",
+    )
+    parser.add_argument(
+        "--stats",
+        default=None,
+        help="Append a JSON stats record (decode/present times, latency) every second to this file.",
+    )
+    parser.add_argument(
+        "--overlay",
+        action="store_true",
+        help="Draw fps, latency and decode time over the stream.",
+    )
     args = parser.parse_args()
+    if args.dither == DITHER_DIFFUSION and not FAST_DIFFUSION:
+        parser.error("--dither diffusion needs numpy and numba (pip install numba) to keep up with the stream")
 
     client = StreamClient(
         host=args.host,
@@ -30,11 +79,17 @@ def main():
         serial_path=args.serial,
         serial_baud=args.serial_baud,
         expect_bw=args.bw,
+        bw_threshold=args.bw_threshold,
+        dither=args.dither,
+        fast_decode=not args.legacy_decode,
+        latest_only=args.latest_only,
+        stats_path=args.stats,
     )
     client.start()
 
     pygame.init()
     screen = None
+    font = pygame.font.Font(None, 14) if args.overlay else None
     clock = pygame.time.Clock()
     running = True
 
@@ -43,14 +98,20 @@ def main():
             if event.type == pygame.QUIT:
                 running = False
         frames = client.poll_frames()
-        for _frame_id, width, height, surface in frames:
+        if frames:
+            # Present at most one frame per refresh: the newest.
+            _frame_id, width, height, surface = frames[-1]
             if screen is None:
                 screen = pygame.display.set_mode((width, height))
             screen.blit(surface, (0, 0))
+            if font:
+                draw_overlay(screen, font, client.frame_stats.last_record)
             pygame.display.flip()
+            client.frame_presented(_frame_id)
         clock.tick(60)
 
     client.stop()
+    print(f"viewer stats: {client.stats()}")
     pygame.quit()
 
 
@@ -0,0 +1,102 @@
+"""
+Step-by-step parity of BatchGame with the sprite implementation: seeded
+HeadlessRun games and the same seeds and input in one BatchGame must agree
+on clock, score, Pacman and every ghost after each step.
+"""
+import pytest
+
+pytest.importorskip("numpy")
+
+from src.batch_sim import (GHOST_NAMES, PACMAN_DIRECTIONS, BatchGame,
+                           run_batch, run_sharded, shard_seeds)
+from src.simulation import HeadlessRun, RandomPolicy
+
+SEEDS = (0, 1, 2)
+FRAMES = 3000
+
+
+def sprite_state(run):
+    grid = run.gui.pacman
+    pacman = grid.pacman
+    state = {
+        "ticks": run.clock.get_ticks(),
+        "points": run.game_state.points,
+        "deaths": run.deaths,
+        "levels": run.levels_completed,
+        "chase": run.game_state.ghost_mode == "chase",
+        "powered": run.game_state.is_pacman_powered,
+        "tiny_x": pacman.tiny_start_x,
+        "tiny_y": pacman.tiny_start_y,
+        "pacman_x": pacman.rect_x,
+        "pacman_y": pacman.rect_y,
+        "move_direction": PACMAN_DIRECTIONS.find(pacman.move_direction) if pacman.move_direction else -1,
+    }
+    for ghost in grid.ghost.ghosts_list:
+        state[f"{ghost.name}.x"] = ghost.rect_x
+        state[f"{ghost.name}.y"] = ghost.rect_y
+        state[f"{ghost.name}.released"] = ghost._is_released
+        state[f"{ghost.name}.scared"] = ghost.is_scared
+    return state
+
+
+def batch_state(game, env):
+    state = {
+        "ticks": game.ticks[env],
+        "points": game.points[env],
+        "deaths": game.deaths[env],
+        "levels": game.levels_completed[env],
+        "chase": game.chase[env],
+        "powered": game.powered[env],
+        "tiny_x": game.tiny_x[env],
+        "tiny_y": game.tiny_y[env],
+        "pacman_x": game.pacman_x[env],
+        "pacman_y": game.pacman_y[env],
+        "move_direction": game.move_direction[env],
+    }
+    for g, name in enumerate(GHOST_NAMES):
+        state[f"{name}.x"] = game.ghost_x[env, g]
+        state[f"{name}.y"] = game.ghost_y[env, g]
+        state[f"{name}.released"] = game.released[env, g]
+        state[f"{name}.scared"] = game.scared[env, g]
+    return {key: value.item() for key, value in state.items()}
+
+
+def test_batch_matches_sprites():
+    traces = []
+    for seed in SEEDS:
+        run = HeadlessRun(seed=seed)
+        trace = []
+        for _ in range(FRAMES):
+            run.step()
+            trace.append(sprite_state(run))
+        traces.append(trace)
+    # The runs must get past the opening, or the comparison proves little.
+    assert all(trace[-1]["points"] > 0 and trace[-1]["deaths"] > 0 for trace in traces)
+
+    game = BatchGame(len(SEEDS), list(SEEDS))
+    policies = [RandomPolicy(seed) for seed in SEEDS]
+    for frame in range(FRAMES):
+        actions = []
+        for policy in policies:
+            direction = policy(frame, None)
+            actions.append(PACMAN_DIRECTIONS.index(direction) if direction else -1)
+        game.step(actions)
+        for env, seed in enumerate(SEEDS):
+            expected = traces[env][frame]
+            actual = batch_state(game, env)
+            diff = {key: (expected[key], actual[key]) for key in expected if expected[key] != actual[key]}
+            assert not diff, f"seed {seed} differs at frame {frame}: {diff}"
+
+
+def test_sharded_runs_the_same_games():
+    # Uneven shards (3 + 2) must still cover games 0..4 once each.
+    shards = shard_seeds(5, 2)
+    assert [game for seeds in shards for game in seeds] == list(range(5))
+    assert [game for seeds in shard_seeds(5, 2, seed=3) for game in seeds] == list(range(15, 20))
+
+    single = run_batch(5, 600)
+    sharded = run_sharded(5, 600, processes=2)
+    assert sharded["games"] == single["games"] == 5
+    for key in ("points_max", "deaths", "levels_completed"):
+        assert sharded[key] == single[key]
+    assert sharded["points_mean"] == pytest.approx(single["points_mean"], abs=0.01)
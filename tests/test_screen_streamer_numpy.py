@@ -0,0 +1,101 @@
+"""
+Parity of the vectorized ScreenStreamer encoder with the pure Python one:
+both paths must produce byte-identical run tables and packets.
+"""
+import os
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from src.utils.screen_streamer import RUN_DTYPE, ScreenStreamer
+
+WIDTH, HEIGHT = 160, 120
+
+
+def noise_surface(width=WIDTH, height=HEIGHT, seed=0):
+    rng = np.random.default_rng(seed)
+    surface = pygame.Surface((width, height))
+    pixels = rng.integers(0, 256, (width, height, 3), dtype=np.uint8)
+    # Some flat stretches so runs longer than one pixel occur too.
+    pixels[:, ::7] = 0
+    pixels[::5, :] = 255
+    pygame.surfarray.blit_array(surface, pixels)
+    return surface
+
+
+def solid_surface(color, width=WIDTH, height=HEIGHT):
+    surface = pygame.Surface((width, height))
+    surface.fill(color)
+    return surface
+
+
+def palettized_surface(width=WIDTH, height=HEIGHT, seed=1):
+    surface = pygame.Surface((width, height), depth=8)
+    surface.set_palette([(i, 255 - i, (i * 7) % 256) for i in range(256)])
+    rng = np.random.default_rng(seed)
+    indices = rng.integers(0, 256, (width, height), dtype=np.uint8)
+    indices[: width // 2] = 3
+    pygame.surfarray.blit_array(surface, indices)
+    return surface
+
+
+SURFACES = {
+    "noise": noise_surface,
+    "solid": lambda: solid_surface((90, 140, 30)),
+    "black": lambda: solid_surface((0, 0, 0)),
+    "palettized": palettized_surface,
+    # 300x300 = 90000 pixels: single runs longer than MAX_RUN_LEN.
+    "long_runs": lambda: solid_surface((200, 200, 200), 300, 300),
+    "long_runs_split": lambda: _half_black(300, 300),
+}
+
+
+def _half_black(width, height):
+    surface = solid_surface((255, 255, 255), width, height)
+    surface.fill((0, 0, 0), pygame.Rect(0, height // 3, width, height // 3))
+    return surface
+
+
+@pytest.fixture(params=sorted(SURFACES))
+def surface(request):
+    return SURFACES[request.param]()
+
+
+def gray_of(surface):
+    scalar = ScreenStreamer._rgb_to_gray(pygame.image.tostring(surface, "RGB"))
+    vectorized = ScreenStreamer._surface_to_gray_np(surface)
+    assert vectorized.tobytes() == scalar
+    return scalar, vectorized
+
+
+def test_gray_runs_match(surface):
+    streamer = ScreenStreamer(surface.get_width(), surface.get_height(), use_numpy=False)
+    scalar, vectorized = gray_of(surface)
+    assert ScreenStreamer._encode_runs_np(vectorized) == streamer._encode_runs(scalar)
+
+
+def test_bw_runs_match(surface):
+    streamer = ScreenStreamer(surface.get_width(), surface.get_height(), use_numpy=False)
+    scalar, vectorized = gray_of(surface)
+    assert ScreenStreamer._encode_bw_runs_np(vectorized) == streamer._encode_bw_runs(scalar)
+
+
+@pytest.mark.parametrize("bw_mode", [False, True])
+def test_encode_surface_packets_match(surface, bw_mode):
+    size = surface.get_width(), surface.get_height()
+    scalar = ScreenStreamer(*size, bw_mode=bw_mode, use_numpy=False)
+    vectorized = ScreenStreamer(*size, bw_mode=bw_mode, use_numpy=True)
+    assert vectorized.use_numpy
+    for _ in range(2):
+        assert vectorized.encode_surface(surface) == scalar.encode_surface(surface)
+
+
+def test_long_runs_are_split():
+    gray = np.full(70000, 42, dtype=np.uint8)
+    runs = np.frombuffer(ScreenStreamer._encode_runs_np(gray), dtype=RUN_DTYPE)
+    assert runs["run_len"].tolist() == [65535, 70000 - 65535]
+    assert runs["offset"].tolist() == [0, 65535]
@@ -0,0 +1,40 @@
+"""
+The capture tee of ScreenStreamer writes from its own thread and the
+recording still holds every broadcast packet once the streamer stops.
+"""
+import os
+import threading
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import pygame
+
+from src.utils.screen_streamer import ScreenStreamer
+from src.utils.stream_capture import CaptureReader, CaptureWriter
+
+
+def test_capture_written_off_the_caller_thread(tmp_path, monkeypatch):
+    writers = set()
+    write_at = CaptureWriter.write_at
+
+    def recording_write_at(self, packet, sent):
+        writers.add(threading.current_thread())
+        write_at(self, packet, sent)
+
+    monkeypatch.setattr(CaptureWriter, "write_at", recording_write_at)
+    path = str(tmp_path / "stream.ivgc")
+    streamer = ScreenStreamer(32, 24, use_numpy=False, capture_path=path)
+    streamer.start()
+    surface = pygame.Surface((32, 24))
+    packets = []
+    for shade in range(0, 250, 10):
+        surface.fill((shade, shade, shade))
+        packet = streamer.encode_surface(surface)
+        packets.append(packet)
+        streamer.send_packet(packet)
+    streamer.stop()
+
+    assert writers and threading.current_thread() not in writers
+    with CaptureReader(path) as reader:
+        assert [bytes(reader.packet(i)) for i in range(len(reader))] == packets
+        assert reader.times_us == sorted(reader.times_us)